@@ -3,6 +3,10 @@ import jwt
 from rest_framework.authentication import BaseAuthentication
 from rest_framework import exceptions
 from django.conf import settings
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.errors import ValidationError
+from accounts.cache import token_version_cache, user_cache
 from accounts.models import User
 
 class JWTAuthentication(BaseAuthentication):
@@ -26,13 +30,49 @@ class JWTAuthentication(BaseAuthentication):
             raise exceptions.AuthenticationFailed("Invalid token")
 
         user_id = payload.get("user_id")
-        user = User.objects(id=user_id).first()
+
+        # Versioned claims: build the principal from the token, only the
+        # revocation counter is checked (served from memory when warm).
+        if "ver" in payload:
+            try:
+                version = token_version_cache.get(user_id)
+            except (ValidationError, InvalidId):
+                raise exceptions.AuthenticationFailed("Invalid token")
+            if not version:
+                raise exceptions.AuthenticationFailed("User not found")
+            if version.get("token_version", 0) != payload["ver"]:
+                raise exceptions.AuthenticationFailed("Token revoked")
+            return (principal_from_claims(payload), token)
+
+        # Legacy tokens without claims
+        try:
+            user = user_cache.get_user(user_id)
+        except ValidationError:
+            raise exceptions.AuthenticationFailed("Invalid token")
         if not user:
             raise exceptions.AuthenticationFailed("User not found")
 
         return (user, token)
 
 
+def principal_from_claims(payload):
+    """
+    Lightweight principal: a User document rebuilt from verified JWT claims
+    without touching Mongo. Only id, role, department, batch and is_active are
+    populated; it still works as a reference in queries and new documents.
+    Views needing other profile fields load them via user_cache.get_user().
+    """
+    department = payload.get("department")
+    return User._from_son({
+        "_id": ObjectId(payload["user_id"]),
+        "role": payload.get("role"),
+        "department": ObjectId(department) if department else None,
+        "batch": payload.get("batch"),
+        "is_active": payload.get("is_active"),
+        "token_version": payload.get("ver", 0),
+    })
+
+
 import jwt
 from django.conf import settings
 from rest_framework import authentication, exceptions
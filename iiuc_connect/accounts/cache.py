@@ -0,0 +1,128 @@
+# accounts/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# Fields the authenticated views actually read from request.user.
+# Secrets (password_hash, otp ...) never enter the cache.
+USER_CACHE_FIELDS = (
+    "id", "student_id", "email", "name", "role", "department", "batch",
+    "profile_picture", "profile_picture_thumb", "is_verified", "is_active", "email_change_count",
+    "token_version",
+)
+
+# Claims-based auth only needs the revocation counter.
+TOKEN_VERSION_FIELDS = ("id", "token_version")
+
+
+class UserIdentityCache:
+    """
+    Bounded per-process LRU cache of slim user projections keyed by user id.
+
+    Entries expire after `ttl` seconds so other workers' writes become
+    visible, and are dropped immediately when this process saves or
+    deletes the user. A load that an invalidation overtakes is returned
+    but not stored, so it cannot bring the old document back.
+    """
+
+    def __init__(self, fields=USER_CACHE_FIELDS, max_size=10000, ttl=300):
+        self.fields = fields
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # invalidation clock; keys with loads in flight remember when they were last invalidated
+        self._clock = 0
+        self._loading = {}
+        self._invalidated_at = {}
+
+    def _load(self, user_id):
+        from accounts.models import User
+        return User.objects(id=user_id).only(*self.fields).as_pymongo().first()
+
+    def get(self, user_id):
+        """Return the cached projection (raw son dict) or load it from Mongo."""
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            started = self._clock
+            self._loading[key] = self._loading.get(key, 0) + 1
+
+        try:
+            son = self._load(user_id)
+        finally:
+            with self._lock:
+                stale = self._invalidated_at.get(key, -1) > started
+                self._loading[key] -= 1
+                if not self._loading[key]:
+                    del self._loading[key]
+                    self._invalidated_at.pop(key, None)
+        if son is None or stale:
+            return son
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, son)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return son
+
+    def get_user(self, user_id):
+        """Return a read-only User document built from the cached projection."""
+        from accounts.models import User
+        son = self.get(user_id)
+        if son is None:
+            return None
+        return User._from_son(dict(son))
+
+    def invalidate(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            self._clock += 1
+            if key in self._loading:
+                self._invalidated_at[key] = self._clock
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._invalidated_at.update(dict.fromkeys(self._loading, self._clock))
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+user_cache = UserIdentityCache(
+    max_size=getattr(settings, "USER_CACHE_MAX_SIZE", 10000),
+    ttl=getattr(settings, "USER_CACHE_TTL", 300),
+)
+
+token_version_cache = UserIdentityCache(
+    fields=TOKEN_VERSION_FIELDS,
+    max_size=getattr(settings, "TOKEN_VERSION_CACHE_MAX_SIZE", 100000),
+    ttl=getattr(settings, "TOKEN_VERSION_CACHE_TTL", 60),
+)
@@ -0,0 +1,137 @@
+# accounts/departments.py
+import hashlib
+import json
+import threading
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+
+
+REGISTRY_NAME = "departments"
+
+
+class DepartmentRegistry:
+    """
+    Every Department, held in memory and looked up by id or code.
+
+    Writes in this process reload it immediately and bump a version counter
+    in Mongo (RegistryVersion); other workers compare that counter at most
+    every `check_interval` seconds and reload when it moved. Documents
+    handed out are shared, treat them as read-only.
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._checked_at = 0.0
+        self.version = None
+        self._by_id = {}
+        self._by_code = {}
+        self._list_payload = []
+        self.etag = None
+        self.reloads = 0
+
+    def _remote_version(self):
+        from accounts.models import RegistryVersion
+        doc = RegistryVersion.objects(name=REGISTRY_NAME).only("version").as_pymongo().first()
+        return doc["version"] if doc else 0
+
+    def reload(self):
+        from accounts.models import Department
+        version = self._remote_version()
+        departments = list(Department.objects.order_by("code"))
+        payload = [
+            {"id": str(d.id), "name": d.name, "code": d.code, "is_active": d.is_active}
+            for d in departments if d.is_active == "yes"
+        ]
+        etag = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        with self._lock:
+            self._by_id = {d.id: d for d in departments}
+            self._by_code = {d.code: d for d in departments}
+            self._list_payload = payload
+            self.etag = f'"{etag}"'
+            self.version = version
+            self._loaded = True
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self.reload()
+        elif time.monotonic() - self._checked_at > self.check_interval:
+            self._checked_at = time.monotonic()
+            if self._remote_version() != self.version:
+                self.reload()
+
+    def changed(self):
+        """Call after any Department write: tell other workers, then reload here."""
+        from accounts.models import RegistryVersion
+        RegistryVersion.objects(name=REGISTRY_NAME).update_one(upsert=True, inc__version=1)
+        self.reload()
+
+    # Lookups
+
+    def get(self, pk):
+        """Department by id (ObjectId or string); None when missing or malformed."""
+        if pk is None:
+            return None
+        try:
+            pk = pk if isinstance(pk, ObjectId) else ObjectId(str(pk))
+        except (InvalidId, TypeError):
+            return None
+        self._ensure_fresh()
+        return self._by_id.get(pk)
+
+    def get_fresh(self, pk):
+        """
+        Like get(), but a miss is checked against Mongo: a department created
+        by another worker since the last version check reloads the registry.
+        """
+        dept = self.get(pk)
+        if dept is None and ObjectId.is_valid(str(pk)):
+            from accounts.models import Department
+            if Department.objects(id=pk).only("id").as_pymongo().first():
+                self.reload()
+                dept = self._by_id.get(ObjectId(str(pk)))
+        return dept
+
+    def get_by_code(self, code):
+        self._ensure_fresh()
+        return self._by_code.get(code)
+
+    def get_by_name(self, name):
+        self._ensure_fresh()
+        return next((d for d in self._by_id.values() if d.name == name), None)
+
+    def all(self):
+        self._ensure_fresh()
+        return list(self._by_id.values())
+
+    def require(self, pk):
+        """Like Department.objects.get(id=pk): raises Department.DoesNotExist."""
+        dept = self.get(pk)
+        if dept is None:
+            from accounts.models import Department
+            raise Department.DoesNotExist(f"Department {pk} does not exist")
+        return dept
+
+    def active_list(self):
+        """(payload, etag) for the active department list, serialized once per reload."""
+        self._ensure_fresh()
+        return self._list_payload, self.etag
+
+    def stats(self):
+        return {
+            "departments": len(self._by_id),
+            "version": self.version,
+            "reloads": self.reloads,
+            "etag": self.etag,
+        }
+
+
+department_registry = DepartmentRegistry(
+    check_interval=getattr(settings, "DEPARTMENT_REGISTRY_CHECK_SECONDS", 5),
+)
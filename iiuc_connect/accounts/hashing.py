@@ -0,0 +1,111 @@
+# accounts/hashing.py
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from django.conf import settings
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing queue is full, or a hash is not done, within the timeout."""
+
+
+class PasswordHashingPool:
+    """
+    Bounded worker pool for CPU-bound password hashing.
+
+    At most `workers` hashes run at once and at most `max_pending` requests
+    may wait for (or hold) a slot, so a registration burst can only occupy
+    a fixed share of the process instead of every request thread.
+    """
+
+    def __init__(self, method, kind="thread", workers=2, max_pending=32, timeout=10):
+        self.method = method
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _get_executor(self):
+        # Created lazily so every forked (gunicorn) worker owns its own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor_cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                    self._executor = executor_cls(max_workers=self.workers)
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HashingPoolBusy("Password hashing queue is full")
+
+        with self._lock:
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        started = time.perf_counter()
+
+        # the slot is held until the job finishes, not until the caller stops waiting
+        def done(_future):
+            self._slots.release()
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - started
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            with self._lock:
+                self.rejected += 1
+            raise HashingPoolBusy("Password hashing took longer than the timeout")
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self.run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # werkzeug hashes look like "<method>$<salt>$<hash>"
+        return not pwhash or pwhash.split("$", 1)[0] != self.method
+
+    def stats(self):
+        with self._lock:
+            return {
+                "method": self.method,
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.busy_seconds * 1000 / self.completed, 2) if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHashingPool(
+    method=getattr(settings, "PASSWORD_HASH_METHOD", "scrypt:32768:8:1"),
+    kind=getattr(settings, "PASSWORD_HASH_EXECUTOR", "thread"),
+    workers=getattr(settings, "PASSWORD_HASH_WORKERS", 2),
+    max_pending=getattr(settings, "PASSWORD_HASH_MAX_PENDING", 32),
+    timeout=getattr(settings, "PASSWORD_HASH_TIMEOUT", 10),
+)
@@ -0,0 +1,379 @@
+# accounts/importer.py
+import csv
+import io
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from mongoengine.errors import ValidationError
+from pymongo.errors import BulkWriteError
+from werkzeug.security import generate_password_hash
+
+from accounts.departments import department_registry
+from accounts.hashing import password_hasher
+from accounts.models import ImportJob, User
+from accounts.stats import increment_stats
+from accounts.utils import OTP_TTL_MINUTES, issue_otps
+from notification.utils import enqueue_emails
+from search.index import mark_dirty
+
+
+IMPORT_COLUMNS = ("student_id", "email", "name", "password", "role", "department", "batch")
+IMPORT_ROLES = ("student", "teacher")
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be read (bad format, missing columns)."""
+
+
+def _normalise_header(value):
+    return str(value or "").strip().lower().replace(" ", "_")
+
+
+def _read_csv(file_obj):
+    wrapper = None
+    if not isinstance(file_obj, io.TextIOBase):
+        file_obj = wrapper = io.TextIOWrapper(file_obj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(file_obj)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield [_normalise_header(h) for h in header]
+        yield from reader
+    finally:
+        if wrapper is not None:
+            wrapper.detach()  # the caller's file stays open (and seekable)
+
+
+def _read_xlsx(file_obj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import needs openpyxl (pip install openpyxl); upload a CSV instead")
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_normalise_header(h) for h in header]
+        for row in rows:
+            yield ["" if v is None else str(v) for v in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(file_obj, filename):
+    """
+    Stream (row_number, dict) pairs from a CSV or XLSX file without loading
+    it into memory. Row numbers are 1-based spreadsheet rows (header = 1).
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    rows = _read_xlsx(file_obj) if ext in (".xlsx", ".xlsm") else _read_csv(file_obj)
+    header = next(rows, None)
+    if not header:
+        raise ImportFileError("File is empty")
+    missing = {"student_id", "email", "name"} - set(header)
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(sorted(missing))}")
+
+    for number, values in enumerate(rows, start=2):
+        if not any(str(v).strip() for v in values):
+            continue
+        row = {key: str(value).strip() for key, value in zip(header, values) if key in IMPORT_COLUMNS}
+        yield number, row
+
+
+class UserImporter:
+    """
+    Bulk-creates accounts from spreadsheet rows, `chunk_size` rows at a time:
+    one `$in` duplicate query, parallel password hashing, one unordered
+    insert_many, one bulk OTP insert and one outbox insert per chunk, and a
+    single stats increment at the end.
+
+    Rows without a password get a random temporary one. Those have ~72 bits
+    of entropy, so they are hashed with the cheap IMPORT_TEMP_PASSWORD_METHOD
+    and upgraded to PASSWORD_HASH_METHOD by the first login (see
+    User.rehash_password_if_needed).
+
+    With `shared_pool` the hashes go through the bounded request-path pool
+    (accounts/hashing.py) instead of a process pool of its own; used for
+    the small imports that run inside a request.
+    """
+
+    def __init__(self, chunk_size=1000, default_role="student", send_otp=True, dry_run=False,
+                 hash_workers=None, max_rows=None, shared_pool=False):
+        self.chunk_size = chunk_size
+        self.shared_pool = shared_pool
+        self.max_rows = max_rows
+        self.default_role = default_role
+        self.send_otp = send_otp
+        self.dry_run = dry_run
+        self.hash_workers = hash_workers or getattr(settings, "IMPORT_HASH_WORKERS", None) or os.cpu_count() or 1
+        self.password_method = getattr(settings, "PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        self.temp_password_method = getattr(settings, "IMPORT_TEMP_PASSWORD_METHOD", "pbkdf2:sha256:1000")
+        self.departments = {}
+        self.seen_student_ids = set()
+        self.seen_emails = set()
+        self.created = {"student": 0, "teacher": 0}
+        self.errors = []
+        self.total = 0
+
+    def _error(self, number, row, message):
+        self.errors.append({"row": number, "student_id": row.get("student_id"), "error": message})
+
+    def _load_departments(self):
+        for dept in department_registry.all():
+            self.departments[dept.code.lower()] = dept
+            self.departments[str(dept.id)] = dept
+
+    def _validate(self, number, row):
+        for field in ("student_id", "email", "name"):
+            if not row.get(field):
+                return f"{field} is required"
+        try:
+            validate_email(row["email"])
+        except DjangoValidationError:
+            return "Invalid email"
+        row["role"] = (row.get("role") or self.default_role).lower()
+        if row["role"] not in IMPORT_ROLES:
+            return f"Invalid role: {row['role']}"
+        if row.get("department"):
+            dept = self.departments.get(row["department"].lower())
+            if not dept:
+                return f"Unknown department: {row['department']}"
+            row["department"] = dept
+        else:
+            row["department"] = None
+        if row["student_id"] in self.seen_student_ids:
+            return "Duplicate student_id in file"
+        if row["email"] in self.seen_emails:
+            return "Duplicate email in file"
+        self.seen_student_ids.add(row["student_id"])
+        self.seen_emails.add(row["email"])
+        return None
+
+    def _existing(self, rows):
+        """student_ids and emails of this chunk already in the database (one query)."""
+        cursor = User.objects(__raw__={"$or": [
+            {"student_id": {"$in": [row["student_id"] for _, row in rows]}},
+            {"email": {"$in": [row["email"] for _, row in rows]}},
+        ]}).only("student_id", "email").as_pymongo()
+        student_ids, emails = set(), set()
+        for doc in cursor:
+            student_ids.add(doc.get("student_id"))
+            emails.add(doc.get("email"))
+        return student_ids, emails
+
+    def _hash_passwords(self, executor, rows):
+        passwords, methods = [], []
+        for _, row in rows:
+            if not row.get("password"):
+                row["temporary_password"] = secrets.token_urlsafe(9)
+                passwords.append(row["temporary_password"])
+                methods.append(self.temp_password_method)
+            else:
+                passwords.append(row["password"])
+                methods.append(self.password_method)
+        if executor is None:
+            return [password_hasher.run(generate_password_hash, p, m) for p, m in zip(passwords, methods)]
+        chunksize = max(1, len(passwords) // (self.hash_workers * 4))
+        return list(executor.map(generate_password_hash, passwords, methods, chunksize=chunksize))
+
+    def _build_user(self, row, password_hash):
+        is_active = "yes" if row["email"].endswith("@ugrad.iiuc.ac.bd") else "no"
+        if row["role"] == "teacher":
+            is_active = "no"
+        return User(
+            student_id=row["student_id"],
+            email=row["email"],
+            name=row["name"],
+            password_hash=password_hash,
+            profile_picture="",
+            is_active=is_active,
+            role=row["role"],
+            department=row["department"],
+            batch=row.get("batch") or None,
+        )
+
+    def _insert(self, entries):
+        """Unordered insert_many; rows lost to a concurrent duplicate are reported, the rest kept."""
+        collection = User._get_collection()
+        docs = [user.to_mongo() for _, _, user in entries]
+        try:
+            result = collection.insert_many(docs, ordered=False)
+            inserted_ids = set(result.inserted_ids)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "Insert failed") for err in e.details.get("writeErrors", [])}
+            inserted_ids = set()
+            for index, (number, row, _) in enumerate(entries):
+                if index in failed:
+                    message = "student_id or email already exists" if "E11000" in failed[index] else failed[index]
+                    self._error(number, row, message)
+                else:
+                    inserted_ids.add(docs[index]["_id"])
+
+        created = []
+        for doc, (number, row, user) in zip(docs, entries):
+            if doc["_id"] in inserted_ids:
+                user.id = doc["_id"]
+                created.append((row, user))
+        return created
+
+    def _notify(self, created):
+        otps = issue_otps([user for _, user in created]) if self.send_otp else {}
+        messages = []
+        for row, user in created:
+            lines = [f"Hello {user.name},", "", "An IIUC Connect account has been created for you."]
+            if row.get("temporary_password"):
+                lines.append(f"Temporary password: {row['temporary_password']}")
+            if user.id in otps:
+                lines.append(f"Your OTP code is {otps[user.id]}. It is valid for {OTP_TTL_MINUTES} minutes.")
+            lines.append("If the code has expired, sign in and request a new OTP to verify your email.")
+            messages.append((user.email, "Welcome to IIUC Connect", "\n".join(lines)))
+        enqueue_emails(messages)
+
+    def _process_chunk(self, executor, chunk):
+        valid = []
+        for number, row in chunk:
+            error = self._validate(number, row)
+            if error:
+                self._error(number, row, error)
+            else:
+                valid.append((number, row))
+        if not valid:
+            return
+
+        existing_ids, existing_emails = self._existing(valid)
+        fresh = []
+        for number, row in valid:
+            if row["student_id"] in existing_ids:
+                self._error(number, row, "student_id already exists")
+            elif row["email"] in existing_emails:
+                self._error(number, row, "email already exists")
+            else:
+                fresh.append((number, row))
+        if not fresh:
+            return
+
+        entries = []
+        for (number, row), password_hash in zip(fresh, self._hash_passwords(executor, fresh)):
+            user = self._build_user(row, password_hash)
+            try:
+                user.validate()
+            except ValidationError as e:
+                self._error(number, row, str(e))
+                continue
+            entries.append((number, row, user))
+
+        if self.dry_run or not entries:
+            for _, row, user in entries:
+                self.created[user.role] += 1
+            return
+
+        created = self._insert(entries)
+        mark_dirty("users", [user.id for _, user in created])
+        for _, user in created:
+            self.created[user.role] += 1
+        if created:
+            self._notify(created)
+
+    def run(self, rows):
+        started = time.perf_counter()
+        self._load_departments()
+        rows = iter(rows)
+        pool = nullcontext() if self.shared_pool else ProcessPoolExecutor(max_workers=self.hash_workers)
+        with pool as executor:
+            while True:
+                size = self.chunk_size
+                if self.max_rows:
+                    size = min(size, self.max_rows - self.total)
+                chunk = list(islice(rows, size)) if size > 0 else []
+                if not chunk:
+                    break
+                self.total += len(chunk)
+                self._process_chunk(executor, chunk)
+
+        created = sum(self.created.values())
+        if created and not self.dry_run:
+            increment_stats(total_users=created, **self.created)
+        return {
+            "total_rows": self.total,
+            "created": created,
+            "created_by_role": dict(self.created),
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+            "truncated": bool(self.max_rows) and next(rows, None) is not None,
+            "dry_run": self.dry_run,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+
+
+def import_users(file_obj, filename, **options):
+    return UserImporter(**options).run(read_rows(file_obj, filename))
+
+
+# Background imports: one at a time by default, each with its own hashing processes
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "IMPORT_WORKERS", 1),
+                    thread_name_prefix="importer",
+                )
+    return _executor
+
+
+def queue_import(file_obj, owner, **options):
+    """Spool the file and import it in the background; returns the pending ImportJob."""
+    from uploads.uploader import spool_file
+    path, meta = spool_file(file_obj)
+    job = ImportJob(owner=owner, original_name=meta["name"], spool_path=path, options=options)
+    job.save()
+    _get_executor().submit(process_import, job.id)
+    return job
+
+
+def _finish(job_id, **fields):
+    ImportJob.objects(id=job_id).update_one(updated_at=timezone.now(), **{f"set__{k}": v for k, v in fields.items()})
+
+
+def process_import(job_id):
+    # claim the job so a resubmitted id is not imported twice
+    job = ImportJob.objects(id=job_id, status="pending").modify(
+        new=True, set__status="running", set__updated_at=timezone.now()
+    )
+    if job is None:
+        return
+    try:
+        with open(job.spool_path, "rb") as fh:
+            report = import_users(fh, job.original_name, **job.options)
+    except ImportFileError as e:
+        _finish(job.id, status="failed", error=str(e))
+    except Exception as e:
+        _finish(job.id, status="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    else:
+        limit = getattr(settings, "IMPORT_REPORT_MAX_ERRORS", 1000)
+        report["errors_truncated"] = len(report["errors"]) > limit
+        report["errors"] = report["errors"][:limit]
+        _finish(job.id, status="completed", report=report)
+    finally:
+        if job.spool_path and os.path.exists(job.spool_path):
+            os.remove(job.spool_path)
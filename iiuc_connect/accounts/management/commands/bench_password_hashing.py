@@ -0,0 +1,46 @@
+# accounts/management/commands/bench_password_hashing.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.hashing import PasswordHashingPool
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark the password hashing pool and report hashes/sec per worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200, help="Hashes per run")
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+        parser.add_argument("--executor", choices=["thread", "process"],
+                            default=getattr(settings, "PASSWORD_HASH_EXECUTOR", "thread"))
+        parser.add_argument("--method", default=getattr(settings, "PASSWORD_HASH_METHOD", "scrypt:32768:8:1"))
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        self.stdout.write(f"method={options['method']} executor={options['executor']} count={count}")
+
+        for workers in options["workers"]:
+            pool = PasswordHashingPool(
+                method=options["method"],
+                kind=options["executor"],
+                workers=workers,
+                max_pending=count,
+                timeout=600,
+            )
+            pool.hash("warm-up")  # spin up workers outside the timed region
+
+            # Simulate concurrent request threads feeding the pool
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers * 4) as clients:
+                list(clients.map(pool.hash, (f"password-{i}" for i in range(count))))
+            elapsed = time.perf_counter() - started
+
+            rate = count / elapsed
+            self.stdout.write(
+                f"workers={workers:<3} total={rate:8.1f} hashes/s  "
+                f"per_worker={rate / workers:8.1f} hashes/s  "
+                f"peak_pending={pool.stats()['peak_pending']}"
+            )
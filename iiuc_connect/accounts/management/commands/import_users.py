@@ -0,0 +1,47 @@
+# accounts/management/commands/import_users.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importer import ImportFileError, import_users
+
+
+class Command(BaseCommand):
+    help = "Bulk-create student/teacher accounts from a CSV or XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV/XLSX with student_id,email,name[,password,role,department,batch]")
+        parser.add_argument("--role", choices=["student", "teacher"], default="student",
+                            help="Role for rows without a role column")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=None, help="Password hashing processes")
+        parser.add_argument("--no-otp", action="store_true", help="Queue welcome emails without an OTP code")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and hash only, write nothing")
+        parser.add_argument("--errors", help="Write per-row errors to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as fh:
+                report = import_users(
+                    fh, options["path"],
+                    chunk_size=options["chunk_size"],
+                    default_role=options["role"],
+                    send_otp=not options["no_otp"],
+                    dry_run=options["dry_run"],
+                    hash_workers=options["workers"],
+                )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"import: rows={report['total_rows']} created={report['created']} {report['created_by_role']} "
+            f"failed={report['failed']} in {report['seconds']}s{' (dry run)' if report['dry_run'] else ''}"
+        )
+        if options["errors"]:
+            with open(options["errors"], "w") as out:
+                json.dump(report["errors"], out, indent=2)
+        else:
+            for error in report["errors"][:20]:
+                self.stdout.write(f"  row {error['row']}: {error['error']}")
+            if report["failed"] > 20:
+                self.stdout.write(f"  ... {report['failed'] - 20} more (use --errors FILE)")
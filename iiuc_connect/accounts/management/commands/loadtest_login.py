@@ -0,0 +1,81 @@
+# accounts/management/commands/loadtest_login.py
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from accounts.views import LoginAPIView
+from iiuc_connect.mongo_metrics import count_commands
+
+
+def legacy_login(email, password):
+    """The pre-change LoginAPIView write path (read-modify-save), for comparison."""
+    user = User.objects(email=email).first()
+    if not user.check_password(password):
+        user.otp_count = (user.otp_count or 0) + 1
+        user.save()
+        return 401
+    user.otp_count = 0
+    user.save()
+    return 200
+
+
+class Command(BaseCommand):
+    help = "Load-test login and report Mongo write ops per login, before and after."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+
+    def handle(self, *args, **options):
+        password = "loadtest-password"
+        user = User(
+            student_id=f"LOADTEST-{uuid.uuid4().hex[:10]}",
+            email=f"loadtest-{uuid.uuid4().hex[:10]}@ugrad.iiuc.ac.bd",
+            name="Login Load Test",
+            is_verified="yes",
+            is_active="yes",
+        )
+        user.set_password(password)
+        user.save()
+
+        view = LoginAPIView.as_view()
+        factory = APIRequestFactory()
+
+        def current_login(pw):
+            request = factory.post("/api/accounts/login/", {"email": user.email, "password": pw}, format="json")
+            return view(request).status_code
+
+        def legacy(pw):
+            return legacy_login(user.email, pw)
+
+        try:
+            for label, fn in (("before", legacy), ("after", current_login)):
+                for outcome, pw in (("success", password), ("failure", "wrong-password")):
+                    self._run(label, outcome, fn, pw, options["requests"], options["concurrency"])
+                    # leave the failure counter as a real user would after a good login
+                    fn(password)
+        finally:
+            user.delete()
+
+    def _run(self, label, outcome, fn, pw, total, concurrency):
+        def one(_):
+            with count_commands() as tally:
+                fn(pw)
+            return tally
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            tallies = list(pool.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+
+        writes = sum(t.writes for t in tallies)
+        reads = sum(t.reads for t in tallies)
+        self.stdout.write(
+            f"{label:<6} {outcome:<7} logins={total} "
+            f"writes/login={writes / total:.2f} reads/login={reads / total:.2f} "
+            f"throughput={total / elapsed:.1f}/s"
+        )
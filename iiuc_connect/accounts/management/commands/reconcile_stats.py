@@ -0,0 +1,25 @@
+# accounts/management/commands/reconcile_stats.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    help = "Recount users/departments and repair drift in the sharded Stats counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=0,
+                            help="Repeat every N seconds (0 = run once, e.g. from cron)")
+
+    def handle(self, *args, **options):
+        while True:
+            drift = reconcile_stats()
+            if drift:
+                self.stdout.write(f"stats: repaired drift {drift}")
+            else:
+                self.stdout.write("stats: no drift")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -1,9 +1,14 @@
 # accounts/models.py
-from mongoengine import Document, StringField, EmailField, DateTimeField,IntField
+from mongoengine import Document, StringField, EmailField, DateTimeField,IntField, DictField
 import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from accounts.hashing import password_hasher
 from django.utils import timezone
 from mongoengine import ReferenceField
+from accounts.cache import token_version_cache, user_cache
+from search.index import mark_dirty
+from accounts.departments import department_registry
+from iiuc_connect.identity_map import forget
+from bson import DBRef
 
 class Department(Document):
     name = StringField(required=True, unique=True)
@@ -15,42 +20,167 @@ class Department(Document):
         'indexes': ['name', 'code']
     }
 
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        mark_dirty("departments", [self.pk])
+        department_registry.changed()
+        return result
+
+    def delete(self, *args, **kwargs):
+        mark_dirty("departments", [self.pk])
+        result = super().delete(*args, **kwargs)
+        department_registry.changed()
+        return result
+
+    # Used by get_document / prefetch_references instead of a query
+    @staticmethod
+    def registry_lookup(pk):
+        return department_registry.get(pk)
+
+
+class DepartmentReferenceField(ReferenceField):
+    """ReferenceField to Department that dereferences from the in-memory registry."""
+
+    def __init__(self, **kwargs):
+        super().__init__(Department, **kwargs)
+
+    def __get__(self, instance, owner):
+        if instance is not None and self._auto_dereference:
+            value = instance._data.get(self.name)
+            if isinstance(value, DBRef):
+                dept = department_registry.get(value.id)
+                if dept is not None:
+                    instance._data[self.name] = dept
+        return super().__get__(instance, owner)
+
+
+# Bumped on every write to a registry-cached collection so each worker
+# knows when to reload (see accounts/departments.py)
+class RegistryVersion(Document):
+    name = StringField(required=True, unique=True)
+    version = IntField(default=0)
+
+    meta = {
+        'collection': 'registry_versions',
+    }
+
 class User(Document):
     student_id = StringField(required=True, unique=True)       # unique, indexed
     email = EmailField(required=True, unique=True)             # unique, indexed
     name = StringField(required=True)
     password_hash = StringField(required=True)
     created_at = DateTimeField(default=timezone.now)
-    otp = StringField()               
-    otp_created_at = DateTimeField()  # OTP validity
     is_verified = StringField(choices=['yes','no'], default='no') 
     is_active = StringField(choices=['yes','no'], default='no') # email verified
     role = StringField(choices=['student', 'admin', 'teacher'], default='student')
-    department = ReferenceField(Department, required=False)    
+    department = DepartmentReferenceField(required=False)
     batch = StringField()           
     profile_picture = StringField()  # URL (Cloudinary)
-    otp_count = IntField(default=0)
+    profile_picture_thumb = StringField()  # small variant for lists / avatars
+    otp_count = IntField(default=0)   # failed login attempts
     email_change_count = IntField(default=1)
+    token_version = IntField(default=0)  # bumped to revoke issued JWT claims
 
 
     meta = {
         'collection': 'users',
-        'indexes': ['student_id', 'email', 'role']
+        'indexes': ['student_id', 'email', 'role'],
+        'strict': False,  # legacy documents still carry otp / otp_created_at
     }
 
     # Password setter
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     # Password checker
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
+    # Upgrade the stored hash after a successful login when the cost parameters changed
+    def rehash_password_if_needed(self, password):
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            type(self).objects(id=self.id).update_one(set__password_hash=self.password_hash)
 
-# accounts/models.py
-class Stats(Document):
+    # Invalidate every JWT issued before a role/department/activation change
+    def revoke_tokens(self):
+        self.token_version = (self.token_version or 0) + 1
+
+    # Keep the auth caches coherent with every document write
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        self.invalidate_caches(self.pk)
+        return result
+
+    def delete(self, *args, **kwargs):
+        self.invalidate_caches(self.pk)
+        return super().delete(*args, **kwargs)
+
+    @staticmethod
+    def invalidate_caches(user_id):
+        forget(User, user_id)
+        user_cache.invalidate(user_id)
+        token_version_cache.invalidate(user_id)
+        mark_dirty("users", [user_id])
+
+
+# OTP state lives outside the user document; expired challenges are
+# removed by the TTL index on expires_at.
+class OTPChallenge(Document):
+    user = ReferenceField(User, required=True, unique=True)
+    email = EmailField(required=True)
+    code_hash = StringField(required=True)
+    attempts = IntField(default=0)
+    created_at = DateTimeField(default=timezone.now)
+    resend_after = DateTimeField(required=True)
+    expires_at = DateTimeField(required=True)
+
+    meta = {
+        'collection': 'otp_challenges',
+        'indexes': [
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0},
+        ]
+    }
+
+
+# Site counters split over STATS_SHARDS documents; increments hit a random
+# shard and reads sum them (see accounts/stats.py)
+class StatsShard(Document):
+    shard = IntField(required=True, unique=True)
     total_users = IntField(default=0)
     verified_users = IntField(default=0)
     teacher = IntField(default=0)
     student = IntField(default=0)
     department = IntField(default=0)
+
+    meta = {
+        'collection': 'stats_shards',
+    }
+
+
+# A spreadsheet import too large to run inside the request; processed by
+# the background importer (see accounts/importer.py) and polled by id.
+class ImportJob(Document):
+    owner = ReferenceField(User, required=True)
+    original_name = StringField()
+    spool_path = StringField()
+    options = DictField()                    # UserImporter keyword arguments
+    status = StringField(choices=['pending', 'running', 'completed', 'failed'], default='pending')
+    report = DictField()                     # UserImporter.run() result, errors capped
+    error = StringField()
+    created_at = DateTimeField(default=timezone.now)
+    updated_at = DateTimeField(default=timezone.now)
+
+    meta = {
+        'collection': 'import_jobs',
+        'indexes': ['owner', 'status']
+    }
+
+    def summary(self):
+        return {
+            "id": str(self.id),
+            "file": self.original_name,
+            "status": self.status,
+            "report": self.report or None,
+            "error": self.error,
+        }
@@ -34,6 +34,7 @@ class ProfileSerializer(serializers.Serializer):
     department = serializers.CharField(allow_null=True)
     batch = serializers.CharField(allow_null=True)
     profile_picture = serializers.CharField(allow_null=True)
+    profile_picture_thumb = serializers.CharField(allow_null=True, required=False)
     is_verified = serializers.CharField()
     is_active = serializers.CharField()
 
@@ -59,6 +60,7 @@ class TeacherListSerializer(serializers.Serializer):
     student_id = serializers.CharField()
     department = serializers.CharField(source="department.name", allow_null=True)
     profile_picture = serializers.CharField(allow_null=True)
+    profile_picture_thumb = serializers.CharField(allow_null=True, required=False)
 
 
 class DepartmentListSerializer(serializers.Serializer):
@@ -0,0 +1,90 @@
+# accounts/stats.py
+import random
+import threading
+import time
+
+from django.conf import settings
+from mongoengine.errors import NotUniqueError
+
+from accounts.models import Department, StatsShard, User
+
+
+STATS_FIELDS = ("total_users", "verified_users", "teacher", "student", "department")
+
+_cache_lock = threading.Lock()
+_cached = {"expires": 0.0, "data": None}
+
+
+def _shard_count():
+    return max(1, getattr(settings, "STATS_SHARDS", 8))
+
+
+def increment_stats(**deltas):
+    """Atomically $inc the given counters on one randomly chosen shard."""
+    deltas = {k: v for k, v in deltas.items() if k in STATS_FIELDS and v}
+    if not deltas:
+        return
+    update = {f"inc__{k}": v for k, v in deltas.items()}
+    shard = random.randrange(_shard_count())
+    try:
+        StatsShard.objects(shard=shard).update_one(upsert=True, **update)
+    except NotUniqueError:
+        # Two workers created the same shard at once; it exists now
+        StatsShard.objects(shard=shard).update_one(**update)
+
+
+def sum_shards():
+    group = {"_id": None}
+    group.update({field: {"$sum": f"${field}"} for field in STATS_FIELDS})
+    rows = list(StatsShard.objects.aggregate([{"$group": group}]))
+    row = rows[0] if rows else {}
+    return {field: row.get(field, 0) for field in STATS_FIELDS}
+
+
+def read_stats(use_cache=True):
+    """Summed counters, cached in-process for STATS_CACHE_TTL seconds."""
+    now = time.monotonic()
+    if use_cache:
+        with _cache_lock:
+            if _cached["data"] is not None and _cached["expires"] > now:
+                return dict(_cached["data"])
+
+    data = sum_shards()
+    with _cache_lock:
+        _cached["data"] = data
+        _cached["expires"] = now + getattr(settings, "STATS_CACHE_TTL", 30)
+    return dict(data)
+
+
+def compute_true_stats():
+    """Recount everything from the users and departments collections."""
+    rows = list(User.objects.aggregate([
+        {"$group": {
+            "_id": None,
+            "total_users": {"$sum": 1},
+            "verified_users": {"$sum": {"$cond": [{"$eq": ["$is_verified", "yes"]}, 1, 0]}},
+            "teacher": {"$sum": {"$cond": [{"$eq": ["$role", "teacher"]}, 1, 0]}},
+            "student": {"$sum": {"$cond": [{"$eq": ["$role", "student"]}, 1, 0]}},
+        }}
+    ]))
+    row = rows[0] if rows else {}
+    truth = {field: row.get(field, 0) for field in STATS_FIELDS if field != "department"}
+    truth["department"] = Department.objects.count()
+    return truth
+
+
+def reconcile_stats():
+    """
+    Repair counter drift by $inc-ing the difference into shard 0.
+    Applying a delta (not a $set) keeps increments that land while we count.
+    Returns the applied deltas.
+    """
+    truth = compute_true_stats()
+    current = sum_shards()
+    drift = {field: truth[field] - current[field] for field in STATS_FIELDS}
+    drift = {k: v for k, v in drift.items() if v}
+    if drift:
+        StatsShard.objects(shard=0).update_one(upsert=True, **{f"inc__{k}": v for k, v in drift.items()})
+    with _cache_lock:
+        _cached["data"] = None
+    return drift
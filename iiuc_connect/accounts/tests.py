@@ -1,3 +1,12 @@
-from django.test import TestCase
+from accounts.views import TeacherListAPIView
+from iiuc_connect.testing import MongoQueryCountTestCase
 
-# Create your tests here.
+
+class TeacherListQueryCountTests(MongoQueryCountTestCase):
+    @classmethod
+    def seed(cls):
+        cls.make_users("teacher", cls.rows)
+
+    def test_teacher_list_commands_do_not_grow_with_page_size(self):
+        view = TeacherListAPIView.as_view()
+        self.assertConstantCommands(lambda size: self.call(view, self.admin, limit=size), "TeacherList")
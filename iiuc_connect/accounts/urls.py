@@ -1,6 +1,6 @@
 # accounts/urls.py
 from django.urls import path
-from accounts.views import DepartmentCreateAPIView, DepartmentListAPIView, InactiveUsersAPIView, RegisterAPIView, LoginAPIView, ResendOTPAPIView, TeacherListAPIView, VerifyOTPAPIView, ProfileAPIView,countuserAPIView
+from accounts.views import AuthCacheStatsAPIView, BulkUserActivationAPIView, DepartmentCreateAPIView, DepartmentListAPIView, ImportStatusAPIView, InactiveUsersAPIView, PasswordHashingStatsAPIView, RegisterAPIView, LoginAPIView, ResendOTPAPIView, TeacherListAPIView, UserImportAPIView, VerifyOTPAPIView, ProfileAPIView,countuserAPIView
 
 urlpatterns = [
     path("register/", RegisterAPIView.as_view(), name="register"),
@@ -15,6 +15,12 @@ urlpatterns = [
     path("teacher/", TeacherListAPIView.as_view(), name="list-departments"),
     
     path("users/inactive/", InactiveUsersAPIView.as_view(), name="inactive-users"),
+    path("users/inactive/bulk/", BulkUserActivationAPIView.as_view(), name="bulk-user-activation"),
+    path("users/import/", UserImportAPIView.as_view(), name="import-users"),
+    path("users/import/<str:pk>/", ImportStatusAPIView.as_view(), name="import-status"),
     
     path("total_user/",countuserAPIView.as_view(),name="total_user"),
+
+    path("auth-cache/stats/", AuthCacheStatsAPIView.as_view(), name="auth-cache-stats"),
+    path("password-hashing/stats/", PasswordHashingStatsAPIView.as_view(), name="password-hashing-stats"),
 ]
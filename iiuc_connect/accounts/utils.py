@@ -2,16 +2,36 @@
 import jwt
 import time
 import random
+import hmac
+import hashlib
+import datetime
 from django.conf import settings
 from django.utils import timezone
-from django.core.mail import send_mail
-from accounts.models import User
+from mongoengine.errors import NotUniqueError
+from pymongo.errors import BulkWriteError
+from accounts.models import OTPChallenge, User
+from notification.utils import enqueue_email
 
 
-def generate_jwt(user_id, days=7):
+def generate_jwt(user, days=7):
+    """
+    Accepts a User (embeds versioned role/department/batch claims) or a bare id.
+    """
     iat = int(time.time())
     exp = iat + days * 24 * 3600
-    payload = {"user_id": str(user_id), "iat": iat, "exp": exp}
+    if isinstance(user, User):
+        payload = {
+            "user_id": str(user.id),
+            "role": user.role,
+            "department": str(user.department.id) if user.department else None,
+            "batch": user.batch,
+            "is_active": user.is_active,
+            "ver": user.token_version or 0,
+            "iat": iat,
+            "exp": exp,
+        }
+    else:
+        payload = {"user_id": str(user), "iat": iat, "exp": exp}
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
     return token
 
@@ -28,31 +48,114 @@ def decode_jwt(token):
 
 
 OTP_TTL_MINUTES = 10
+OTP_RESEND_COOLDOWN_SECONDS = 60
+OTP_MAX_ATTEMPTS = 5
+
+
+class OTPCooldown(Exception):
+    def __init__(self, remaining):
+        super().__init__(f"Please wait {remaining} seconds before requesting a new OTP.")
+        self.remaining = remaining
 
 
 def generate_otp():
     return str(random.randint(100000, 999999))
 
 
-def send_otp_via_email(email, otp):
-    subject = "Your IIUC Connect OTP"
-    message = f"Your OTP code is {otp}. It is valid for {OTP_TTL_MINUTES} minutes."
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None) or settings.EMAIL_HOST_USER
-    send_mail(subject, message, from_email, [email], fail_silently=False)
+def _hash_otp(otp):
+    return hmac.new(settings.SECRET_KEY.encode(), otp.encode(), hashlib.sha256).hexdigest()
 
 
-def create_and_send_otp(user, raise_on_email_error=False):
+def issue_otp(user, enforce_cooldown=False):
+    """
+    Upsert the user's OTPChallenge with a fresh code and return the code.
+
+    With enforce_cooldown the upsert only matches a challenge whose resend
+    window has passed; otherwise it tries to insert a second challenge for
+    the user, the unique index rejects it and we raise OTPCooldown.
+    """
+    now = timezone.now()
     otp = generate_otp()
-    user.otp = otp
-    user.otp_created_at = timezone.now()
-    user.is_verified = "no"
+    query = OTPChallenge.objects(user=user.id)
+    if enforce_cooldown:
+        query = query.filter(resend_after__lte=now)
+    try:
+        query.update_one(
+            upsert=True,
+            set__email=user.email,
+            set__code_hash=_hash_otp(otp),
+            set__attempts=0,
+            set__created_at=now,
+            set__resend_after=now + datetime.timedelta(seconds=OTP_RESEND_COOLDOWN_SECONDS),
+            set__expires_at=now + datetime.timedelta(minutes=OTP_TTL_MINUTES),
+        )
+    except NotUniqueError:
+        existing = OTPChallenge.objects(user=user.id).only("resend_after").first()
+        remaining = OTP_RESEND_COOLDOWN_SECONDS
+        if existing:
+            resend_after = existing.resend_after
+            if timezone.is_naive(resend_after):
+                resend_after = timezone.make_aware(resend_after, datetime.timezone.utc)
+            remaining = max(1, int((resend_after - now).total_seconds()))
+        raise OTPCooldown(remaining)
+    return otp
+
+
+def issue_otps(users):
+    """
+    Create challenges for many freshly created users with one insert;
+    returns {user_id: otp}. Users that already have a challenge keep it.
+    """
+    now = timezone.now()
+    codes, challenges = {}, []
+    for user in users:
+        otp = generate_otp()
+        codes[user.id] = otp
+        challenges.append(OTPChallenge(
+            user=user,
+            email=user.email,
+            code_hash=_hash_otp(otp),
+            created_at=now,
+            resend_after=now + datetime.timedelta(seconds=OTP_RESEND_COOLDOWN_SECONDS),
+            expires_at=now + datetime.timedelta(minutes=OTP_TTL_MINUTES),
+        ))
+    if not challenges:
+        return codes
     try:
-        if user.otp_count is None:
-            user.otp_count = 0
-    except Exception:
-        user.otp_count = 0
+        OTPChallenge._get_collection().insert_many([c.to_mongo() for c in challenges], ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            codes.pop(challenges[err["index"]].user.id, None)
+    return codes
+
+
+def verify_otp(user, otp):
+    """
+    Returns "ok", "invalid" or "expired" (expired, missing or out of attempts).
+    The attempt counter is bumped atomically with find_one_and_update.
+    """
+    now = timezone.now()
+    challenge = OTPChallenge.objects(
+        user=user.id, expires_at__gt=now, attempts__lt=OTP_MAX_ATTEMPTS
+    ).modify(inc__attempts=1, new=True)
+    if not challenge:
+        return "expired"
+    if not hmac.compare_digest(challenge.code_hash, _hash_otp(otp)):
+        return "invalid"
+    # Consume this exact code; a concurrent resend replaces code_hash and wins
+    if not OTPChallenge.objects(id=challenge.id, code_hash=challenge.code_hash).delete():
+        return "invalid"
+    return "ok"
+
+
+def send_otp_via_email(email, otp):
+    subject = "Your IIUC Connect OTP"
+    message = f"Your OTP code is {otp}. It is valid for {OTP_TTL_MINUTES} minutes."
+    enqueue_email(email, subject, message)
+
 
-    user.save()
+def create_and_send_otp(user, raise_on_email_error=False, enforce_cooldown=False):
+    otp = issue_otp(user, enforce_cooldown=enforce_cooldown)
 
     try:
         send_otp_via_email(user.email, otp)
@@ -1,64 +1,46 @@
 # accounts/views.py
-from notification.utils import create_notification
+from notification.utils import create_notification, create_notifications, enqueue_emails
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.utils import timezone
-from django.utils import timezone as dj_timezone
-import cloudinary
 from rest_framework import status, permissions
 from accounts.serializers import (
-    DepartmentListSerializer, RegisterSerializer, LoginSerializer, OTPVerifySerializer,
+    RegisterSerializer, LoginSerializer, OTPVerifySerializer,
     ProfileUpdateSerializer, ProfileSerializer, TeacherListSerializer
 )
-from .models import Stats, User, Department
-from .utils import create_and_send_otp, generate_jwt
+from .models import ImportJob, OTPChallenge, User, Department
+from .departments import department_registry
+from .importer import ImportFileError, UserImporter, queue_import, read_rows
+from .stats import increment_stats, read_stats
+from .utils import OTPCooldown, create_and_send_otp, generate_jwt, verify_otp
 from django.conf import settings
 import jwt
-import datetime
-from cloudinary.uploader import upload as cloudinary_upload
+from itertools import islice
 from accounts.serializers import DepartmentSerializer, UserActivationSerializer
 from rest_framework.permissions import IsAuthenticated
 from accounts.authentication import JWTAuthentication
-from cloudinary.exceptions import Error as CloudinaryError
-from urllib.parse import urlparse
+from accounts.cache import user_cache
+from accounts.hashing import HashingPoolBusy, password_hasher
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from bson import ObjectId 
+from bson.errors import InvalidId
+from mongoengine.errors import NotUniqueError
+from iiuc_connect.pagination import MongoCursorPagination
+from iiuc_connect.prefetch import prefetch_references
+from uploads.storage import get_storage
+from uploads.uploader import queue_upload
 
 
+# Thin wrappers kept for existing callers; the backend is chosen by MEDIA_STORAGE_BACKEND
 def upload_image(file_obj, folder="iiuc_connect_profiles"):
-    try:
-        result = cloudinary_upload(file_obj, folder=folder, overwrite=True, resource_type="image")
-        url = result.get("secure_url")
-        if not url or not isinstance(url, str):
-            raise Exception("Invalid URL returned from Cloudinary")
-        return url
-    except Exception as e:
-        raise e
+    return get_storage().upload(file_obj, folder=folder)
 
 def delete_image(public_id):
-    """Delete file from Cloudinary using public_id"""
-    try:
-        result = cloudinary.uploader.destroy(public_id, invalidate=True)
-
-        if result.get("result") in ["ok", "not found"]:
-            return True
-
-        raise Exception(f"Failed to delete image: {result}")
-
-    except CloudinaryError as e:
-        raise Exception(f"Cloudinary delete error: {str(e)}")
-
-    
-from urllib.parse import urlparse
+    """Delete file from media storage using public_id"""
+    return get_storage().delete(public_id)
 
 def extract_public_id(url: str) -> str:
-    path = urlparse(url).path
-    parts = path.split("/")
-    if len(parts) < 5:
-        return ""
-    public_id_with_ext = "/".join(parts[4:])
-    return ".".join(public_id_with_ext.split(".")[:-1])
+    return get_storage().public_id(url)
 
 
 # Register
@@ -80,10 +62,9 @@ class RegisterAPIView(APIView):
         department_id = data.get("department")
         department_obj = None
         if department_id:
-            try:
-                department_obj = Department.objects(id=ObjectId(department_id)).first()
-            except Exception:
+            if not ObjectId.is_valid(department_id):
                 return Response({"error": "Invalid department ID"}, status=400)
+            department_obj = department_registry.get_fresh(department_id)
             if not department_obj:
                 return Response({"error": "Department not found"}, status=404)
 
@@ -105,40 +86,25 @@ class RegisterAPIView(APIView):
             role=data.get("role", "student"),
             department=department_obj,
         )
-        user.set_password(data["password"])
-
-        if "profile_picture" in request.FILES:
-            try:
-                user.profile_picture = upload_image(request.FILES["profile_picture"])
-            except Exception as e:
-                return Response({"error": "Image upload failed", "detail": str(e)}, status=500)
-
-        
-
-        stats = Stats.objects.first()
-        if not stats:
-            stats = Stats()
-            stats.save()
-
-        # Ensure all fields exist
-        for field in ["total_users", "verified_users", "teacher", "student", "department"]:
-            if not hasattr(stats, field) or getattr(stats, field) is None:
-                setattr(stats, field, 0)
+        try:
+            user.set_password(data["password"])
+        except HashingPoolBusy:
+            return Response({"error": "Server busy, please try again"}, status=503)
 
-        # Atomic increment dictionary
-        inc_dict = {"total_users": 1}
-        if user.is_verified == "yes":
-            inc_dict["verified_users"] = 1
-        if user.role == "teacher":
-            inc_dict["teacher"] = 1
-        elif user.role == "student":
-            inc_dict["student"] = 1
+        user.save()
+        increment_stats(total_users=1, **{user.role: 1})
 
-        Stats.objects(id=stats.id).update_one(**{f"inc__{k}": v for k, v in inc_dict.items()})
+        response = {"message": "User created. OTP sent to email."}
+        if "profile_picture" in request.FILES:
+            # uploaded in the background, the URL is set once storage answers
+            job = queue_upload(
+                request.FILES["profile_picture"], owner=user, target="profile_picture",
+                target_id=user.id, folder="iiuc_connect_profiles",
+            )
+            response["upload"] = job.summary()
 
-        user.save()
         create_and_send_otp(user)
-        return Response({"message": "User created. OTP sent to email."}, status=201)
+        return Response(response, status=201)
 
 
 # Login
@@ -154,12 +120,14 @@ class LoginAPIView(APIView):
         if not user:
             return Response({"error": "Invalid credentials"}, status=401)
 
-        if not user.check_password(data["password"]):
-            try:
-                user.otp_count = (user.otp_count or 0) + 1
-            except Exception:
-                user.otp_count = 1
-            user.save()
+        try:
+            password_ok = user.check_password(data["password"])
+        except HashingPoolBusy:
+            return Response({"error": "Server busy, please try again"}, status=503)
+
+        if not password_ok:
+            # Single atomic $inc instead of read-modify-save
+            User.objects(id=user.id).update_one(inc__otp_count=1)
             return Response({"error": "Invalid credentials"}, status=401)
 
 
@@ -168,12 +136,15 @@ class LoginAPIView(APIView):
         if user.is_active != "yes":
             return Response({"error": "Email is from outside. wait for admin activation."}, status=401)
 
-        try:
-            user.otp_count = 0
-        except Exception:
+        # No write at all when the failure counter is already clear
+        if user.otp_count:
+            User.objects(id=user.id, otp_count__ne=0).update_one(set__otp_count=0)
             user.otp_count = 0
-        user.save()
-        token = generate_jwt(user.id, days=7)
+        try:
+            user.rehash_password_if_needed(data["password"])
+        except HashingPoolBusy:
+            pass  # the password is already verified; upgrade the hash on a later login
+        token = generate_jwt(user, days=7)
         profile_data = ProfileSerializer(user).data
 
         return Response({"token": token, "user": profile_data})
@@ -181,15 +152,7 @@ class LoginAPIView(APIView):
     
 class countuserAPIView(APIView):
     def get(self, request):
-        stats = Stats.objects.first()
-        data = {
-            "total_users": stats.total_users if stats else 0,
-            "verified_users": stats.verified_users if stats else 0,
-            "teacher": stats.teacher if stats else 0,
-            "department": stats.department if stats else 0,
-            "student": stats.student if stats else 0
-        }
-        return Response(data)
+        return Response(read_stats())
 
 # Verify OTP
 class VerifyOTPAPIView(APIView):
@@ -203,45 +166,23 @@ class VerifyOTPAPIView(APIView):
         email = serializer.validated_data["email"]
         otp = serializer.validated_data["otp"]
 
-        user = User.objects(email=email).first()
+        user = User.objects(email=email).only("id", "email", "name", "is_active").first()
         if not user:
             return Response({"error": "User not found"}, status=404)
 
-        if not user.otp or user.otp != otp:
-            try:
-                user.otp_count = (user.otp_count or 0) + 1
-            except Exception:
-                user.otp_count = 1
-            user.save()
+        result = verify_otp(user, otp)
+        if result == "invalid":
             return Response({"error": "Invalid OTP"}, status=400)
+        if result == "expired":
+            return Response({"error": "OTP expired or too many attempts. Please request a new OTP."}, status=400)
 
-        # (10 minutes)
-        if not user.otp_created_at:
-            return Response({"error": "OTP timestamp missing"}, status=400)
-
-
-        now = timezone.now()
-        
-        try:
-            if timezone.is_naive(user.otp_created_at):
-                from django.utils import timezone as tz_util
-                user_ts = tz_util.make_aware(user.otp_created_at)
-            else:
-                user_ts = user.otp_created_at
-        except Exception:
-            user_ts = user.otp_created_at
-
-        ttl = datetime.timedelta(minutes=10)
-        if now > user_ts + ttl:
-            return Response({"error": "OTP expired"}, status=400)
-
-
-        # verified
-        user.otp_count = '0'
-        user.is_verified = "yes"
-        user.otp = None
-        user.otp_created_at = None
-        user.save()
+        # verified (also drops OTP fields left on legacy user documents)
+        User.objects(id=user.id).update_one(__raw__={
+            "$set": {"is_verified": "yes", "otp_count": 0},
+            "$unset": {"otp": "", "otp_created_at": ""},
+        })
+        User.invalidate_caches(user.id)
+        increment_stats(verified_users=1)
         if user.is_active != "yes":
             for a in User.objects(role="admin", is_active="yes"):
                 create_notification(
@@ -277,34 +218,19 @@ class ResendOTPAPIView(APIView):
         if not email:
             return Response({"error": "Email is required"}, status=400)
 
-        user = User.objects(email=email).first()
+        user = User.objects(email=email).only("id", "email", "is_verified").first()
         if not user:
             return Response({"error": "User not found"}, status=404)
 
         if user.is_verified == "yes":
             return Response({"message": "Email already verified."}, status=200)
 
-        # 1-minute cooldown protection
-        if user.otp_created_at:
-            cooldown = datetime.timedelta(minutes=1)
-            now = timezone.now()
-
-            try:
-                user_ts = user.otp_created_at
-                if timezone.is_naive(user_ts):
-                    from django.utils import timezone as tz_util
-                    user_ts = tz_util.make_aware(user_ts)
-            except Exception:
-                user_ts = user.otp_created_at
-
-            delta = (user_ts + cooldown) - now
-            remaining = int(delta.total_seconds()) if delta.total_seconds() > 0 else 0
-            if remaining > 0:
-                return Response({"error": f"Please wait {remaining} seconds before requesting a new OTP."}, status=429)
-
+        # 1-minute cooldown, enforced by the OTPChallenge upsert
         try:
-            create_and_send_otp(user)
+            create_and_send_otp(user, enforce_cooldown=True)
             return Response({"message": "A new OTP has been sent to your email."}, status=200)
+        except OTPCooldown as e:
+            return Response({"error": str(e)}, status=429)
         except Exception as e:
             return Response({"error": "Failed to resend OTP", "detail": str(e)}, status=500)
 
@@ -315,7 +241,10 @@ class ProfileAPIView(APIView):
 
 
     def get(self, request):
-        user = request.user
+        # Claims only carry role/department/batch; profile fields come from the identity cache
+        user = user_cache.get_user(request.user.id)
+        if not user:
+            return Response({"error": "User not found"}, status=404)
 
         data = {
             "id": str(user.id),
@@ -326,17 +255,22 @@ class ProfileAPIView(APIView):
             "department": user.department.code if user.department else None,
             "batch": user.batch,
             "profile_picture": user.profile_picture,
+            "profile_picture_thumb": user.profile_picture_thumb,
             "is_verified": user.is_verified,
             "is_active": user.is_active
         }
         return Response(data)
 
     def put(self, request):
-        user = request.user
+        # request.user is a cached read-only projection; load the full document to write
+        user = User.objects(id=request.user.id).first()
+        if not user:
+            return Response({"error": "User not found"}, status=404)
         serializer = ProfileUpdateSerializer(data=request.data, partial=True)
         if not serializer.is_valid():
             return Response(serializer.errors, status=400)
         send ='notification'
+        lost_verification = False
         validated = serializer.validated_data
         for field in ["name", "batch"]:
             if field in validated:
@@ -349,32 +283,33 @@ class ProfileAPIView(APIView):
             if new_email != user.email:
                 if User.objects(email=new_email).first():
                     return Response({"error": "Email already in use"}, status=400)
+                lost_verification = user.is_verified == "yes"
                 user.email = new_email
                 user.is_verified = "no"
                 user.is_active = "no"
                 user.email_change_count = max(0, user.email_change_count - 1)
+                user.revoke_tokens()
                 send = 'new_email'
                 create_and_send_otp(user)        
         if "department" in validated:
             code = validated["department"]
-            dept = Department.objects(code=code).first()
+            dept = department_registry.get_by_code(code)
             if not dept:
                 return Response({"error": "Invalid department code"}, status=400)
+            if user.department != dept:
+                user.revoke_tokens()
             user.department = dept
             send = 'new_Department'
 
+        upload = None
         if "profile_picture" in request.FILES:
-            try:
-                if user.profile_picture and len(user.profile_picture) > 10:
-                    try:
-                        old_id = extract_public_id(user.profile_picture)
-                        delete_image(old_id)
-                    except Exception:
-                        pass
-                user.profile_picture = upload_image(request.FILES["profile_picture"])
-                send = 'new_profile_picture'
-            except Exception as e:
-                return Response({"error": "Image upload failed", "detail": str(e)}, status=500)
+            # The old picture is deleted by the upload handler once the new one is live
+            upload = queue_upload(
+                request.FILES["profile_picture"], owner=user, target="profile_picture",
+                target_id=user.id, folder="iiuc_connect_profiles",
+                params={"previous": user.profile_picture or "", "previous_thumb": user.profile_picture_thumb or ""},
+            )
+            send = 'new_profile_picture'
             create_notification(
                 user=user,  # pass the full user object
                 title=f"{send} updated",
@@ -383,7 +318,15 @@ class ProfileAPIView(APIView):
             )
 
         user.save()
-        return Response({"message": "Profile updated successfully"})
+        if lost_verification:
+            increment_stats(verified_users=-1)
+        response = {"message": "Profile updated successfully"}
+        if upload:
+            response["upload"] = upload.summary()
+        if user.token_version != request.user.token_version:
+            # Claims changed: previous tokens are revoked, hand out a fresh one
+            response["token"] = generate_jwt(user, days=7)
+        return Response(response)
     
     
 
@@ -403,7 +346,7 @@ class DepartmentCreateAPIView(APIView):
             return Response(serializer.errors, status=400)
 
         data = serializer.validated_data
-        if Department.objects(name=data["name"]).first() or Department.objects(code=data["code"]).first():
+        if department_registry.get_by_name(data["name"]) or department_registry.get_by_code(data["code"]):
             return Response({"error": "Department already exists"}, status=400)
 
         dept = Department(
@@ -411,22 +354,63 @@ class DepartmentCreateAPIView(APIView):
             code=data["code"],
             is_active="yes"
         )
-# Safe Stats update for department increment
-        stats = Stats.objects.first()
-        if not stats:
-            stats = Stats()
-            stats.save()
+        try:
+            dept.save()
+        except NotUniqueError:
+            # created by another worker since our registry last refreshed
+            return Response({"error": "Department already exists"}, status=400)
+        increment_stats(department=1)
+        return Response({"message": "Department created successfully"}, status=201)
 
-# Ensure the field exists
-        if not hasattr(stats, "department") or stats.department is None:
-            stats.department = 0
 
-# Atomic increment
-        Stats.objects(id=stats.id).update_one(inc__department=1)
+# Admin: bulk import students / teachers from CSV or XLSX
+class UserImportAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
 
+    def post(self, request):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        file_obj = request.FILES.get("file")
+        if not file_obj:
+            return Response({"error": "File missing"}, status=400)
+        role = request.data.get("role", "student")
+        if role not in ("student", "teacher"):
+            return Response({"error": "Invalid role"}, status=400)
+
+        options = {
+            "default_role": role,
+            "send_otp": request.data.get("send_otp", "true") not in ("0", "false", "False"),
+            "dry_run": request.data.get("dry_run") in ("1", "true", "True"),
+            "max_rows": getattr(settings, "IMPORT_MAX_ROWS", 50000),
+        }
+        # small files are imported right away, larger ones become a job to poll
+        sync_max = getattr(settings, "IMPORT_SYNC_MAX_ROWS", 100)
+        try:
+            rows = read_rows(file_obj, file_obj.name)
+            head = list(islice(rows, sync_max + 1))
+            rows.close()
+            if len(head) > sync_max:
+                file_obj.seek(0)
+                job = queue_import(file_obj, owner=request.user, **options)
+                return Response(job.summary(), status=202)
+            report = UserImporter(shared_pool=True, **options).run(head)
+        except ImportFileError as e:
+            return Response({"error": str(e)}, status=400)
+        except HashingPoolBusy:
+            return Response({"error": "Server busy, please try again"}, status=503)
+        return Response(report, status=200 if report["dry_run"] else 201)
+
+
+class ImportStatusAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
 
-        dept.save()
-        return Response({"message": "Department created successfully"}, status=201)
+    def get(self, request, pk):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        job = ImportJob.objects(id=pk).first() if ObjectId.is_valid(pk) else None
+        if not job:
+            return Response({"error": "Import not found"}, status=404)
+        return Response(job.summary())
 
 
 #Admin: List inactive users + activate
@@ -439,6 +423,10 @@ class InactiveUsersAPIView(APIView):
             return Response({"error": "Permission denied"}, status=403)
 
         inactive_users = User.objects(is_active="no")
+        paginator = MongoCursorPagination()
+        page = paginator.paginate_queryset(inactive_users, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(UserActivationSerializer(page, many=True).data)
         serializer = UserActivationSerializer(inactive_users, many=True)
         return Response(serializer.data)
 
@@ -452,17 +440,114 @@ class InactiveUsersAPIView(APIView):
             return Response({"error": "User not found"}, status=404)
 
         user.is_active = "yes"
+        user.revoke_tokens()
         user.save()
         return Response({"message": "User activated successfully"})
 
+# Admin: activate or reject many pending users at once
+class BulkUserActivationAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
+    MAX_USERS = 5000
+
+    def _pending_query(self, data):
+        """Inactive users selected by `ids` or by `filter` (department code, role, email domain)."""
+        query = User.objects(is_active="no")
+        ids = data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not ids:
+                raise ValueError("ids must be a non-empty list")
+            try:
+                return query.filter(id__in=[ObjectId(i) for i in ids])
+            except (InvalidId, TypeError):
+                raise ValueError("Invalid user id in ids")
+
+        filters = data.get("filter")
+        if not isinstance(filters, dict) or not filters:
+            raise ValueError("Provide ids or a filter")
+        if filters.get("department"):
+            dept = department_registry.get_by_code(filters["department"])
+            if not dept:
+                raise ValueError("Invalid department code")
+            query = query.filter(department=dept.id)
+        if filters.get("role"):
+            if filters["role"] not in ("student", "teacher"):
+                raise ValueError("Invalid role")
+            query = query.filter(role=filters["role"])
+        if filters.get("email_domain"):
+            query = query.filter(email__iendswith="@" + filters["email_domain"].lstrip("@"))
+        return query
+
+    def post(self, request):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        action = request.data.get("action")
+        if action not in ("activate", "reject"):
+            return Response({"error": "action must be 'activate' or 'reject'"}, status=400)
+        try:
+            query = self._pending_query(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        users = list(query.only("id", "name", "email", "role", "is_verified").limit(self.MAX_USERS + 1).as_pymongo())
+        if len(users) > self.MAX_USERS:
+            return Response({"error": f"More than {self.MAX_USERS} users match, narrow the selection"}, status=400)
+        if not users:
+            return Response({"action": action, "matched": 0, "modified": 0})
+        ids = [u["_id"] for u in users]
+
+        if action == "activate":
+            # one update_many; bumping token_version revokes the old is_active claim
+            result = User.objects(id__in=ids, is_active="no").update(
+                set__is_active="yes", inc__token_version=1, full_result=True
+            )
+            matched, modified = result.matched_count, result.modified_count
+            create_notifications(
+                ids,
+                title="Account activated",
+                message="Your account has been activated by an admin. You can now log in.",
+            )
+        else:
+            matched = modified = User.objects(id__in=ids, is_active="no").delete()
+            OTPChallenge.objects(user__in=ids).delete()
+            enqueue_emails(
+                (u["email"], "IIUC Connect registration",
+                 f"Hello {u.get('name', '')},\n\nYour IIUC Connect registration was not approved.")
+                for u in users
+            )
+            roles = {}
+            for u in users:
+                roles[u.get("role", "student")] = roles.get(u.get("role", "student"), 0) - 1
+            increment_stats(
+                total_users=-len(users),
+                verified_users=-sum(1 for u in users if u.get("is_verified") == "yes"),
+                **roles,
+            )
+
+        for user_id in ids:
+            User.invalidate_caches(user_id)
+
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            "admin_inactive_users",
+            {
+                "type": "inactive_users_batch",
+                "event": "users_activated" if action == "activate" else "users_rejected",
+                "data": [{"id": str(u["_id"]), "name": u.get("name"), "email": u.get("email")} for u in users],
+            }
+        )
+        return Response({"action": action, "matched": matched, "modified": modified})
+
+
 # List active departments (all users can access)
 class DepartmentListAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        departments = Department.objects(is_active="yes")
-        serializer = DepartmentListSerializer(departments, many=True)
-        return Response(serializer.data)
+        # Serialized once per registry reload; clients revalidate with If-None-Match
+        payload, etag = department_registry.active_list()
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=304, headers={"ETag": etag})
+        return Response(payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 class TeacherListAPIView(APIView):
     authentication_classes = (JWTAuthentication,)
@@ -471,9 +556,35 @@ class TeacherListAPIView(APIView):
         if request.user.role != "admin":
             return Response({"error": "Permission denied"}, status=403)
 
-        teachers = User.objects(role="teacher")
+        teachers = User.objects(role="teacher").exclude("password_hash")
+        paginator = MongoCursorPagination()
+        page = paginator.paginate_queryset(teachers, request, view=self)
+        if page is not None:
+            prefetch_references(page, "department", only={"department": ("name",)})
+            return paginator.get_paginated_response(TeacherListSerializer(page, many=True).data)
+        teachers = prefetch_references(teachers, "department", only={"department": ("name",)})
         serializer = TeacherListSerializer(teachers, many=True)
         return Response({
             "count": len(teachers),
             "teachers": serializer.data
         })
+
+
+# Admin: identity cache counters
+class AuthCacheStatsAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
+
+    def get(self, request):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        return Response(user_cache.stats())
+
+
+# Admin: password hashing pool metrics
+class PasswordHashingStatsAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
+
+    def get(self, request):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        return Response(password_hasher.stats())
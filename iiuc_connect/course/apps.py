@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CourseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'course'
+
+    def ready(self):
+        from .checks import check_registration_index_at_startup, registration_index_check
+
+        check_registration_index_at_startup()
+        checks.register(registration_index_check)
@@ -0,0 +1,60 @@
+# course/checks.py
+import logging
+
+from django.core import checks
+from pymongo.errors import PyMongoError
+
+from .models import CourseRegistration
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_HINT = "Run `python manage.py dedupe_registrations`, then restart."
+
+# duplicate (student, course) pairs found at startup, None when the index is fine
+_duplicate_pairs = None
+
+
+def duplicate_registration_pairs():
+    """
+    0 when course_registrations has its unique (student, course) index or
+    MongoEngine can still build it; otherwise the number of duplicate pairs
+    that make the index build (and with it every CourseRegistration query) fail.
+    """
+    # raw collection: _get_collection() would try to build the index itself
+    collection = CourseRegistration._get_db()[CourseRegistration._get_collection_name()]
+    for index in collection.index_information().values():
+        if index.get("unique") and [field for field, _ in index["key"]] == ["student", "course"]:
+            return 0
+    counted = list(collection.aggregate([
+        {"$group": {"_id": {"student": "$student", "course": "$course"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$count": "pairs"},
+    ], allowDiskUse=True))
+    return counted[0]["pairs"] if counted else 0
+
+
+def check_registration_index_at_startup():
+    global _duplicate_pairs
+    try:
+        pairs = duplicate_registration_pairs()
+    except PyMongoError as e:
+        logger.warning("Could not check the course_registrations indexes: %s", e)
+        return
+    _duplicate_pairs = pairs or None
+    if pairs:
+        logger.error(
+            "course_registrations has %d duplicate (student, course) pairs, so its unique index "
+            "cannot be built and registration queries will fail. %s", pairs, DEDUPE_HINT,
+        )
+
+
+def registration_index_check(app_configs, **kwargs):
+    """Blocks runserver/migrate/check while duplicates keep the unique index from being built."""
+    if not _duplicate_pairs:
+        return []
+    return [checks.Error(
+        f"course_registrations has {_duplicate_pairs} duplicate (student, course) pairs; "
+        "the unique registration index cannot be built.",
+        hint=DEDUPE_HINT,
+        id="course.E001",
+    )]
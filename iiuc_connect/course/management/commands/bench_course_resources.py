@@ -0,0 +1,109 @@
+# course/management/commands/bench_course_resources.py
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.departments import department_registry
+from accounts.models import User
+from course.models import Course, CourseRegistration, Payment
+from course.resources import resource_counts
+from course.views import CourseResourcesAPIView
+from iiuc_connect.mongo_metrics import count_commands
+
+
+def legacy_allcheck(user):
+    """The pre-change per-registration loop of CourseResourcesAPIView, for comparison."""
+    data, seen = [], set()
+    for reg in CourseRegistration.objects(student=user, status="confirmed"):
+        if user.role == "student" and not Payment.objects(registration=reg, status="completed").first():
+            continue
+        course = reg.course
+        if course.id in seen:
+            continue
+        seen.add(course.id)
+        data.append({
+            "id": str(course.id),
+            "course_code": course.course_code,
+            "department": str(course.department.name) if course.department else None,
+            "credit_hour": course.credit_hour,
+            "resource_counts": resource_counts(course),
+        })
+    return data
+
+
+class Command(BaseCommand):
+    help = "Compare Mongo round trips and latency of /course/allcheck/ per role, before and after."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=8, help="Confirmed registrations per user")
+        parser.add_argument("--runs", type=int, default=200)
+
+    def handle(self, *args, **options):
+        departments = department_registry.all()
+        if not departments:
+            raise CommandError("Create at least one department first")
+
+        tag = uuid.uuid4().hex[:8]
+        courses = Course.objects.insert([
+            Course(course_code=f"BENCH-{tag}-{i}", department=departments[i % len(departments)], credit_hour=3)
+            for i in range(options["courses"])
+        ])
+        users = {}
+        for role in ("student", "teacher"):
+            user = User(
+                student_id=f"BENCH-{tag}-{role}",
+                email=f"bench-{tag}-{role}@ugrad.iiuc.ac.bd",
+                name=f"Allcheck Bench {role}",
+                role=role,
+                is_verified="yes",
+                is_active="yes",
+            )
+            user.set_password(uuid.uuid4().hex)
+            user.save()
+            regs = CourseRegistration.objects.insert([
+                CourseRegistration(student=user, course=course, section="A", status="confirmed")
+                for course in courses
+            ])
+            if role == "student":
+                # every other course paid
+                Payment.objects.insert([
+                    Payment(registration=reg, amount=1000, method="bkash",
+                            status="completed" if i % 2 == 0 else "pending")
+                    for i, reg in enumerate(regs)
+                ])
+            users[role] = user
+
+        view = CourseResourcesAPIView.as_view()
+        factory = APIRequestFactory()
+
+        def current(user):
+            request = factory.get("/api/course/allcheck/")
+            force_authenticate(request, user=user)
+            return view(request)
+
+        try:
+            for role, user in users.items():
+                for label, fn in (("before", legacy_allcheck), ("after", current)):
+                    self._run(role, label, fn, user, options["runs"])
+        finally:
+            for user in users.values():
+                user.delete()
+            Course.objects(id__in=[c.id for c in courses]).delete()
+
+    def _run(self, role, label, fn, user, runs):
+        fn(user)  # warm up the department registry / connection pool
+        samples, commands = [], 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            with count_commands() as tally:
+                fn(user)
+            samples.append((time.perf_counter() - started) * 1000)
+            commands += tally.total
+        p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+        self.stdout.write(
+            f"{role:<8} {label:<6} round_trips={commands / runs:5.1f} "
+            f"p50={statistics.median(samples):7.2f}ms p95={p95:7.2f}ms"
+        )
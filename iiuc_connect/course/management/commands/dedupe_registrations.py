@@ -0,0 +1,64 @@
+# course/management/commands/dedupe_registrations.py
+from django.core.management.base import BaseCommand, CommandError
+
+from course.models import CourseRegistration, Payment
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove duplicate (student, course) registrations so the unique index can be built. "
+        "Keeps the one with a payment, else a confirmed one, else the oldest. Duplicates where "
+        "more than one row has a payment are only reported, never deleted."
+    )
+    # must run while the course.E001 check still fails
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        # raw collection: _get_collection() would try to build the unique index first
+        collection = CourseRegistration._get_db()[CourseRegistration._get_collection_name()]
+        payments = Payment._get_collection()
+        groups = collection.aggregate([
+            {"$group": {
+                "_id": {"student": "$student", "course": "$course"},
+                "ids": {"$push": {"id": "$_id", "status": "$status"}},
+                "count": {"$sum": 1},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+
+        losers, conflicts = [], []
+        for group in groups:
+            ids = [entry["id"] for entry in group["ids"]]
+            paid = {}
+            for doc in payments.find({"registration": {"$in": ids}}, {"registration": 1, "status": 1}):
+                paid[doc["registration"]] = doc.get("status")
+            if len(paid) > 1:
+                # Payment.registration is unique, so these cannot be merged into one row
+                conflicts.append((group["_id"], paid))
+                continue
+            ranked = sorted(
+                group["ids"],
+                key=lambda entry: (entry["id"] not in paid, entry.get("status") != "confirmed", entry["id"]),
+            )
+            losers += [entry["id"] for entry in ranked[1:]]
+
+        if losers and not options["dry_run"]:
+            # only rows without payments are dropped
+            collection.delete_many({"_id": {"$in": losers}})
+        self.stdout.write(
+            f"dedupe_registrations: removed={len(losers)}{' (dry run)' if options['dry_run'] else ''}"
+        )
+
+        for key, paid in conflicts:
+            rows = ", ".join(f"{reg_id} ({status})" for reg_id, status in paid.items())
+            self.stdout.write(f"  student={key['student']} course={key['course']}: payments on {rows}")
+        if conflicts:
+            raise CommandError(
+                f"{len(conflicts)} duplicate pairs have payments on more than one registration; "
+                "resolve them by hand (refund / delete one payment), then run this again"
+            )
+        if not options["dry_run"]:
+            CourseRegistration.ensure_indexes()
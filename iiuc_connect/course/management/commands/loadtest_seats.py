@@ -0,0 +1,115 @@
+# course/management/commands/loadtest_seats.py
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.departments import department_registry
+from accounts.models import User
+from course.models import Course, CourseRegistration, SectionCapacity
+from course.registrations import cancel_registration, register_courses
+from course.seats import HOLDS_SEAT, seats_for, set_capacity
+
+
+class _Student:
+    """register_courses only needs the id."""
+
+    def __init__(self, pk):
+        self.id = pk
+
+
+class Command(BaseCommand):
+    help = (
+        "Race N students for a section of C seats, then cancel seat holders and waitlisted students "
+        "concurrently (so cancels race promotions), "
+        "and check that seats are never oversold, counters match and nobody waits for a free seat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=2000)
+        parser.add_argument("--capacity", type=int, default=150)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--drops", type=int, default=100, help="Seat holders, and as many waitlisted students, who cancel afterwards")
+
+    def handle(self, *args, **options):
+        departments = department_registry.all()
+        if not departments:
+            raise CommandError("Create at least one department first")
+        tag = uuid.uuid4().hex[:8]
+        course = Course(course_code=f"SEATS-{tag}", department=departments[0], credit_hour=3)
+        course.save()
+        student_ids = [ObjectId() for _ in range(options["students"])]
+        User._get_collection().insert_many([
+            {"_id": pk, "student_id": f"SEATS-{tag}-{i}", "email": f"seats-{tag}-{i}@ugrad.iiuc.ac.bd",
+             "name": "Seat Load Test", "role": "student", "is_active": "yes"}
+            for i, pk in enumerate(student_ids)
+        ])
+        set_capacity(course.id, "A", options["capacity"])
+
+        try:
+            self._register(course, student_ids, options["concurrency"])
+            self._check(course, "after registration")
+            self._drop(course, options["drops"], options["concurrency"])
+            self._check(course, "after cancellations")
+        finally:
+            CourseRegistration._get_collection().delete_many({"course": course.id})
+            SectionCapacity._get_collection().delete_many({"course": course.id})
+            User._get_collection().delete_many({"_id": {"$in": student_ids}})
+            Course.objects(id=course.id).delete()
+
+    def _timed(self, label, fn, items, concurrency):
+        def one(item):
+            started = time.perf_counter()
+            fn(item)
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(one, items))
+        elapsed = time.perf_counter() - started
+        p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+        self.stdout.write(
+            f"{label:<13} n={len(samples)} {len(samples) / elapsed:,.0f}/s "
+            f"p50={statistics.median(samples):.1f}ms p95={p95:.1f}ms"
+        )
+
+    def _register(self, course, student_ids, concurrency):
+        item = [{"course": str(course.id), "section": "A"}]
+        self._timed("register", lambda pk: register_courses(_Student(pk), item), student_ids, concurrency)
+
+    def _drop(self, course, count, concurrency):
+        registrations = CourseRegistration._get_collection()
+        holders = list(registrations.find(
+            {"course": course.id, "status": {"$in": list(HOLDS_SEAT)}}, {"student": 1}
+        ))
+        waiting = list(registrations.find({"course": course.id, "status": "waitlisted"}, {"student": 1}))
+        # waitlisted rows cancel while the holders' cancels promote them
+        victims = random.sample(holders, min(count, len(holders)))
+        victims += random.sample(waiting, min(count, len(waiting)))
+        random.shuffle(victims)
+
+        # what CourseRegistrationViewSet.destroy does
+        self._timed("cancel", lambda reg: cancel_registration(reg["student"], reg["_id"]), victims, concurrency)
+
+    def _check(self, course, label):
+        registrations = CourseRegistration._get_collection()
+        holding = registrations.count_documents({"course": course.id, "status": {"$in": list(HOLDS_SEAT)}})
+        waiting = registrations.count_documents({"course": course.id, "status": "waitlisted"})
+        seats = seats_for(course.id, section="A")[0]
+        problems = []
+        if holding > seats["capacity"]:
+            problems.append(f"oversold: {holding} seat holders for {seats['capacity']} seats")
+        if holding != seats["taken"]:
+            problems.append(f"taken counter {seats['taken']} != {holding} seat holders")
+        if waiting != seats["waitlisted"]:
+            problems.append(f"waitlisted counter {seats['waitlisted']} != {waiting} waitlisted")
+        if waiting and holding < seats["capacity"]:
+            problems.append(f"{seats['capacity'] - holding} free seats while {waiting} wait")
+        self.stdout.write(f"{label}: holding={holding} waitlisted={waiting} counters={seats}")
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS(f"{label}: consistent"))
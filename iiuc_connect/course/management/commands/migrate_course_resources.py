@@ -0,0 +1,90 @@
+# course/management/commands/migrate_course_resources.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from pymongo import UpdateOne
+
+from course.models import RESOURCE_CATEGORIES, Course, CourseResource
+
+
+class Command(BaseCommand):
+    help = "Move the legacy resource URL arrays on courses into the course_resources collection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Courses per bulk write")
+        parser.add_argument("--dry-run", action="store_true", help="Count what would move, write nothing")
+
+    def _flush(self, docs, updates):
+        if docs:
+            CourseResource._get_collection().insert_many(docs, ordered=False)
+        if updates:
+            Course._get_collection().bulk_write(updates, ordered=False)
+
+    def _migrate(self, batch, base, dry_run):
+        """Move one batch of legacy course documents; returns (moved, already migrated)."""
+        # rerunnable: URLs already migrated are not inserted twice; one lookup per batch
+        existing = {}
+        for row in CourseResource._get_collection().find(
+            {"course": {"$in": [course["_id"] for course in batch]}}, {"course": 1, "category": 1, "url": 1}
+        ):
+            existing.setdefault(row["course"], set()).add((row["category"], row["url"]))
+
+        docs, updates, skipped = [], [], 0
+        for course in batch:
+            known = existing.get(course["_id"], set())
+            counts = {}
+            for category in RESOURCE_CATEGORIES:
+                urls = [url for url in course.get(category) or [] if url]
+                for i, url in enumerate(urls):
+                    if (category, url) in known:
+                        skipped += 1
+                        continue
+                    docs.append({
+                        "course": course["_id"],
+                        "category": category,
+                        "url": url,
+                        "created_at": base - timedelta(milliseconds=len(urls) - i),
+                    })
+                    known.add((category, url))
+                counts[category] = sum(1 for key in known if key[0] == category)
+            updates.append(UpdateOne(
+                {"_id": course["_id"]},
+                {"$set": {"resource_counts": counts}, "$unset": {category: "" for category in RESOURCE_CATEGORIES}},
+            ))
+        if not dry_run:
+            self._flush(docs, updates)
+        return len(docs), skipped
+
+    def handle(self, *args, **options):
+        courses = Course._get_collection()
+        legacy = {"$or": [{category: {"$exists": True}} for category in RESOURCE_CATEGORIES]}
+        projection = {category: 1 for category in RESOURCE_CATEGORIES}
+
+        # arrays were appended to, so later entries get later timestamps
+        # and come first in the newest-first listing
+        base = timezone.now()
+        moved = courses_done = skipped = 0
+        batch = []
+        for course in courses.find(legacy, projection).batch_size(options["batch_size"]):
+            batch.append(course)
+            courses_done += 1
+            if len(batch) >= options["batch_size"]:
+                done, already = self._migrate(batch, base, options["dry_run"])
+                moved, skipped, batch = moved + done, skipped + already, []
+        if batch:
+            done, already = self._migrate(batch, base, options["dry_run"])
+            moved, skipped = moved + done, skipped + already
+
+        self.stdout.write(
+            f"migrate_course_resources: courses={courses_done} resources={moved} "
+            f"already_migrated={skipped}{' (dry run)' if options['dry_run'] else ''}"
+        )
+        remaining = courses.count_documents(legacy)
+        if remaining:
+            self.stdout.write(f"  {remaining} courses still carry legacy resource arrays")
+        elif not getattr(settings, "COURSE_RESOURCES_MIGRATED", False):
+            self.stdout.write(self.style.WARNING(
+                "  every course is migrated: set COURSE_RESOURCES_MIGRATED=True so Course is strict again"
+            ))
@@ -1,17 +1,19 @@
 import mongoengine as me
-from accounts.models import Department, User 
+from accounts.models import DepartmentReferenceField, User
+from django.conf import settings
+from django.utils import timezone
+from search.index import mark_dirty
 
 
 class Course(me.Document):
     course_code = me.StringField(required=True, unique=True, max_length=20)  # Indexed unique
-    department = me.ReferenceField(Department, reverse_delete_rule=me.CASCADE, required=True)  # FK relation
+    department = DepartmentReferenceField(reverse_delete_rule=me.CASCADE, required=True)  # FK relation
     credit_hour = me.IntField(required=True, min_value=0, max_value=5)
 
-    # Cloudinary resource links (List of URLs)
-    mid_theory_resources = me.ListField(me.URLField(), default=list)        # List of URLs
-    mid_previous_solves = me.ListField(me.URLField(), default=list)
-    final_resources = me.ListField(me.URLField(), default=list)
-    final_previous_solves = me.ListField(me.URLField(), default=list)
+    # Resources live in CourseResource; the course only keeps per-category counts.
+    # Legacy URL arrays are moved out by `manage.py migrate_course_resources`.
+    resource_counts = me.DictField()            # {category: count}
+    resources_version = me.IntField(default=0)  # bumped by every resource change
 
     meta = {
         "collection": "courses",
@@ -20,27 +22,105 @@ class Course(me.Document):
             "department",
         ],
         "ordering": ["course_code"],  # Default sort by course_code
+        # Unmigrated documents still carry the URL arrays; once
+        # migrate_course_resources reports none left, set
+        # COURSE_RESOURCES_MIGRATED=True to validate fields strictly again
+        "strict": getattr(settings, "COURSE_RESOURCES_MIGRATED", False),
     }
 
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        mark_dirty("courses", [self.pk])
+        return result
+
+    def delete(self, *args, **kwargs):
+        mark_dirty("courses", [self.pk])
+        return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"{self.course_code} ({self.department.name})"
 
+RESOURCE_CATEGORIES = (
+    "mid_theory_resources",
+    "mid_previous_solves",
+    "final_resources",
+    "final_previous_solves",
+)
+
+
+class CourseResource(me.Document):
+    """One uploaded file of a course, listed newest first per category."""
+    course = me.ReferenceField(Course, reverse_delete_rule=me.CASCADE, required=True)
+    category = me.StringField(choices=RESOURCE_CATEGORIES, required=True)
+    url = me.StringField(required=True)
+    original_name = me.StringField()
+    size = me.IntField()
+    content_type = me.StringField()
+    sha256 = me.StringField()
+    uploaded_by = me.ReferenceField(User)
+    created_at = me.DateTimeField(default=timezone.now)
+    updated_at = me.DateTimeField()
+
+    meta = {
+        "collection": "course_resources",
+        "indexes": [
+            ("course", "category", "-created_at"),
+            ("course", "url"),
+        ],
+    }
+
+
 class CourseRegistration(me.Document):
     student = me.ReferenceField(User, reverse_delete_rule=me.CASCADE, required=True)
     course = me.ReferenceField(Course, reverse_delete_rule=me.CASCADE, required=True)
-    status = me.StringField(choices=["pending", "confirmed"], default="pending")
+    # waitlisted: the section was full; promoted to pending when a seat frees up
+    status = me.StringField(choices=["pending", "confirmed", "waitlisted"], default="pending")
     section = me.StringField(required=True)
+    waitlisted_at = me.DateTimeField()
+    # the teacher's own registration (routine auto-registration): outside the seat counters
+    teaching = me.BooleanField(default=False)
 
     meta = {
         "collection": "course_registrations",
-        "indexes": ["student", "course", "status"],
-        "unique_together": [("student", "course")]
+        "indexes": [
+            "student",
+            "course",
+            "status",
+            ("student", "status", "course"),  # a user's confirmed courses (allcheck)
+            ("course", "section", "status", "waitlisted_at"),  # next in line for a freed seat
+            # one registration per student and course; course/checks.py logs an
+            # error at startup (and fails the system checks) while duplicates
+            # block it, until `manage.py dedupe_registrations` has run
+            {"fields": ["student", "course"], "unique": True},
+        ],
     }
 
     def __str__(self):
         return f"{self.student.email} → {self.course.course_code} ({self.status})"
 
 
+class SectionCapacity(me.Document):
+    """
+    Seat counter for one course section. `taken` counts the registrations
+    holding a seat (pending or confirmed) and only moves through the
+    conditional updates in course/seats.py. Sections without a document
+    are unlimited.
+    """
+    course = me.ReferenceField(Course, reverse_delete_rule=me.CASCADE, required=True)
+    section = me.StringField(required=True)
+    capacity = me.IntField(required=True, min_value=0)
+    taken = me.IntField(default=0)
+    waitlisted = me.IntField(default=0)
+    updated_at = me.DateTimeField(default=timezone.now)
+
+    meta = {
+        "collection": "section_capacities",
+        "indexes": [
+            {"fields": ["course", "section"], "unique": True},
+        ],
+    }
+
+
 class Payment(me.Document):
     registration = me.ReferenceField(CourseRegistration, reverse_delete_rule=me.CASCADE, required=True,unique=True)
     amount = me.FloatField(required=True)
@@ -53,6 +133,7 @@ class Payment(me.Document):
         "indexes": [
             {"fields": ["registration"], "unique": True},
             "status",
+            ("registration", "status"),  # "is this registration paid" lookups
         ],
     }
 
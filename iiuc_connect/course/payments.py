@@ -0,0 +1,277 @@
+# course/payments.py
+import datetime
+import json
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from accounts.models import User
+from .models import Course, CourseRegistration, Payment
+
+
+PAYMENT_STATUSES = ("pending", "completed", "failed")
+
+
+class PaymentFilterError(ValueError):
+    pass
+
+
+def _object_id(value, name):
+    try:
+        return ObjectId(str(value))
+    except (InvalidId, TypeError):
+        raise PaymentFilterError(f"Invalid {name}")
+
+
+def _date(value, name, end=False):
+    try:
+        day = datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise PaymentFilterError(f"{name} must be a date (YYYY-MM-DD)")
+    moment = datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+    return moment + datetime.timedelta(days=1) if end else moment
+
+
+def parse_payment_filters(params):
+    """course, section, status, date_from, date_to (inclusive days, by payment creation)."""
+    filters = {}
+    if params.get("course"):
+        filters["course"] = _object_id(params["course"], "course")
+    if params.get("section"):
+        filters["section"] = params["section"]
+    if params.get("status"):
+        if params["status"] not in PAYMENT_STATUSES:
+            raise PaymentFilterError(f"Invalid status: {params['status']}")
+        filters["status"] = params["status"]
+    if params.get("date_from"):
+        filters["date_from"] = _date(params["date_from"], "date_from")
+    if params.get("date_to"):
+        filters["date_to"] = _date(params["date_to"], "date_to", end=True)
+    return filters
+
+
+def _lookup_one(document, local_field, fields, as_field):
+    """$lookup of one referenced document by _id, trimmed to `fields`."""
+    return {"$lookup": {
+        "from": document._get_collection_name(),
+        "let": {"ref": f"${local_field}"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$_id", "$$ref"]}}},
+            {"$project": {field: 1 for field in fields}},
+        ],
+        "as": as_field,
+    }}
+
+
+def _registration_source(user, filters):
+    """(collection, stages) yielding the course_registrations rows `user` may see."""
+    reg_match = {}
+    if filters.get("course"):
+        reg_match["course"] = filters["course"]
+    if filters.get("section"):
+        reg_match["section"] = filters["section"]
+
+    role = getattr(user, "role", None)
+    if role == "student":
+        return CourseRegistration, [{"$match": dict(reg_match, student=user.id)}]
+    if role != "teacher":
+        return CourseRegistration, [{"$match": reg_match}] if reg_match else []
+
+    # teachers: every registration of a course they have a routine for
+    from routine.models import Routine
+    routine_match = {"teacher": user.id}
+    if filters.get("course"):
+        routine_match["course"] = filters["course"]
+    return Routine, [
+        {"$match": routine_match},
+        {"$group": {"_id": "$course"}},
+        {"$lookup": {
+            "from": CourseRegistration._get_collection_name(),
+            "let": {"course": "$_id"},
+            "pipeline": [{"$match": dict(reg_match, **{"$expr": {"$eq": ["$course", "$$course"]}})}],
+            "as": "registration",
+        }},
+        {"$unwind": "$registration"},
+        {"$replaceRoot": {"newRoot": "$registration"}},
+    ]
+
+
+def _payment_match(filters, after=None):
+    """Conditions on the payments themselves: status, creation days, and the keyset."""
+    match = {}
+    if filters.get("status"):
+        match["status"] = filters["status"]
+    id_range = {}
+    if filters.get("date_from"):
+        id_range["$gte"] = ObjectId.from_datetime(filters["date_from"])
+    if filters.get("date_to"):
+        id_range["$lt"] = ObjectId.from_datetime(filters["date_to"])
+    if after:
+        id_range["$lt"] = min(after, id_range["$lt"]) if "$lt" in id_range else after
+    if id_range:
+        match["_id"] = id_range
+    return match
+
+
+def _scans_payments(user, filters):
+    """
+    Admins without a course / section filter see every payment: walk the
+    payments collection by _id instead of joining every registration.
+    """
+    role = getattr(user, "role", None)
+    return role not in ("student", "teacher") and not filters.get("course") and not filters.get("section")
+
+
+def _payments_of_registrations(payment_match):
+    """Stages turning registration rows into one flat row per payment."""
+    return [
+        {"$lookup": {
+            "from": Payment._get_collection_name(),
+            "let": {"registration": "$_id"},
+            "pipeline": [{"$match": dict(payment_match, **{"$expr": {"$eq": ["$registration", "$$registration"]}})}],
+            "as": "payment",
+        }},
+        {"$unwind": "$payment"},
+        {"$project": {
+            "_id": "$payment._id",
+            "registration": "$_id",
+            "registration_status": "$status",
+            "student": 1,
+            "course": 1,
+            "section": 1,
+            "amount": "$payment.amount",
+            "method": "$payment.method",
+            "status": "$payment.status",
+            "transaction_id": "$payment.transaction_id",
+        }},
+    ]
+
+
+def _registration_of_payments():
+    """Stages adding the registration fields to payment rows."""
+    return [
+        _lookup_one(CourseRegistration, "registration", ["student", "course", "section", "status"], "reg"),
+        # keep orphaned payments so a page never comes back short
+        {"$unwind": {"path": "$reg", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "registration": 1,
+            "registration_status": "$reg.status",
+            "student": "$reg.student",
+            "course": "$reg.course",
+            "section": "$reg.section",
+            "amount": 1,
+            "method": 1,
+            "status": 1,
+            "transaction_id": 1,
+        }},
+    ]
+
+
+def payment_pipeline(user, filters, page_size=None, after=None):
+    """
+    Visible payments, newest first, keyset on payments._id. Admins without
+    a course / section filter page the payments collection itself, so only
+    the page's rows are joined; everyone else starts from the registrations
+    they may see and looks their payments up through the index.
+    """
+    payment_match = _payment_match(filters, after)
+    page = [{"$sort": {"_id": -1}}]
+    if page_size:
+        page.append({"$limit": page_size + 1})
+
+    if _scans_payments(user, filters):
+        collection = Payment
+        stages = ([{"$match": payment_match}] if payment_match else []) + page + _registration_of_payments()
+    else:
+        collection, stages = _registration_source(user, filters)
+        stages += _payments_of_registrations(payment_match) + page
+    stages += [
+        _lookup_one(User, "student", ["email"], "student"),
+        _lookup_one(Course, "course", ["course_code"], "course"),
+    ]
+    return collection, stages
+
+
+def totals_pipeline(user, filters):
+    """Per-course counts and sums over every payment the listing would show."""
+    payment_match = _payment_match(filters)
+    if _scans_payments(user, filters):
+        collection = Payment
+        stages = ([{"$match": payment_match}] if payment_match else []) + [
+            _lookup_one(CourseRegistration, "registration", ["course"], "reg"),
+            {"$unwind": "$reg"},
+            {"$project": {"course": "$reg.course", "amount": 1, "status": 1}},
+        ]
+    else:
+        collection, stages = _registration_source(user, filters)
+        stages += _payments_of_registrations(payment_match)
+    stages += [
+        {"$group": {
+            "_id": "$course",
+            "payments": {"$sum": 1},
+            "amount": {"$sum": "$amount"},
+            "completed_amount": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, "$amount", 0]}},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
+        }},
+        _lookup_one(Course, "_id", ["course_code"], "course"),
+        {"$sort": {"_id": 1}},
+    ]
+    return collection, stages
+
+
+def _serialize(row):
+    email = row["student"][0]["email"] if row["student"] else None
+    code = row["course"][0]["course_code"] if row["course"] else None
+    return {
+        "id": str(row["_id"]),
+        # same text PaymentSerializer renders for the registration
+        "registration": f"{email} → {code} ({row.get('registration_status')})",
+        "registration_id": str(row["registration"]),
+        "course": str(row["course"][0]["_id"]) if row["course"] else None,
+        "section": row.get("section"),
+        "amount": row.get("amount"),
+        "method": row.get("method"),
+        "status": row.get("status"),
+        "transaction_id": row.get("transaction_id"),
+    }
+
+
+def iter_payments(user, filters):
+    """Every visible payment, serialized one at a time off the aggregation cursor."""
+    collection, pipeline = payment_pipeline(user, filters)
+    for row in collection.objects.aggregate(pipeline, allowDiskUse=True):
+        yield _serialize(row)
+
+
+def json_array(rows):
+    """Encode an iterable of rows as a JSON array, one piece per row, for StreamingHttpResponse."""
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + json.dumps(row, ensure_ascii=False)
+    yield "]"
+
+
+def list_payments(user, filters, page_size, after=None):
+    """(rows, next_after) for one page."""
+    collection, pipeline = payment_pipeline(user, filters, page_size=page_size, after=after)
+    rows = list(collection.objects.aggregate(pipeline, allowDiskUse=True))
+    next_after = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_after = rows[-1]["_id"]
+    return [_serialize(row) for row in rows], next_after
+
+
+def payment_totals(user, filters):
+    collection, pipeline = totals_pipeline(user, filters)
+    return [
+        {
+            "course": str(t["_id"]),
+            "course_code": t["course"][0]["course_code"] if t["course"] else None,
+            "payments": t["payments"],
+            "completed": t["completed"],
+            "amount": t["amount"],
+            "completed_amount": t["completed_amount"],
+        }
+        for t in collection.objects.aggregate(pipeline, allowDiskUse=True)
+    ]
@@ -0,0 +1,176 @@
+# course/registrations.py
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from django.utils import timezone
+
+from iiuc_connect.identity_map import forget
+from notification.utils import create_notifications
+from .models import Course, CourseRegistration, Payment
+from .seats import (
+    fill_free_seats, free_seat, limited_sections, registration_removed, reserve_seat, waitlist_changed,
+)
+
+
+MAX_BATCH_REGISTRATIONS = 50
+
+
+def register_courses(student, items):
+    """
+    Register `student` for many {"course", "section"} items in one round
+    trip: courses are checked with one `$in` query, then one unordered
+    bulk_write of upserts on the unique (student, course) index creates the
+    missing registrations. Items already registered are reported as
+    "exists" and left untouched, so retries are safe.
+
+    Sections with a capacity (course/seats.py) get a seat reserved per
+    item; when full the registration is created as "waitlisted". Returns
+    (results, {course_id: ids of other students promoted off its waitlist}).
+    """
+    results = [{"index": i, "course": item.get("course"), "section": item.get("section")} for i, item in enumerate(items)]
+    wanted = {}
+    for result in results:
+        try:
+            course_id = ObjectId(str(result["course"]))
+        except (InvalidId, TypeError):
+            result.update(result="error", error="Invalid course")
+            continue
+        if not result["section"]:
+            result.update(result="error", error="Section missing")
+        elif course_id in wanted:
+            result.update(result="error", error="Course listed twice")
+        else:
+            wanted[course_id] = result
+
+    known = set(Course.objects(id__in=list(wanted)).scalar("id")) if wanted else set()
+    for course_id in list(wanted):
+        if course_id not in known:
+            wanted.pop(course_id).update(result="error", error="Invalid course")
+    if not wanted:
+        return results, {}
+
+    # seats first: an item that turns out to exist gives its seat back below
+    order = list(wanted)
+    limited = limited_sections((course_id, wanted[course_id]["section"]) for course_id in order)
+    seated = {
+        course_id: reserve_seat(course_id, wanted[course_id]["section"],
+                                limited=(course_id, wanted[course_id]["section"]) in limited)
+        for course_id in order
+    }
+    now = timezone.now()
+    operations = [
+        UpdateOne(
+            {"student": student.id, "course": course_id},
+            {"$setOnInsert": (
+                {"section": wanted[course_id]["section"], "status": "pending"} if seated[course_id] else
+                {"section": wanted[course_id]["section"], "status": "waitlisted", "waitlisted_at": now}
+            )},
+            upsert=True,
+        )
+        for course_id in order
+    ]
+    collection = CourseRegistration._get_collection()
+    try:
+        upserted = collection.bulk_write(operations, ordered=False).upserted_ids
+    except BulkWriteError as e:
+        upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+        for error in e.details.get("writeErrors", []):
+            # 11000: a concurrent request created it first, which is "exists"
+            if error.get("code") != 11000:
+                wanted[order[error["index"]]].update(result="error", error=error.get("errmsg", "Write failed"))
+
+    created = {order[index] for index in upserted}
+    promoted = {}
+    for course_id in order:
+        section = wanted[course_id]["section"]
+        if (course_id, section) not in limited:
+            continue
+        if course_id not in created and seated[course_id]:
+            ids = free_seat(course_id, section)
+        elif course_id in created and not seated[course_id]:
+            waitlist_changed(course_id, section, 1)
+            ids = fill_free_seats(course_id, section)
+        else:
+            continue
+        ids = [pk for pk in ids if pk != student.id]
+        if ids:
+            promoted[course_id] = ids
+
+    rows = collection.find(
+        {"student": student.id, "course": {"$in": order}}, {"course": 1, "section": 1, "status": 1}
+    )
+    for row in rows:
+        forget(CourseRegistration, row["_id"])
+        result = wanted[row["course"]]
+        if result.get("result") == "error":
+            continue
+        result.update(
+            result="created" if row["course"] in created else "exists",
+            id=str(row["_id"]),
+            section=row.get("section"),
+            status=row.get("status"),
+        )
+    return results, promoted
+
+
+def cancel_registration(student_id, registration_id):
+    """
+    Delete one of the student's registrations and do its seat bookkeeping
+    from the status the row had when it was deleted, so a promotion racing
+    the cancel is never counted against the waitlist. Returns
+    (course_id, promoted student ids), or None when there was nothing to
+    delete.
+    """
+    try:
+        registration_id = ObjectId(str(registration_id))
+    except (InvalidId, TypeError):
+        return None
+    reg = CourseRegistration._get_collection().find_one_and_delete(
+        {"_id": registration_id, "student": student_id},
+        projection={"course": 1, "section": 1, "status": 1, "teaching": 1},
+    )
+    if reg is None:
+        return None
+    forget(CourseRegistration, reg["_id"])
+    # the raw delete skips the Payment CASCADE rule
+    Payment._get_collection().delete_many({"registration": reg["_id"]})
+    if reg.get("teaching"):
+        return reg["course"], []
+    return reg["course"], registration_removed(reg["course"], reg.get("section"), reg.get("status"))
+
+
+def register_teacher(teacher_id, course_id, section):
+    """
+    Confirm the teacher's registration for a course they were assigned to
+    (one per teacher and course, upserted). Teacher rows hold no seat and
+    never wait: a row the teacher already had as a student gives its seat
+    or waitlist place back. Returns the promoted student ids.
+    """
+    previous = CourseRegistration._get_collection().find_one_and_update(
+        {"student": teacher_id, "course": course_id},
+        {
+            "$set": {"status": "confirmed", "teaching": True},
+            "$unset": {"waitlisted_at": ""},
+            "$setOnInsert": {"section": section},
+        },
+        upsert=True,
+        projection={"section": 1, "status": 1, "teaching": 1},
+    )
+    if previous is None or previous.get("teaching"):
+        return []
+    forget(CourseRegistration, previous["_id"])
+    return registration_removed(course_id, previous.get("section"), previous.get("status"))
+
+
+def notify_promoted(course_id, student_ids):
+    """Tell students taken off the waitlist that they now hold a seat."""
+    if not student_ids:
+        return
+    course = Course.objects(id=course_id).only("course_code").first()
+    create_notifications(
+        student_ids,
+        title="Seat available",
+        message=f"A seat opened up in {course.course_code if course else 'your course'}; "
+                f"your registration is no longer waitlisted.",
+    )
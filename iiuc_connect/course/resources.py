@@ -0,0 +1,242 @@
+# course/resources.py
+from bson import ObjectId
+
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.departments import department_registry
+from iiuc_connect.identity_map import forget
+from .models import RESOURCE_CATEGORIES, Course, CourseRegistration, CourseResource, Payment
+
+
+class ResourceConflict(Exception):
+    """The course's resources changed since the version the client saw."""
+
+
+def resource_counts(course):
+    counts = course.resource_counts or {}
+    return {category: counts.get(category, 0) for category in RESOURCE_CATEGORIES}
+
+
+def _course_query(course_id, version):
+    query = Course.objects(id=course_id)
+    if version is not None:
+        query = query.filter(resources_version=version)
+    return query
+
+
+def add_resources(course_id, category, files, uploaded_by=None, version=None):
+    """
+    Record uploaded files (dicts with url, name, size, content_type, sha256)
+    under `category`. The resources are written first; the course counter
+    and version then move in one guarded update, and when it does not match
+    the inserted resources are removed again and ResourceConflict raised.
+    """
+    now = timezone.now()
+    docs = [
+        CourseResource(
+            course=ObjectId(str(course_id)),
+            category=category,
+            url=f["url"],
+            original_name=f.get("name"),
+            size=f.get("size"),
+            content_type=f.get("content_type"),
+            sha256=f.get("sha256"),
+            uploaded_by=uploaded_by,
+            created_at=now,
+        )
+        for f in files
+    ]
+    CourseResource.objects.insert(docs, load_bulk=False)
+    if not _course_query(course_id, version).update_one(
+        **{f"inc__resource_counts__{category}": len(files)}, inc__resources_version=1
+    ):
+        CourseResource.objects(id__in=[doc.id for doc in docs]).delete()
+        raise ResourceConflict("Course not found or resources changed meanwhile")
+    forget(Course, course_id)
+    return docs
+
+
+_FILE_FIELDS = {"url": "url", "original_name": "name", "size": "size", "content_type": "content_type", "sha256": "sha256"}
+
+
+def replace_resource(course_id, resource_id, old_url, new_file, version=None):
+    """
+    Point an existing resource at a new file; only if it still holds
+    `old_url`. The resource is written first, then the course version is
+    bumped; on a version conflict the old file is put back.
+    """
+    now = timezone.now()
+    resource = CourseResource.objects(id=resource_id, course=course_id, url=old_url).modify(
+        set__updated_at=now,
+        **{f"set__{field}": new_file.get(key) for field, key in _FILE_FIELDS.items()},
+    )
+    if not resource:
+        raise ResourceConflict("Resource not found or replaced meanwhile")
+    if not _course_query(course_id, version).update_one(inc__resources_version=1):
+        CourseResource.objects(id=resource_id, url=new_file["url"]).update_one(
+            set__updated_at=resource.updated_at,
+            **{f"set__{field}": getattr(resource, field) for field in _FILE_FIELDS},
+        )
+        raise ResourceConflict("Course not found or resources changed meanwhile")
+    forget(Course, course_id)
+    # modify() returned the document as it was; hand back the new state
+    for field, key in _FILE_FIELDS.items():
+        setattr(resource, field, new_file.get(key))
+    resource.updated_at = now
+    return resource
+
+
+def remove_resource(course_id, resource_id, version=None):
+    """Delete one resource and decrement its category counter; returns the removed document."""
+    resource = CourseResource.objects(id=resource_id, course=course_id).first()
+    if not resource:
+        return None
+    if not _course_query(course_id, version).update_one(
+        **{f"dec__resource_counts__{resource.category}": 1}, inc__resources_version=1
+    ):
+        raise ResourceConflict("Course not found or resources changed meanwhile")
+    forget(Course, course_id)
+    if not CourseResource.objects(id=resource.id).delete():
+        # a concurrent delete won; give the count back
+        Course.objects(id=course_id).update_one(**{f"inc__resource_counts__{resource.category}": 1})
+        return None
+    return resource
+
+
+def _legacy_urls(course_doc):
+    # arrays were appended to, so the newest URL is the last one
+    urls = {category: [url for url in reversed(course_doc.get(category) or []) if url]
+            for category in RESOURCE_CATEGORIES}
+    return {category: found for category, found in urls.items() if found}
+
+
+def legacy_resources(course_id):
+    """
+    URLs a course still keeps in its legacy arrays, newest first per
+    category. Always empty once COURSE_RESOURCES_MIGRATED is set; before
+    that, readers list them next to the course_resources rows.
+    """
+    if getattr(settings, "COURSE_RESOURCES_MIGRATED", False):
+        return {}
+    doc = Course._get_collection().find_one(
+        {"_id": ObjectId(str(course_id))}, {category: 1 for category in RESOURCE_CATEGORIES}
+    )
+    return _legacy_urls(doc or {})
+
+
+def serialize_legacy_resource(category, url):
+    return {
+        "id": None, "category": category, "url": url, "name": None, "size": None,
+        "content_type": None, "sha256": None, "created_at": None, "updated_at": None,
+    }
+
+
+def find_resource(course_id, resource_id=None, category=None, url=None):
+    """By id, or by the (category, url) pair the old array-based API used."""
+    if resource_id:
+        return CourseResource.objects(id=resource_id, course=course_id).first()
+    return CourseResource.objects(course=course_id, category=category, url=url).first()
+
+
+def enrolled_courses_pipeline(user_id, paid_only=True, include_resources=False, legacy=False):
+    """
+    Courses a user holds a confirmed registration for, in one round trip:
+    registrations -> (completed payment) -> course -> (resource URLs).
+    Department names come from the in-memory registry, not a $lookup.
+    `legacy` also projects the URL arrays of courses not migrated yet.
+    """
+    pipeline = [{"$match": {"student": user_id, "status": "confirmed"}}]
+    if paid_only:
+        pipeline += [
+            {"$lookup": {
+                "from": Payment._get_collection_name(),
+                "let": {"registration": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$registration", "$$registration"]}, "status": "completed"}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "payment",
+            }},
+            {"$match": {"payment": {"$ne": []}}},
+        ]
+    pipeline += [
+        {"$group": {"_id": "$course"}},
+        {"$lookup": {
+            "from": Course._get_collection_name(),
+            "localField": "_id",
+            "foreignField": "_id",
+            "as": "course",
+        }},
+        {"$unwind": "$course"},
+        {"$sort": {"course.course_code": 1}},
+        {"$project": {
+            "_id": 1,
+            "course_code": "$course.course_code",
+            "department": "$course.department",
+            "credit_hour": "$course.credit_hour",
+            "resource_counts": "$course.resource_counts",
+            **({category: f"$course.{category}" for category in RESOURCE_CATEGORIES} if legacy else {}),
+        }},
+    ]
+    if include_resources:
+        pipeline.append({"$lookup": {
+            "from": CourseResource._get_collection_name(),
+            "let": {"course": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$course", "$$course"]}}},
+                {"$sort": {"created_at": -1}},
+                {"$project": {"_id": 0, "category": 1, "url": 1}},
+            ],
+            "as": "resources",
+        }})
+    return pipeline
+
+
+def enrolled_courses(user_id, paid_only=True, include_resources=False):
+    """Rows for /course/allcheck/; `include_resources` adds the legacy URL arrays."""
+    migrated = getattr(settings, "COURSE_RESOURCES_MIGRATED", False)
+    rows = CourseRegistration.objects.aggregate(
+        enrolled_courses_pipeline(
+            user_id, paid_only=paid_only, include_resources=include_resources, legacy=not migrated,
+        )
+    )
+    data = []
+    for row in rows:
+        dept = department_registry.get(row.get("department"))
+        counts = row.get("resource_counts") or {}
+        legacy = {} if migrated else _legacy_urls(row)
+        item = {
+            "id": str(row["_id"]),
+            "course_code": row.get("course_code"),
+            "department": dept.name if dept else None,
+            "credit_hour": row.get("credit_hour"),
+            "resource_counts": {
+                category: counts.get(category, 0) + len(legacy.get(category, ()))
+                for category in RESOURCE_CATEGORIES
+            },
+        }
+        if include_resources:
+            urls = {category: [] for category in RESOURCE_CATEGORIES}
+            for resource in row["resources"]:
+                urls[resource["category"]].append(resource["url"])
+            for category, found in legacy.items():
+                urls[category] += found
+            item.update(urls)
+        data.append(item)
+    return data
+
+
+def serialize_resource(resource):
+    return {
+        "id": str(resource.id),
+        "category": resource.category,
+        "url": resource.url,
+        "name": resource.original_name,
+        "size": resource.size,
+        "content_type": resource.content_type,
+        "sha256": resource.sha256,
+        "created_at": resource.created_at.isoformat() if resource.created_at else None,
+        "updated_at": resource.updated_at.isoformat() if resource.updated_at else None,
+    }
@@ -0,0 +1,160 @@
+# course/seats.py
+from django.utils import timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from iiuc_connect.identity_map import forget
+from .models import CourseRegistration, SectionCapacity
+
+
+# registration statuses that occupy a seat
+HOLDS_SEAT = ("pending", "confirmed")
+
+
+def _capacities():
+    return SectionCapacity._get_collection()
+
+
+def _take(course_id, section):
+    """Atomically take a seat if one is free; False when full or unlimited."""
+    return _capacities().find_one_and_update(
+        {"course": course_id, "section": section, "$expr": {"$lt": ["$taken", "$capacity"]}},
+        {"$inc": {"taken": 1}, "$set": {"updated_at": timezone.now()}},
+        projection={"_id": 1},
+    ) is not None
+
+
+def limited_sections(pairs):
+    """The (course_id, section) pairs that have a capacity document, with one query."""
+    pairs = list(pairs)
+    if not pairs:
+        return set()
+    rows = _capacities().find(
+        {"$or": [{"course": course_id, "section": section} for course_id, section in pairs]},
+        {"course": 1, "section": 1},
+    )
+    return {(row["course"], row["section"]) for row in rows}
+
+
+def reserve_seat(course_id, section, limited=None):
+    """
+    True when the caller now holds a seat (always for unlimited sections),
+    False when the section is full. Pass `limited` when it is already
+    known whether the section has a capacity document.
+    """
+    if limited is False:
+        return True
+    if _take(course_id, section):
+        return True
+    if limited is None:
+        return not _capacities().count_documents({"course": course_id, "section": section}, limit=1)
+    return False
+
+
+def _promote_next(course_id, section):
+    """Move the longest-waiting registration into a seat the caller holds."""
+    reg = CourseRegistration._get_collection().find_one_and_update(
+        {"course": course_id, "section": section, "status": "waitlisted"},
+        {"$set": {"status": "pending"}, "$unset": {"waitlisted_at": ""}},
+        sort=[("waitlisted_at", 1), ("_id", 1)],
+        projection={"student": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if reg:
+        forget(CourseRegistration, reg["_id"])
+        waitlist_changed(course_id, section, -1)
+    return reg
+
+
+def waitlist_changed(course_id, section, amount):
+    query = {"course": course_id, "section": section}
+    if amount < 0:
+        query["waitlisted"] = {"$gte": -amount}
+    _capacities().update_one(query, {"$inc": {"waitlisted": amount}})
+
+
+def fill_free_seats(course_id, section):
+    """
+    Promote waitlisted registrations while seats are free. Called by both
+    sides of a race (after freeing a seat and after waitlisting someone),
+    so a seat never stays empty while someone waits. Returns the student
+    ids that were promoted.
+    """
+    waiting = {"course": course_id, "section": section, "status": "waitlisted"}
+    promoted = []
+    while _take(course_id, section):
+        reg = _promote_next(course_id, section)
+        if reg is not None:
+            promoted.append(reg["student"])
+            continue
+        _capacities().update_one(
+            {"course": course_id, "section": section, "taken": {"$gt": 0}}, {"$inc": {"taken": -1}}
+        )
+        # someone waitlisted while we held the probe seat must not be missed
+        if not CourseRegistration._get_collection().count_documents(waiting, limit=1):
+            break
+    return promoted
+
+
+def free_seat(course_id, section):
+    """A seat holder left: hand the seat to the next in line or give it back. Returns promoted student ids."""
+    reg = _promote_next(course_id, section)
+    if reg:
+        return [reg["student"]]
+    _capacities().update_one(
+        {"course": course_id, "section": section, "taken": {"$gt": 0}},
+        {"$inc": {"taken": -1}, "$set": {"updated_at": timezone.now()}},
+    )
+    return fill_free_seats(course_id, section)
+
+
+def registration_removed(course_id, section, status):
+    """Seat / waitlist bookkeeping after a registration was deleted; returns promoted student ids."""
+    if status in HOLDS_SEAT:
+        return free_seat(course_id, section)
+    if status == "waitlisted":
+        waitlist_changed(course_id, section, -1)
+    return []
+
+
+def set_capacity(course_id, section, capacity):
+    """
+    Create or resize a section. A new section starts from a one-off count
+    of its registrations; from then on the counters are maintained. Raising
+    the capacity promotes waitlisted students. Returns (seats, promoted ids).
+    """
+    query = {"course": course_id, "section": section}
+    update = {"$set": {"capacity": capacity, "updated_at": timezone.now()}}
+    if not _capacities().update_one(query, update).matched_count:
+        registrations = CourseRegistration._get_collection()
+        update["$setOnInsert"] = {
+            "taken": registrations.count_documents(
+                dict(query, status={"$in": list(HOLDS_SEAT)}, teaching={"$ne": True})
+            ),
+            "waitlisted": registrations.count_documents(dict(query, status="waitlisted")),
+        }
+        try:
+            _capacities().update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # created concurrently: only the capacity is ours to set
+            del update["$setOnInsert"]
+            _capacities().update_one(query, update)
+    promoted = fill_free_seats(course_id, section)
+    return seats_for(course_id, section=section)[0], promoted
+
+
+def seats_for(course_id, section=None):
+    """Live counters of a course's limited sections, straight from the capacity documents."""
+    query = {"course": course_id}
+    if section is not None:
+        query["section"] = section
+    return [
+        {
+            "section": row["section"],
+            "capacity": row["capacity"],
+            "taken": row.get("taken", 0),
+            "available": max(row["capacity"] - row.get("taken", 0), 0),
+            "waitlisted": row.get("waitlisted", 0),
+        }
+        for row in _capacities().find(query).sort("section", 1)
+    ]
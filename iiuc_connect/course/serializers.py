@@ -1,22 +1,21 @@
 from rest_framework import serializers
 from .models import Course, CourseRegistration, Payment
+from .registrations import notify_promoted, register_courses
+from .resources import resource_counts
 from accounts.models import Department, User
+from iiuc_connect.identity_map import get_document
 
 class CourseSerializer(serializers.Serializer):
     id = serializers.CharField(read_only=True)
     course_code = serializers.CharField()
     department = serializers.CharField(required=True)
     credit_hour = serializers.IntegerField()
-    mid_theory_resources = serializers.ListField(child=serializers.CharField(), required=False)
-    mid_previous_solves = serializers.ListField(child=serializers.CharField(), required=False)
-    final_resources = serializers.ListField(child=serializers.CharField(), required=False)
-    final_previous_solves = serializers.ListField(child=serializers.CharField(), required=False)
 
     def create(self, validated_data):
         dept = validated_data.pop("department", None)
         if dept:
             if isinstance(dept, str):
-                dept = Department.objects(id=dept).first()
+                dept = get_document(Department, dept)
         course = Course(department=dept, **validated_data)
         course.save()
         return course
@@ -25,20 +24,12 @@ class CourseSerializer(serializers.Serializer):
         dept = validated_data.pop("department", None)
         if dept:
             if isinstance(dept, str):
-                dept = Department.objects(id=dept).first()
+                dept = get_document(Department, dept)
             instance.department = dept
 
-        #These lists must NOT be overwritten
-        skip_fields = [
-            "mid_theory_resources",
-            "mid_previous_solves",
-            "final_resources",
-            "final_previous_solves"
-        ]
-
+        # resources live in CourseResource and are never written from here
         for key, value in validated_data.items():
-            if key not in skip_fields:
-                setattr(instance, key, value)
+            setattr(instance, key, value)
 
         instance.save()
         return instance
@@ -52,10 +43,8 @@ class CourseSerializer(serializers.Serializer):
                 "name": instance.department.name,
             } if instance.department else None,
             "credit_hour": instance.credit_hour,
-            "mid_theory_resources": instance.mid_theory_resources or [],
-            "mid_previous_solves": instance.mid_previous_solves or [],
-            "final_resources": instance.final_resources or [],
-            "final_previous_solves": instance.final_previous_solves or [],
+            "resource_counts": resource_counts(instance),
+            "resources_version": instance.resources_version or 0,
         }
 
 
@@ -89,13 +78,15 @@ class CourseRegistrationSerializer(serializers.Serializer):
 
         if not course:
             raise serializers.ValidationError("Invalid course")
-        existing = CourseRegistration.objects(student=student, course=course, section=section).first()
-        if existing:
-            return existing
 
-        reg = CourseRegistration(student=student, course=course, section=section, status="pending")
-        reg.save()
-        return reg
+        # atomic upsert on the unique (student, course) index with a seat
+        # reservation; an existing registration is returned as it is
+        results, promoted = register_courses(student, [{"course": str(course.id), "section": section}])
+        if results[0]["result"] == "error":
+            raise serializers.ValidationError(results[0]["error"])
+        for course_id, student_ids in promoted.items():
+            notify_promoted(course_id, student_ids)
+        return CourseRegistration.objects(id=results[0]["id"]).first()
 
 
 
@@ -115,6 +106,8 @@ class PaymentSerializer(serializers.Serializer):
         reg = CourseRegistration.objects(id=registration_id).first()
         if not reg:
             raise serializers.ValidationError("Invalid registration")
+        if reg.status == "waitlisted":
+            raise serializers.ValidationError("Registration is waitlisted; pay once a seat is assigned")
 
         payment = Payment(
             registration=reg,
@@ -1,3 +1,101 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from course.models import Course, CourseRegistration, Payment, SectionCapacity
+from course.registrations import cancel_registration, register_courses
+from course.seats import HOLDS_SEAT, seats_for, set_capacity
+from course.views import CourseViewSet, PaymentViewSet
+from iiuc_connect.testing import MongoQueryCountTestCase, MongoTestCase
+
+
+class CourseQueryCountTests(MongoQueryCountTestCase):
+    @classmethod
+    def seed(cls):
+        cls.student = cls.make_users("student", 1)[0]
+        cls.courses = [
+            Course(course_code=f"QC{cls.tag}{i}", department=cls.department, credit_hour=3)
+            for i in range(cls.rows)
+        ]
+        Course.objects.insert(cls.courses)
+        registrations = CourseRegistration.objects.insert([
+            CourseRegistration(student=cls.student, course=course, section="A", status="confirmed")
+            for course in cls.courses
+        ])
+        Payment.objects.insert([
+            Payment(registration=reg, amount=1000, method="bkash", status="completed", transaction_id=f"QC{i}")
+            for i, reg in enumerate(registrations)
+        ])
+
+    @classmethod
+    def cleanup(cls):
+        ids = [course.id for course in cls.courses]
+        registrations = list(CourseRegistration.objects(course__in=ids).scalar("id"))
+        Payment.objects(registration__in=registrations).delete()
+        CourseRegistration.objects(id__in=registrations).delete()
+        Course.objects(id__in=ids).delete()
+
+    def test_course_list_commands_do_not_grow_with_page_size(self):
+        view = CourseViewSet.as_view({"get": "list"})
+        self.assertConstantCommands(lambda size: self.call(view, self.admin, limit=size), "CourseViewSet.list")
+
+    def test_payment_list_commands_do_not_grow_with_page_size(self):
+        view = PaymentViewSet.as_view({"get": "list"})
+        for user in (self.admin, self.student):
+            with self.subTest(role=user.role):
+                self.assertConstantCommands(
+                    lambda size: self.call(view, user, limit=size), f"PaymentViewSet.list ({user.role})"
+                )
+
+
+class SeatConcurrencyTests(MongoTestCase):
+    students = 300
+    capacity = 40
+    threads = 48
+
+    @classmethod
+    def seed(cls):
+        cls.student_docs = cls.make_users("student", cls.students)
+        cls.course = Course(course_code=f"QS{cls.tag}", department=cls.department, credit_hour=3)
+        cls.course.save()
+
+    @classmethod
+    def cleanup(cls):
+        CourseRegistration._get_collection().delete_many({"course": cls.course.id})
+        SectionCapacity._get_collection().delete_many({"course": cls.course.id})
+        Course.objects(id=cls.course.id).delete()
+
+    def _rows(self, **query):
+        return list(CourseRegistration._get_collection().find(
+            dict(query, course=self.course.id), {"student": 1, "status": 1, "waitlisted_at": 1}
+        ))
+
+    def test_concurrent_registrations_and_cancels_keep_seats_consistent(self):
+        set_capacity(self.course.id, "A", self.capacity)
+        item = [{"course": str(self.course.id), "section": "A"}]
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            list(pool.map(lambda student: register_courses(student, item), self.student_docs))
+
+        holders = self._rows(status={"$in": list(HOLDS_SEAT)})
+        waiting = sorted(self._rows(status="waitlisted"), key=lambda row: (row["waitlisted_at"], row["_id"]))
+        seats = seats_for(self.course.id, section="A")[0]
+        self.assertEqual(seats["taken"], self.capacity)
+        self.assertEqual(len(holders), self.capacity)
+        self.assertEqual(len(waiting), self.students - self.capacity)
+        self.assertEqual(seats["waitlisted"], len(waiting))
+        self.assertTrue(all(row.get("waitlisted_at") for row in waiting))
+
+        # one cancel hands its seat to the head of the waitlist
+        cancelled = holders[0]
+        _, promoted = cancel_registration(cancelled["student"], cancelled["_id"])
+        self.assertEqual(promoted, [waiting[0]["student"]])
+
+        # concurrent cancels promote the next in line, in waitlist order
+        count = 10
+        with ThreadPoolExecutor(max_workers=count) as pool:
+            results = list(pool.map(lambda row: cancel_registration(row["student"], row["_id"]), holders[1:1 + count]))
+        promoted = {pk for _, ids in results for pk in ids}
+        self.assertEqual(promoted, {row["student"] for row in waiting[1:1 + count]})
+
+        seats = seats_for(self.course.id, section="A")[0]
+        self.assertEqual(seats["taken"], self.capacity)
+        self.assertEqual(len(self._rows(status={"$in": list(HOLDS_SEAT)})), self.capacity)
+        self.assertEqual(seats["waitlisted"], self.students - self.capacity - 1 - count)
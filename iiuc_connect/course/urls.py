@@ -10,12 +10,15 @@ urlpatterns = [
     path("<str:pk>/add_resource/", CourseViewSet.as_view({'post': 'add_resource'}), name="course-add-resource"),
     path("<str:pk>/update_resource/", CourseViewSet.as_view({'put': 'update_resource'}), name="course-update-resource"),
     path("<str:pk>/delete_resource/", CourseViewSet.as_view({'delete': 'delete_resource'}), name="course-delete-resource"),
+    path("<str:pk>/seats/", CourseViewSet.as_view({'get': 'seats', 'put': 'seats'}), name="course-seats"),
+    path("<str:pk>/resources/", CourseViewSet.as_view({'get': 'resources'}), name="course-resources-list"),
 
     # List Courses with Resources (student / teacher view)
     path("allcheck/", CourseResourcesAPIView.as_view(), name="course-resources"),
 
     # Course Registration
     path("register/", CourseRegistrationViewSet.as_view({'post': 'create', 'get': 'list'}), name="course-registration"),
+    path("register/batch/", CourseRegistrationViewSet.as_view({'post': 'batch'}), name="course-registration-batch"),
     path("register/<str:pk>/", CourseRegistrationViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name="course-registration-detail"),
 
     # Payment
@@ -1,17 +1,30 @@
 import requests
+from django.http import StreamingHttpResponse
 from notification.utils import create_notification
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Course, CourseRegistration, Payment
+from .models import RESOURCE_CATEGORIES, Course, CourseRegistration, CourseResource, Payment
+from .payments import (
+    PaymentFilterError, iter_payments, json_array, list_payments, parse_payment_filters, payment_totals,
+)
+from .registrations import MAX_BATCH_REGISTRATIONS, cancel_registration, notify_promoted, register_courses
+from .resources import (
+    ResourceConflict, enrolled_courses, find_resource, legacy_resources, remove_resource, resource_counts,
+    serialize_legacy_resource, serialize_resource,
+)
+from .seats import seats_for, set_capacity
 from .serializers import CourseRegistrationSerializer, CourseSerializer, PaymentSerializer
 from accounts.models import Department, User
-from accounts.views import upload_image, delete_image, extract_public_id
 from accounts.authentication import JWTAuthentication
 from rest_framework import viewsets, status
 import uuid
 from rest_framework import viewsets
 from django.conf import settings
+from iiuc_connect.pagination import MongoCursorPagination
+from iiuc_connect.prefetch import prefetch_references
+from uploads.dedupe import release
+from uploads.uploader import queue_upload
 
 
 class CourseViewSet(viewsets.ViewSet):
@@ -23,14 +36,19 @@ class CourseViewSet(viewsets.ViewSet):
     #  List Courses 
     def list(self, request):
         courses = Course.objects.all()
+        paginator = MongoCursorPagination(ordering="course_code")
+        page = paginator.paginate_queryset(courses, request, view=self)
+        rows = prefetch_references(courses if page is None else page, "department", only={"department": ("name",)})
         data = []
-        for course in courses:
+        for course in rows:
             data.append({
                 "id": str(course.id),
                 "course_code": course.course_code,
                 "department": str(course.department.name) if course.department else None,
                 "credit_hour": course.credit_hour
             })
+        if page is not None:
+            return paginator.get_paginated_response(data)
         return Response(data)
 
     # Create Course 
@@ -77,38 +95,127 @@ class CourseViewSet(viewsets.ViewSet):
         return Response({"message": "Course deleted"})
 
     # Resources 
+    def _expected_version(self, request):
+        """Optional `version` the client last saw; None skips the concurrency check."""
+        version = request.data.get("version")
+        if version in (None, ""):
+            return None
+        try:
+            return int(version)
+        except (TypeError, ValueError):
+            raise ValueError("version must be an integer")
+
+    # Resource writes are guarded updates that bump resources_version; a
+    # stale `version` gets a 409
+    def _conflict(self, course, expected):
+        return expected is not None and course.resources_version != expected
+
+    def _can_read_resources(self, user, course):
+        role = getattr(user, "role", None)
+        if role == "admin":
+            return True
+        if role not in ("student", "teacher"):
+            return False
+        regs = CourseRegistration.objects(student=user, course=course, status="confirmed").only("id")
+        if role == "teacher":
+            return regs.first() is not None
+        return Payment.objects(registration__in=list(regs), status="completed").first() is not None
+
+    # Seats: live counters per limited section; admins set capacities
+    @action(detail=True, methods=["get", "put"])
+    def seats(self, request, pk=None):
+        course = Course.objects(id=pk).only("id").first()
+        if not course:
+            return Response({"error": "Course not found"}, status=404)
+        if request.method == "GET":
+            return Response({"course": str(course.id), "sections": seats_for(course.id)})
+
+        if not self.is_admin(request.user):
+            return Response({"error": "Permission denied"}, status=403)
+        section = request.data.get("section")
+        try:
+            capacity = int(request.data.get("capacity"))
+        except (TypeError, ValueError):
+            return Response({"error": "capacity must be an integer"}, status=400)
+        if not section:
+            return Response({"error": "Section missing"}, status=400)
+        if capacity < 0:
+            return Response({"error": "capacity must not be negative"}, status=400)
+
+        seats, promoted = set_capacity(course.id, section, capacity)
+        notify_promoted(course.id, promoted)
+        return Response(dict(seats, promoted=len(promoted)))
+
+    @action(detail=True, methods=["get"])
+    def resources(self, request, pk=None):
+        course = Course.objects(id=pk).only("id", "resource_counts").first()
+        if not course:
+            return Response({"error": "Course not found"}, status=404)
+        if not self._can_read_resources(request.user, course):
+            return Response({"error": "Permission denied"}, status=403)
+
+        category = request.query_params.get("category")
+        if category and category not in RESOURCE_CATEGORIES:
+            return Response({"error": f"Invalid category: {category}"}, status=400)
+        resources = CourseResource.objects(course=course.id)
+        if category:
+            resources = resources.filter(category=category)
+
+        legacy = legacy_resources(course.id)
+        if legacy:
+            # not migrated yet: newer uploads, then the legacy arrays, in one page
+            data = [serialize_resource(r) for r in resources.order_by("-created_at")]
+            data += [
+                serialize_legacy_resource(name, url)
+                for name, urls in legacy.items() if not category or name == category
+                for url in urls
+            ]
+            counts = resource_counts(course)
+            return Response({
+                "results": data,
+                "next_cursor": None,
+                "counts": {name: n + len(legacy.get(name, ())) for name, n in counts.items()},
+            })
+
+        paginator = MongoCursorPagination(ordering="-created_at", opt_in=False)
+        page = paginator.paginate_queryset(resources, request, view=self)
+        data = [serialize_resource(r) for r in page]
+        response = paginator.get_paginated_data(data)
+        response["counts"] = resource_counts(course)
+        return Response(response)
+
     @action(detail=True, methods=["post"])
     def add_resource(self, request, pk=None):
         if not self.is_admin(request.user):
             return Response({"error": "Permission denied"}, status=403)
 
-        course = Course.objects(id=pk).first()
+        course = Course.objects(id=pk).only("id", "resources_version").first()
         if not course:
             return Response({"error": "Course not found"}, status=404)
 
-        file_obj = request.FILES.get("file")
+        # several files per call are uploaded in parallel and recorded together
+        files = request.FILES.getlist("file")
         field_name = request.data.get("field")
-        VALID_FIELDS = {
-        "mid_theory_resources",
-        "mid_previous_solves",
-        "final_resources",
-        "final_previous_solves",
-        }
 
-        if not file_obj:
-         return Response({"error": "File missing"}, status=400)
+        if not files:
+            return Response({"error": "File missing"}, status=400)
         if not field_name:
             return Response({"error": "Field name missing"}, status=400)
-        if field_name not in VALID_FIELDS:
+        if field_name not in RESOURCE_CATEGORIES:
             return Response({"error": f"Invalid field name: {field_name}"}, status=400)
-
-        url = upload_image(file_obj, folder="iiuc_connect_courses")
-        resources = list(getattr(course, field_name))
-        resources.append(url)
-        setattr(course, field_name, resources)
-        course.save()
-
-        return Response({"message": "Resource added", "url": url})
+        try:
+            expected = self._expected_version(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if self._conflict(course, expected):
+            return Response({"error": "Resources changed, reload and retry", "version": course.resources_version}, status=409)
+
+        job = queue_upload(
+            files if len(files) > 1 else files[0], owner=request.user, target="course_resource_add",
+            target_id=course.id, folder="iiuc_connect_courses",
+            params={"field": field_name, "version": expected},
+        )
+        return Response({"message": "Resource upload queued", "upload": job.summary()}, status=202)
 
 
     @action(detail=True, methods=["put"])
@@ -116,59 +223,43 @@ class CourseViewSet(viewsets.ViewSet):
         if not self.is_admin(request.user):
             return Response({"error": "Permission denied"}, status=403)
 
-        course = Course.objects(id=pk).first()
-        if not course:
-            return Response({"error": "Course not found"}, status=404)
-
         file_obj = request.FILES.get("file")
+        resource_id = request.data.get("resource_id")
         field_name = request.data.get("field")
         old_url = request.data.get("old_url")
 
-        VALID_FIELDS = {
-        "mid_theory_resources",
-        "mid_previous_solves",
-        "final_resources",
-        "final_previous_solves",
-        }
-
-    # Validation
+    # Validation: a resource is named by id, or by field + old_url as before
         if not file_obj:
             return Response({"error": "File missing"}, status=400)
-        if not field_name:
-            return Response({"error": "Field name missing"}, status=400)
-        if field_name not in VALID_FIELDS:
-            return Response({"error": f"Invalid field name: {field_name}"}, status=400)
-        if not old_url:
-            return Response({"error": "Old URL missing"}, status=400)
-
-        resources = list(getattr(course, field_name))
-
-        if old_url not in resources:
+        if not resource_id:
+            if not field_name:
+                return Response({"error": "Field name missing"}, status=400)
+            if field_name not in RESOURCE_CATEGORIES:
+                return Response({"error": f"Invalid field name: {field_name}"}, status=400)
+            if not old_url:
+                return Response({"error": "Old URL missing"}, status=400)
+        try:
+            expected = self._expected_version(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        course = Course.objects(id=pk).only("id", "resources_version").first()
+        if not course:
+            return Response({"error": "Course not found"}, status=404)
+        resource = find_resource(course.id, resource_id=resource_id, category=field_name, url=old_url)
+        if not resource:
             return Response({"error": "Old URL not found"}, status=400)
-
-    # Delete old file
-        delete_image(extract_public_id(old_url))
-
-    # Upload new file
-        new_url = upload_image(file_obj, folder="iiuc_connect_courses")
-
-    # Replace in list
-        idx = resources.index(old_url)
-        resources[idx] = new_url
-        setattr(course, field_name, resources)
-        course.save()
-
-    # Notify students with confirmed registration in this course
-        confirmed_regs = CourseRegistration.objects(course=course, status="confirmed")
-        for reg in confirmed_regs:
-            create_notification(
-            user=reg.student,
-            title=f"Resource updated",
-            message=f"A resource in {course.course_code} has been updated.",
-            notification_type="announcement"
-            )
-
-        return Response({"message": "Resource updated", "url": new_url})
+        if self._conflict(course, expected):
+            return Response({"error": "Resources changed, reload and retry", "version": course.resources_version}, status=409)
+
+    # Upload in the background; the handler swaps the URL, deletes the old
+    # file and notifies students with confirmed registration
+        job = queue_upload(
+            file_obj, owner=request.user, target="course_resource_replace",
+            target_id=course.id, folder="iiuc_connect_courses",
+            params={"resource_id": str(resource.id), "old_url": resource.url, "version": expected},
+        )
+        return Response({"message": "Resource upload queued", "upload": job.summary()}, status=202)
 
 
 
@@ -177,40 +268,39 @@ class CourseViewSet(viewsets.ViewSet):
         if not self.is_admin(request.user):
             return Response({"error": "Permission denied"}, status=403)
 
-        course = Course.objects(id=pk).first()
-        if not course:
-            return Response({"error": "Course not found"}, status=404)
-
     # Use get() with default None to avoid KeyError / empty data crash
+        resource_id = request.data.get("resource_id", None)
         field_name = request.data.get("field", None)
         target_url = request.data.get("url", None)
 
-        VALID_FIELDS = {
-        "mid_theory_resources",
-        "mid_previous_solves",
-        "final_resources",
-        "final_previous_solves",
-        }
-
     # Only return 400 if really missing
-        if not field_name or field_name not in VALID_FIELDS:
-            return Response({"error": "Invalid or missing field name"}, status=400)
-        if not target_url:
-            return Response({"error": "URL missing"}, status=400)
-
-        resources = list(getattr(course, field_name))
-        if target_url not in resources:
+        if not resource_id:
+            if not field_name or field_name not in RESOURCE_CATEGORIES:
+                return Response({"error": "Invalid or missing field name"}, status=400)
+            if not target_url:
+                return Response({"error": "URL missing"}, status=400)
+        try:
+            expected = self._expected_version(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        course = Course.objects(id=pk).only("id").first()
+        if not course:
+            return Response({"error": "Course not found"}, status=404)
+        resource = find_resource(course.id, resource_id=resource_id, category=field_name, url=target_url)
+        try:
+            removed = remove_resource(course.id, resource.id, version=expected) if resource else None
+        except ResourceConflict:
+            current = Course.objects(id=pk).only("resources_version").first()
+            return Response({"error": "Resources changed, reload and retry", "version": current.resources_version}, status=409)
+        if not removed:
             return Response({"error": "URL not found"}, status=400)
 
-    # Delete the file from cloud
-        delete_image(extract_public_id(target_url))
+    # Drop our reference; the file goes once no resource shares it
+        release(removed.url)
 
-    # Remove URL from list and save
-        resources.remove(target_url)
-        setattr(course, field_name, resources)
-        course.save()
-
-        return Response({"message": "Resource deleted"})
+        version = Course.objects(id=pk).only("resources_version").first().resources_version
+        return Response({"message": "Resource deleted", "version": version})
 
 
 
@@ -237,6 +327,29 @@ class CourseRegistrationViewSet(viewsets.ViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    # POST /api/course/register/batch/  {"items": [{"course": <id>, "section": "A"}, ...]}
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        items = request.data.get("items")
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list"}, status=400)
+        if len(items) > MAX_BATCH_REGISTRATIONS:
+            return Response({"error": f"At most {MAX_BATCH_REGISTRATIONS} items per request"}, status=400)
+        if not all(isinstance(item, dict) for item in items):
+            return Response({"error": "Each item must be an object with course and section"}, status=400)
+
+        results, promoted = register_courses(request.user, items)
+        for course_id, student_ids in promoted.items():
+            notify_promoted(course_id, student_ids)
+        counts = {}
+        for result in results:
+            counts[result["result"]] = counts.get(result["result"], 0) + 1
+        created = counts.get("created", 0)
+        return Response(
+            {"results": results, "counts": counts},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
     # PUT /api/course/registration/<pk>/
     def update(self, request, pk=None):
         reg = CourseRegistration.objects(id=pk, student=request.user).first()
@@ -252,11 +365,10 @@ class CourseRegistrationViewSet(viewsets.ViewSet):
 
     # DELETE /api/course/registration/<pk>/ 
     def destroy(self, request, pk=None):
-        reg = CourseRegistration.objects(id=pk, student=request.user).first()
-        if not reg:
+        removed = cancel_registration(request.user.id, pk)
+        if removed is None:
             return Response({"error": "Registration not found"}, status=404)
-
-        reg.delete()
+        notify_promoted(*removed)
         return Response({"message": "Course registration deleted"}, status=200)
     def retrieve(self, request, pk=None):
         reg = CourseRegistration.objects(id=pk, student=request.user).first()
@@ -269,31 +381,37 @@ class CourseRegistrationViewSet(viewsets.ViewSet):
 class PaymentViewSet(viewsets.ViewSet):
     authentication_classes = (JWTAuthentication,)
 
+    # Aggregations in course/payments.py for every role. Filters: course,
+    # section, status, date_from, date_to. Unpaginated lists are streamed
+    # only with ?stream=1; pages carry per-course totals only with
+    # ?include_total=1.
     def list(self, request):
-        user = request.user
-        data = []
-
-        if getattr(user, "role", None) == "student":
-            regs = CourseRegistration.objects(student=user).only('id')
-            payments = Payment.objects(registration__in=[r.id for r in regs])
-
-        elif getattr(user, "role", None) == "teacher":
-            from routine.models import Routine
-
-            assigned_courses = Routine.objects(teacher=user).only('course')
-
-            regs = CourseRegistration.objects(
-                course__in=[r.course.id for r in assigned_courses]
-            ).only('id')
-            payments = Payment.objects(registration__in=[r.id for r in regs])
-
-        else:
-            payments = Payment.objects.all()
-
-        for payment in payments:
-            data.append(PaymentSerializer(payment).data)
-
-        return Response(data)
+        try:
+            filters = parse_payment_filters(request.query_params)
+        except PaymentFilterError as e:
+            return Response({"error": str(e)}, status=400)
+
+        paginator = MongoCursorPagination()
+        if not paginator.is_requested(request):
+            rows = iter_payments(request.user, filters)
+            if request.query_params.get("stream") in ("1", "true", "True"):
+                return StreamingHttpResponse(json_array(rows), content_type="application/json")
+            return Response(list(rows))
+
+        token = request.query_params.get(paginator.cursor_query_param)
+        after = paginator.decode_cursor(token)[1] if token else None
+        data, next_after = list_payments(
+            request.user, filters, page_size=paginator.get_page_size(request), after=after
+        )
+        paginator.next_cursor = paginator.encode_cursor(None, next_after) if next_after else None
+        totals = None
+        if request.query_params.get(paginator.total_query_param) in ("1", "true", "True"):
+            totals = payment_totals(request.user, filters)
+            paginator.total = sum(t["payments"] for t in totals)
+        response = paginator.get_paginated_data(data)
+        if totals is not None:
+            response["totals"] = totals
+        return Response(response)
 
     def create(self, request):
         serializer = PaymentSerializer(data=request.data, context={'request': request})
@@ -337,62 +455,18 @@ class PaymentViewSet(viewsets.ViewSet):
 class CourseResourcesAPIView(APIView):
     authentication_classes = (JWTAuthentication,)
 
+    # One aggregation per request: students see courses with a completed
+    # payment, teachers every course they are confirmed for. Counts only by
+    # default; ?include_resources=1 adds the URL arrays for clients not yet
+    # on /resources/
     def get(self, request):
         user_role = getattr(request.user, "role", None)
-        data = []
-
-        if user_role == "student" :
-            confirmed_regs = CourseRegistration.objects(student=request.user, status="confirmed")
-            paid_regs = []
-            for reg in confirmed_regs:
-                payment = Payment.objects(registration=reg, status="completed").first()
-                if payment:
-                    paid_regs.append(reg)
-
-            for reg in paid_regs:
-                course = reg.course
-                data.append({
-                    "id": str(course.id),
-                    "course_code": course.course_code,
-                    "department": str(course.department.name) if course.department else None,
-                    "credit_hour": course.credit_hour,
-                    "mid_theory_resources": course.mid_theory_resources,
-                    "mid_previous_solves": course.mid_previous_solves,
-                    "final_resources": course.final_resources,
-                    "final_previous_solves": course.final_previous_solves
-                })
-
-
-        elif user_role == "teacher":
-            confirmed_regs = CourseRegistration.objects(student=request.user, status="confirmed")
-
-            seen = set()
-            unique_regs = []
-
-            for reg in confirmed_regs:
-                if reg.course.id not in seen:
-                    seen.add(reg.course.id)
-                    unique_regs.append(reg)
-
-            for reg in unique_regs:
-                course = reg.course
-                data.append({
-            "id": str(course.id),
-            "course_code": course.course_code,
-            "department": str(course.department.name) if course.department else None,
-            "credit_hour": course.credit_hour,
-            "mid_theory_resources": course.mid_theory_resources,
-            "mid_previous_solves": course.mid_previous_solves,
-            "final_resources": course.final_resources,
-            "final_previous_solves": course.final_previous_solves
-        })
-
-
-        else:
+        if user_role not in ("student", "teacher"):
             return Response({"error": "Permission denied"}, status=403)
 
+        data = enrolled_courses(
+            request.user.id,
+            paid_only=user_role == "student",
+            include_resources=request.query_params.get("include_resources") in ("1", "true", "True"),
+        )
         return Response({"courses": data})
-    
-    
-
-
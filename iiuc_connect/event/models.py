@@ -5,10 +5,10 @@ from mongoengine import (
     BooleanField, DictField
 )
 from django.utils import timezone
-from accounts.models import User, Department
+from accounts.models import User, Department, DepartmentReferenceField
 import datetime
 from mongoengine import Document, StringField, EmailField, DateTimeField, ListField
-from werkzeug.security import generate_password_hash, check_password_hash
+from accounts.hashing import password_hasher
 from django.utils import timezone
 
 
@@ -48,7 +48,7 @@ class Event(Document):
 class EventRegistration(Document):
     event = ReferenceField(Event, required=True)
     user = ReferenceField(User, required=True)
-    department = ReferenceField(Department)
+    department = DepartmentReferenceField()
     batch = StringField()
     
     status = StringField(
@@ -81,7 +81,7 @@ class EventPayment(Document):
 
     meta = {
         "collection": "event_payments",
-        "indexes": ["verification_status", "trx_id"]
+        "indexes": ["verification_status", "trx_id", "registration"]
     }
 
 
@@ -98,7 +98,13 @@ class GuestUser(Document):
     }
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    # Upgrade the stored hash after a successful login when the cost parameters changed
+    def rehash_password_if_needed(self, password):
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            type(self).objects(id=self.id).update_one(set__password_hash=self.password_hash)
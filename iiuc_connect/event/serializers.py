@@ -1,10 +1,10 @@
 # event/serializers.py
 from rest_framework import serializers
 from .models import Event, EventRegistration, EventPayment
-from accounts.models import User, Department
+from accounts.departments import department_registry
 from accounts.models import User
 from django.conf import settings
-from django.core.mail import send_mail
+from notification.utils import enqueue_email
 import random
 import string
 from rest_framework import serializers
@@ -13,8 +13,7 @@ from .models import GuestUser
 
 
 def send_event_email(email, title, message):
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None) or settings.EMAIL_HOST_USER
-    send_mail(title, message, from_email, [email], fail_silently=False)
+    enqueue_email(email, title, message)
 
 
 class EventSerializer(serializers.Serializer):
@@ -55,7 +54,7 @@ class EventSerializer(serializers.Serializer):
             fee_amount=validated_data.get("fee_amount", 0),
             payment_instructions=validated_data.get("payment_instructions", ""),
 
-            departments_allowed=[Department.objects.get(id=d) for d in validated_data.get("departments_allowed", [])],
+            departments_allowed=[department_registry.require(d) for d in validated_data.get("departments_allowed", [])],
             batches_allowed=validated_data.get("batches_allowed", {})
         )
         event.save()
@@ -80,7 +79,7 @@ class EventRegistrationSerializer(serializers.Serializer):
     def create(self, validated_data):
         event = Event.objects.get(id=validated_data["event"])
         user = User.objects.get(id=validated_data["user"])
-        department = Department.objects.get(id=validated_data["department"])
+        department = department_registry.require(validated_data["department"])
 
         reg = EventRegistration(
             event=event,
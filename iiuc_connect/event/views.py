@@ -12,16 +12,17 @@ from .serializers import (
 )
 from accounts.models import User
 from rest_framework.views import APIView
-from django.core.mail import send_mail
 from django.conf import settings
 from .serializers import GuestUserSerializer
 from accounts.authentication import JWTAuthentication
 import jwt
 from django.utils import timezone
 from .utils import delete_guests_for_event
-from notification.utils import create_notification
+from notification.utils import create_notification, enqueue_email, enqueue_emails
 from bson import ObjectId
+from iiuc_connect.pagination import MongoCursorPagination
 from mongoengine.errors import ValidationError
+from accounts.hashing import HashingPoolBusy
 
 class EventViewSet(viewsets.ViewSet):
     authentication_classes = [JWTAuthentication]
@@ -44,46 +45,40 @@ class EventViewSet(viewsets.ViewSet):
         # 1) Admin & Teacher → See ALL events
         # -------------------------------------------------------
         if user.role in ["admin", "teacher"]:
-            events = Event.objects(is_active=True)
-            return Response(EventSerializer(events, many=True).data)
+            return self._respond(request, Event.objects(is_active=True))
 
         # -------------------------------------------------------
         # 2) Event Creator or Manager → See ALL their events
         # -------------------------------------------------------
-        creator_manager_events = Event.objects(
-            is_active=True,
-            __raw__={
-                "$or": [
-                    {"creator": user.id},
-                    {"managers": user.id}
-                ]
-            }
-        )
+        visible = [
+            {"creator": user.id},
+            {"managers": user.id}
+        ]
 
         # -------------------------------------------------------
         # 3) Student Filtering Logic
+        #    (missing department or batch → only created/managed events)
         # -------------------------------------------------------
         dept = user.department
         batch = user.batch
-
-        # Missing department or batch → only show events they created/managed
-        if not dept or not batch:
-            return Response(EventSerializer(creator_manager_events, many=True).data)
-
-        dept_code = dept.code
-
-        student_filtered = Event.objects.filter(
-            is_active=True,
-            departments_allowed=dept,
-            **{f"batches_allowed__{dept_code}__in": [batch]}
-        )
+        if dept and batch:
+            visible.append({
+                "departments_allowed": dept.id,
+                f"batches_allowed.{dept.code}": {"$in": [batch]}
+            })
 
         # -------------------------------------------------------
-        # 4) Combine both lists (creator/manager + filtered)
+        # 4) Combine both lists in one query ($or de-duplicates)
         # -------------------------------------------------------
-        final_events = list({e.id: e for e in list(creator_manager_events) + list(student_filtered)}.values())
+        events = Event.objects(is_active=True, __raw__={"$or": visible})
+        return self._respond(request, events)
 
-        return Response(EventSerializer(final_events, many=True).data)
+    def _respond(self, request, events):
+        paginator = MongoCursorPagination()
+        page = paginator.paginate_queryset(events, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(EventSerializer(page, many=True).data)
+        return Response(EventSerializer(events, many=True).data)
 
 
 class EventDetailViewSet(viewsets.ViewSet):
@@ -212,8 +207,12 @@ class GuestLoginView(APIView):
             return Response({"error": "Email & password required"}, status=400)
 
         guest = GuestUser.objects(email=email).first()
-        if not guest or not guest.check_password(password):
-            return Response({"error": "Invalid credentials"}, status=400)
+        try:
+            if not guest or not guest.check_password(password):
+                return Response({"error": "Invalid credentials"}, status=400)
+            guest.rehash_password_if_needed(password)
+        except HashingPoolBusy:
+            return Response({"error": "Server busy, please try again"}, status=503)
 
         payload = {
             "guest_id": str(guest.id),
@@ -271,7 +270,10 @@ class GuestRegisterView(APIView):
 
         # Create guest
         guest = GuestUser(email=email, name=name, events=[event_id])
-        guest.set_password(password)
+        try:
+            guest.set_password(password)
+        except HashingPoolBusy:
+            return Response({"error": "Server busy, please try again"}, status=503)
         guest.save()
 
         # Send invitation email
@@ -293,11 +295,10 @@ Password: {password}
 
 Thank you!
 """
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None) or settings.EMAIL_HOST_USER
-        send_mail(f"Your Event Invitation", message_text, from_email, [guest.email], fail_silently=False)
+        enqueue_email(guest.email, "Your Event Invitation", message_text)
 
         return Response({
-            "message": "Guest registered successfully and invitation email sent",
+            "message": "Guest registered successfully and invitation email queued",
             "guest": GuestUserSerializer(guest).data
         })
 
@@ -447,15 +448,15 @@ class EventEditView(APIView):
             )
 
         # Notify guests
-        guest_list = GuestUser.objects(events=updated_event.id)
-        for guest in guest_list:
-            send_mail(
-                subject=f"Event Updated: {updated_event.title}",
-                message=f"Dear {guest.name},\n\nThe event '{updated_event.title}' has been updated. Please check the details.\n\nThank you!",
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", settings.EMAIL_HOST_USER),
-                recipient_list=[guest.email],
-                fail_silently=True
+        guest_list = GuestUser.objects(events=str(updated_event.id)).only("email", "name")
+        enqueue_emails(
+            (
+                guest.email,
+                f"Event Updated: {updated_event.title}",
+                f"Dear {guest.name},\n\nThe event '{updated_event.title}' has been updated. Please check the details.\n\nThank you!",
             )
+            for guest in guest_list
+        )
 
         return Response({
             "message": "Event updated successfully. Notifications sent.",
@@ -0,0 +1,353 @@
+# exports/datasets.py
+import csv
+import datetime
+import io
+import json
+from itertools import islice
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+
+from accounts.departments import department_registry
+from accounts.models import User
+from course.models import Course, CourseRegistration, Payment
+from event.models import Event, EventPayment, EventRegistration
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _object_id(value, name):
+    try:
+        return ObjectId(str(value))
+    except (InvalidId, TypeError):
+        raise ExportFilterError(f"Invalid {name}")
+
+
+class _Names:
+    """
+    Projected fields of referenced documents, fetched with one `$in` query
+    per chunk for the ids not seen yet. Bounded: once `max_size` entries
+    are held it starts over, so memory does not grow with the export.
+    """
+
+    def __init__(self, document, fields, max_size=50000):
+        self.collection = document._get_collection()
+        self.projection = {field: 1 for field in fields}
+        self.max_size = max_size
+        self.cache = {}
+        self.queries = 0
+
+    def load(self, ids):
+        ids = {pk for pk in ids if pk is not None}
+        missing = {pk for pk in ids if pk not in self.cache}
+        if not missing:
+            return
+        if len(self.cache) + len(missing) > self.max_size:
+            # keep only what this chunk needs
+            self.cache = {pk: self.cache[pk] for pk in ids - missing}
+        for doc in self.collection.find({"_id": {"$in": list(missing)}}, self.projection):
+            self.cache[doc["_id"]] = doc
+        self.queries += 1
+
+    def get(self, pk, field):
+        return (self.cache.get(pk) or {}).get(field)
+
+
+class Dataset:
+    """
+    One exportable collection. Documents are read with a no-timeout cursor
+    and a projection, `batch_size` at a time; `resolve()` looks up the
+    names each chunk refers to before its rows are rendered.
+    """
+
+    name = None
+    document = None
+    fields = ()
+    columns = ()
+    filter_name = None       # optional ?<filter_name>=<id> query parameter
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(settings, "EXPORT_BATCH_SIZE", 2000)
+        self.collection = self.document._get_collection()
+        self.projection = {field: 1 for field in self.fields}
+        self.refs = self.references()
+
+    def references(self):
+        return {}
+
+    @classmethod
+    def parse_filters(cls, params):
+        if cls.filter_name and params.get(cls.filter_name):
+            return {cls.filter_name: _object_id(params[cls.filter_name], cls.filter_name)}
+        return {}
+
+    def query(self, filters):
+        return dict(filters)
+
+    def _cursor(self, collection, query, projection):
+        return collection.find(query, projection, no_cursor_timeout=True, batch_size=self.batch_size).sort("_id", 1)
+
+    def chunks(self, filters, raw_query=None):
+        cursor = self._cursor(self.collection, raw_query or self.query(filters), self.projection)
+        try:
+            yield from _batched(cursor, self.batch_size)
+        finally:
+            cursor.close()
+
+    def _chunks_through(self, parent, parent_query, link_field="registration"):
+        """Documents whose `link_field` matches a parent query, one chunk of parent ids at a time."""
+        parents = self._cursor(parent._get_collection(), parent_query, {"_id": 1})
+        try:
+            for batch in _batched(parents, self.batch_size):
+                ids = [doc["_id"] for doc in batch]
+                yield list(self.collection.find({link_field: {"$in": ids}}, self.projection).sort("_id", 1))
+        finally:
+            parents.close()
+
+    def resolve(self, docs):
+        pass
+
+    def row(self, doc):
+        raise NotImplementedError
+
+    def rows(self, filters, raw_query=None):
+        for docs in self.chunks(filters, raw_query=raw_query):
+            self.resolve(docs)
+            for doc in docs:
+                yield self.row(doc)
+
+    @property
+    def lookups(self):
+        return sum(names.queries for names in self.refs.values())
+
+
+def _department_code(pk):
+    dept = department_registry.get(pk)
+    return dept.code if dept else None
+
+
+class CourseRegistrationDataset(Dataset):
+    name = "course_registrations"
+    document = CourseRegistration
+    fields = ("student", "course", "section", "status")
+    columns = ("id", "student_id", "student_email", "course_code", "section", "status")
+    filter_name = "course"
+
+    def references(self):
+        return {"users": _Names(User, ["student_id", "email"]), "courses": _Names(Course, ["course_code"])}
+
+    def resolve(self, docs):
+        self.refs["users"].load(doc.get("student") for doc in docs)
+        self.refs["courses"].load(doc.get("course") for doc in docs)
+
+    def row(self, doc):
+        users, courses = self.refs["users"], self.refs["courses"]
+        return (
+            doc["_id"],
+            users.get(doc.get("student"), "student_id"),
+            users.get(doc.get("student"), "email"),
+            courses.get(doc.get("course"), "course_code"),
+            doc.get("section"),
+            doc.get("status"),
+        )
+
+
+class PaymentDataset(Dataset):
+    name = "payments"
+    document = Payment
+    fields = ("registration", "amount", "method", "status", "transaction_id")
+    columns = (
+        "id", "created_at", "registration_id", "student_id", "student_email", "course_code", "section",
+        "amount", "method", "status", "transaction_id",
+    )
+    filter_name = "course"
+
+    def references(self):
+        return {
+            "registrations": _Names(CourseRegistration, ["student", "course", "section"]),
+            "users": _Names(User, ["student_id", "email"]),
+            "courses": _Names(Course, ["course_code"]),
+        }
+
+    def chunks(self, filters, raw_query=None):
+        if filters.get("course") and raw_query is None:
+            # payments carry no course: walk that course's registrations instead
+            return self._chunks_through(CourseRegistration, {"course": filters["course"]})
+        return super().chunks(filters, raw_query=raw_query)
+
+    def resolve(self, docs):
+        regs = self.refs["registrations"]
+        regs.load(doc.get("registration") for doc in docs)
+        self.refs["users"].load(regs.get(doc.get("registration"), "student") for doc in docs)
+        self.refs["courses"].load(regs.get(doc.get("registration"), "course") for doc in docs)
+
+    def row(self, doc):
+        regs, users, courses = self.refs["registrations"], self.refs["users"], self.refs["courses"]
+        reg = doc.get("registration")
+        student = regs.get(reg, "student")
+        return (
+            doc["_id"],
+            doc["_id"].generation_time,
+            reg,
+            users.get(student, "student_id"),
+            users.get(student, "email"),
+            courses.get(regs.get(reg, "course"), "course_code"),
+            regs.get(reg, "section"),
+            doc.get("amount"),
+            doc.get("method"),
+            doc.get("status"),
+            doc.get("transaction_id"),
+        )
+
+
+class EventRegistrationDataset(Dataset):
+    name = "event_registrations"
+    document = EventRegistration
+    fields = ("event", "user", "department", "batch", "status", "created_at")
+    columns = (
+        "id", "created_at", "event_id", "event_title", "student_id", "email", "name",
+        "department", "batch", "status",
+    )
+    filter_name = "event"
+
+    def references(self):
+        return {"users": _Names(User, ["student_id", "email", "name"]), "events": _Names(Event, ["title"])}
+
+    def resolve(self, docs):
+        self.refs["users"].load(doc.get("user") for doc in docs)
+        self.refs["events"].load(doc.get("event") for doc in docs)
+
+    def row(self, doc):
+        users = self.refs["users"]
+        return (
+            doc["_id"],
+            doc.get("created_at"),
+            doc.get("event"),
+            self.refs["events"].get(doc.get("event"), "title"),
+            users.get(doc.get("user"), "student_id"),
+            users.get(doc.get("user"), "email"),
+            users.get(doc.get("user"), "name"),
+            _department_code(doc.get("department")),
+            doc.get("batch"),
+            doc.get("status"),
+        )
+
+
+class EventPaymentDataset(Dataset):
+    name = "event_payments"
+    document = EventPayment
+    fields = (
+        "registration", "amount", "method", "trx_id", "submitted_at",
+        "verification_status", "verified_by", "verified_at",
+    )
+    columns = (
+        "id", "submitted_at", "registration_id", "event_title", "student_id", "email",
+        "amount", "method", "trx_id", "verification_status", "verified_by", "verified_at",
+    )
+    filter_name = "event"
+
+    def references(self):
+        return {
+            "registrations": _Names(EventRegistration, ["event", "user"]),
+            "users": _Names(User, ["student_id", "email"]),
+            "events": _Names(Event, ["title"]),
+        }
+
+    def chunks(self, filters, raw_query=None):
+        if filters.get("event") and raw_query is None:
+            return self._chunks_through(EventRegistration, {"event": filters["event"]})
+        return super().chunks(filters, raw_query=raw_query)
+
+    def resolve(self, docs):
+        regs = self.refs["registrations"]
+        regs.load(doc.get("registration") for doc in docs)
+        self.refs["users"].load(
+            [regs.get(doc.get("registration"), "user") for doc in docs] + [doc.get("verified_by") for doc in docs]
+        )
+        self.refs["events"].load(regs.get(doc.get("registration"), "event") for doc in docs)
+
+    def row(self, doc):
+        regs, users = self.refs["registrations"], self.refs["users"]
+        reg = doc.get("registration")
+        user = regs.get(reg, "user")
+        return (
+            doc["_id"],
+            doc.get("submitted_at"),
+            reg,
+            self.refs["events"].get(regs.get(reg, "event"), "title"),
+            users.get(user, "student_id"),
+            users.get(user, "email"),
+            doc.get("amount"),
+            doc.get("method"),
+            doc.get("trx_id"),
+            doc.get("verification_status"),
+            users.get(doc.get("verified_by"), "email"),
+            doc.get("verified_at"),
+        )
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in (CourseRegistrationDataset, PaymentDataset, EventRegistrationDataset, EventPaymentDataset)
+}
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def render(dataset, rows, fmt):
+    """
+    Yield the export as text, one string per cursor batch, so a response or
+    file receives it in pieces of bounded size.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(dataset.columns)
+
+    for batch in _batched(rows, dataset.batch_size):
+        for row in batch:
+            if writer:
+                writer.writerow([_text(value) for value in row])
+            else:
+                record = {column: None if value is None else _text(value) for column, value in zip(dataset.columns, row)}
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export(name, filters=None, fmt="csv", batch_size=None, raw_query=None):
+    """(dataset, text chunks) for DATASETS[name]."""
+    if fmt not in EXPORT_FORMATS:
+        raise ExportFilterError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    dataset = DATASETS[name](batch_size=batch_size)
+    return dataset, render(dataset, dataset.rows(filters or {}, raw_query=raw_query), fmt)
@@ -0,0 +1,113 @@
+# exports/management/commands/bench_export.py
+import os
+import resource
+import time
+import tracemalloc
+import uuid
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.departments import department_registry
+from accounts.models import User
+from course.models import Course, CourseRegistration
+from course.serializers import CourseRegistrationSerializer
+from exports.datasets import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed N course registrations, export them through the streaming exporter "
+        "and report throughput and peak memory (seeded rows are removed afterwards)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500000)
+        parser.add_argument("--courses", type=int, default=100)
+        parser.add_argument("--output", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--compare", action="store_true",
+                            help="Also time the old way: load every document and serialize it")
+
+    def _seed(self, tag, rows, course_count):
+        departments = department_registry.all()
+        if not departments:
+            raise CommandError("Create at least one department first")
+        course_ids = [ObjectId() for _ in range(course_count)]
+        Course._get_collection().insert_many([
+            {"_id": pk, "course_code": f"BENCH-{tag}-{i}", "department": departments[0].id, "credit_hour": 3}
+            for i, pk in enumerate(course_ids)
+        ])
+        student_count = -(-rows // course_count)
+        student_ids = [ObjectId() for _ in range(student_count)]
+        users = User._get_collection()
+        for start in range(0, student_count, 10000):
+            users.insert_many([
+                {"_id": pk, "student_id": f"BENCH-{tag}-{start + i}", "email": f"bench-{tag}-{start + i}@ugrad.iiuc.ac.bd",
+                 "name": "Export Bench", "role": "student", "is_active": "yes"}
+                for i, pk in enumerate(student_ids[start:start + 10000])
+            ])
+        registrations = CourseRegistration._get_collection()
+        batch = []
+        for n in range(rows):
+            batch.append({
+                "student": student_ids[n // course_count],
+                "course": course_ids[n % course_count],
+                "section": "A",
+                "status": "confirmed",
+            })
+            if len(batch) == 10000:
+                registrations.insert_many(batch)
+                batch = []
+        if batch:
+            registrations.insert_many(batch)
+        return course_ids, student_ids
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        course_ids, student_ids = self._seed(tag, options["rows"], options["courses"])
+        self.stdout.write(f"seeded {options['rows']} registrations in {time.perf_counter() - started:.1f}s")
+        query = {"course": {"$in": course_ids}}
+
+        try:
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            tracemalloc.start()
+            started = time.perf_counter()
+            dataset, chunks = export(
+                "course_registrations", fmt=options["output"], batch_size=options["batch_size"], raw_query=query
+            )
+            written = rows = 0
+            with open(os.devnull, "w") as sink:
+                for chunk in chunks:
+                    sink.write(chunk)
+                    written += len(chunk)
+                    rows += chunk.count("\n")
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f"streaming  rows={rows - (options['output'] == 'csv')} {elapsed:.1f}s "
+                f"({rows / elapsed:,.0f} rows/s) {written / 1e6:.1f} MB, "
+                f"python peak={peak / 1e6:.1f} MB, name lookups={dataset.lookups}, "
+                f"max rss growth={(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024:.1f} MB"
+            )
+
+            if options["compare"]:
+                tracemalloc.start()
+                started = time.perf_counter()
+                data = [
+                    CourseRegistrationSerializer(reg).data
+                    for reg in CourseRegistration.objects(__raw__=query)
+                ]
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f"list+serialize rows={len(data)} {elapsed:.1f}s ({len(data) / elapsed:,.0f} rows/s), "
+                    f"python peak={peak / 1e6:.1f} MB"
+                )
+        finally:
+            CourseRegistration._get_collection().delete_many(query)
+            User._get_collection().delete_many({"_id": {"$in": student_ids}})
+            Course._get_collection().delete_many({"_id": {"$in": course_ids}})
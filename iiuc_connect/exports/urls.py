@@ -0,0 +1,7 @@
+# exports/urls.py
+from django.urls import path
+from .views import ExportAPIView
+
+urlpatterns = [
+    path('<str:dataset>/', ExportAPIView.as_view(), name='export'),
+]
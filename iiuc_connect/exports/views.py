@@ -0,0 +1,43 @@
+# exports/views.py
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.authentication import JWTAuthentication
+from event.models import Event
+from .datasets import DATASETS, EXPORT_FORMATS, ExportFilterError, export
+
+
+# Full dumps streamed as CSV / NDJSON (?output=csv|ndjson). Admins export anything; event
+# creators and managers may export their own event (?event=<id>).
+class ExportAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
+
+    def _can_export(self, user, dataset, filters):
+        if getattr(user, "role", None) == "admin":
+            return True
+        if dataset.filter_name != "event" or "event" not in filters:
+            return False
+        event = Event.objects(id=filters["event"]).only("creator", "managers").as_pymongo().first()
+        return bool(event) and (user.id == event.get("creator") or user.id in event.get("managers", []))
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            return Response({"error": f"Unknown export: {dataset}"}, status=404)
+        # not ?format=, which DRF reserves for renderer selection
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+        try:
+            filters = DATASETS[dataset].parse_filters(request.query_params)
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=400)
+        if not self._can_export(request.user, DATASETS[dataset], filters):
+            return Response({"error": "Permission denied"}, status=403)
+
+        _, chunks = export(dataset, filters, fmt)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[fmt])
+        filename = f"{dataset}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
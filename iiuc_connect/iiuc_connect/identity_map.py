@@ -0,0 +1,99 @@
+# iiuc_connect/identity_map.py
+import contextvars
+from contextlib import contextmanager
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+_current = contextvars.ContextVar("identity_map", default=None)
+
+
+class IdentityMap:
+    """
+    Documents loaded during one request, keyed by (collection, id), so the
+    same Department / Course / User is fetched at most once per request.
+    Only fully loaded documents are stored, never `.only()` projections.
+    """
+
+    def __init__(self):
+        self._documents = {}
+        self.hits = 0
+        self.loads = 0
+
+    @staticmethod
+    def _key(document_cls, pk):
+        return document_cls._get_collection_name(), str(pk)
+
+    def get(self, document_cls, pk):
+        doc = self._documents.get(self._key(document_cls, pk))
+        if doc is not None:
+            self.hits += 1
+        return doc
+
+    def add(self, doc):
+        self._documents[self._key(type(doc), doc.pk)] = doc
+
+    def forget(self, document_cls, pk):
+        self._documents.pop(self._key(document_cls, pk), None)
+
+    def __len__(self):
+        return len(self._documents)
+
+
+def current_identity_map():
+    return _current.get()
+
+
+@contextmanager
+def identity_scope():
+    """Open a fresh identity map for the current context (request, task, command)."""
+    token = _current.set(IdentityMap())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def forget(document_cls, *pks):
+    """
+    Drop documents from the current identity map after a write that
+    bypasses Document.save (update_one, modify, raw collection writes), so
+    the rest of the request does not read the stale copy.
+    """
+    identity_map = _current.get()
+    if identity_map is not None:
+        for pk in pks:
+            identity_map.forget(document_cls, pk)
+
+
+def get_document(document_cls, pk):
+    """
+    `document_cls.objects(id=pk).first()`, de-duplicated through the current
+    identity map. Returns None for missing documents and malformed ids.
+    """
+    if pk is None:
+        return None
+    try:
+        pk = pk if isinstance(pk, ObjectId) else ObjectId(str(pk))
+    except (InvalidId, TypeError):
+        return None
+
+    # Documents kept in a process-wide registry (Department) never hit Mongo
+    registry_lookup = getattr(document_cls, "registry_lookup", None)
+    if registry_lookup is not None:
+        doc = registry_lookup(pk)
+        if doc is not None:
+            return doc
+
+    identity_map = _current.get()
+    if identity_map is not None:
+        doc = identity_map.get(document_cls, pk)
+        if doc is not None:
+            return doc
+
+    doc = document_cls.objects(id=pk).first()
+    if doc is not None and identity_map is not None:
+        identity_map.loads += 1
+        identity_map.add(doc)
+    return doc
@@ -0,0 +1,74 @@
+# iiuc_connect/middleware.py
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from iiuc_connect.identity_map import identity_scope
+from iiuc_connect.mongo_metrics import count_commands
+
+
+logger = logging.getLogger(__name__)
+
+
+class MongoQueryCountMiddleware:
+    """
+    Counts Mongo commands per request and reports them in the
+    X-Mongo-Queries header when DEBUG or MONGO_QUERY_HEADER is on. Requests over MONGO_QUERY_BUDGET are logged
+    so N+1 regressions show up in development.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget = getattr(settings, "MONGO_QUERY_BUDGET", None)
+        self.header = settings.DEBUG or getattr(settings, "MONGO_QUERY_HEADER", False)
+
+    def __call__(self, request):
+        with count_commands() as tally:
+            response = self.get_response(request)
+        if self.header:
+            response["X-Mongo-Queries"] = str(tally.total)
+        if self.budget is not None and tally.total > self.budget:
+            logger.warning(
+                "%s %s issued %d Mongo commands (budget %d): %s",
+                request.method, request.path, tally.total, self.budget, dict(tally),
+            )
+        return response
+
+
+class IdentityMapMiddleware:
+    """
+    Gives every request its own identity map (a context variable, so it is
+    isolated per request under both WSGI threads and ASGI tasks) and reports
+    how many document loads it saved in X-Identity-Map-Hits.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with identity_scope() as identity_map:
+            response = self.get_response(request)
+        return self._report(request, response, identity_map)
+
+    async def __acall__(self, request):
+        with identity_scope() as identity_map:
+            response = await self.get_response(request)
+        return self._report(request, response, identity_map)
+
+    def _report(self, request, response, identity_map):
+        response["X-Identity-Map-Hits"] = str(identity_map.hits)
+        if identity_map.hits:
+            logger.debug(
+                "%s %s: identity map saved %d loads (%d documents loaded)",
+                request.method, request.path, identity_map.hits, identity_map.loads,
+            )
+        return response
@@ -0,0 +1,71 @@
+# iiuc_connect/mongo_metrics.py
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+
+_active_counters = contextvars.ContextVar("mongo_command_counters", default=())
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    pymongo listener that tallies commands issued inside `count_commands()`
+    blocks. Outside such a block it costs one context-variable lookup.
+    """
+
+    def started(self, event):
+        for counter in _active_counters.get():
+            counter[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class CommandTally(Counter):
+    @property
+    def total(self):
+        return sum(self.values())
+
+    @property
+    def writes(self):
+        return sum(n for name, n in self.items() if name in WRITE_COMMANDS)
+
+    @property
+    def reads(self):
+        return self.total - self.writes
+
+
+command_counter = CommandCounter()
+
+
+@contextmanager
+def count_commands():
+    """
+    Count Mongo commands sent by the current thread / task:
+
+        with count_commands() as tally:
+            ...
+        tally.total, tally.writes, tally["find"]
+    """
+    tally = CommandTally()
+    token = _active_counters.set(_active_counters.get() + (tally,))
+    try:
+        yield tally
+    finally:
+        _active_counters.reset(token)
+
+
+@contextmanager
+def assert_max_commands(limit, label="block"):
+    """Fail when the block sends more than `limit` Mongo commands (for tests)."""
+    with count_commands() as tally:
+        yield tally
+    if tally.total > limit:
+        raise AssertionError(f"{label} issued {tally.total} Mongo commands, expected <= {limit}: {dict(tally)}")
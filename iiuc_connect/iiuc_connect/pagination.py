@@ -0,0 +1,122 @@
+# iiuc_connect/pagination.py
+import base64
+import binascii
+
+from bson import json_util
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class MongoCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for MongoEngine querysets.
+
+    Pages are selected with a range condition on an indexed sort field plus
+    `_id` as tie-breaker, so page N costs the same as page 1. Cursors are
+    opaque base64 tokens.
+
+    Opt-in: without `cursor` / `limit` query params paginate_queryset()
+    returns None and the view keeps its old unpaginated response. New
+    endpoints pass `opt_in=False` to always paginate.
+
+        GET /api/notification/?limit=50
+        GET /api/notification/?cursor=<next_cursor>&limit=50&include_total=1
+    """
+
+    ordering = "-id"
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    total_query_param = "include_total"
+
+    def __init__(self, ordering=None, page_size=None, max_page_size=None, opt_in=True):
+        self.opt_in = opt_in
+        if ordering:
+            self.ordering = ordering
+        if page_size:
+            self.page_size = page_size
+        if max_page_size:
+            self.max_page_size = max_page_size
+        self.next_cursor = None
+        self.total = None
+
+    # Cursor encoding
+    @staticmethod
+    def encode_cursor(value, pk):
+        raw = json_util.dumps({"v": value, "id": pk}).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(token):
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            data = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+            return data["v"], data["id"]
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise ValidationError({"cursor": "Invalid cursor"})
+
+    def is_requested(self, request):
+        if not self.opt_in:
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            raise ValidationError({self.page_size_query_param: "Must be an integer"})
+        return max(1, min(size, self.max_page_size))
+
+    def _sort_spec(self, document):
+        descending = self.ordering.startswith("-")
+        field = self.ordering.lstrip("-+")
+        db_field = "_id" if field in ("id", "pk") else document._fields[field].db_field
+        return field, db_field, descending
+
+    def _after(self, db_field, descending, value, pk):
+        op = "$lt" if descending else "$gt"
+        if db_field == "_id":
+            return {"_id": {op: pk}}
+        return {"$or": [
+            {db_field: {op: value}},
+            {db_field: value, "_id": {op: pk}},
+        ]}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        page_size = self.get_page_size(request)
+        field, db_field, descending = self._sort_spec(queryset._document)
+
+        if request.query_params.get(self.total_query_param) in ("1", "true", "True"):
+            self.total = queryset.count()
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            value, pk = self.decode_cursor(token)
+            queryset = queryset.filter(__raw__=self._after(db_field, descending, value, pk))
+
+        sign = "-" if descending else "+"
+        order = [f"{sign}{field}"] if db_field == "_id" else [f"{sign}{field}", f"{sign}id"]
+        items = list(queryset.order_by(*order).limit(page_size + 1))
+
+        self.next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            last = items[-1]
+            value = None if db_field == "_id" else getattr(last, field)
+            self.next_cursor = self.encode_cursor(value, last.pk)
+        return items
+
+    def get_paginated_data(self, data):
+        payload = {"results": data, "next_cursor": self.next_cursor}
+        if self.total is not None:
+            payload["total"] = self.total
+        return payload
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -0,0 +1,99 @@
+# iiuc_connect/prefetch.py
+from collections import defaultdict
+
+from bson import DBRef, ObjectId
+from mongoengine import Document
+
+from iiuc_connect.identity_map import current_identity_map
+
+
+def _ref_id(value):
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, ObjectId):
+        return value
+    return None
+
+
+def reference_id(doc, field):
+    """Id stored in a ReferenceField, without dereferencing it."""
+    value = doc._data.get(field)
+    if isinstance(value, Document):
+        return value.pk
+    return _ref_id(value)
+
+
+def _resolve(documents, path):
+    """Documents reachable through an already prefetched dotted path."""
+    current = documents
+    for name in path:
+        current = [
+            doc._data.get(name) for doc in current
+            if isinstance(doc._data.get(name), Document)
+        ]
+    return current
+
+
+def prefetch_references(documents, *paths, only=None):
+    """
+    Batch-dereference ReferenceFields on a list of documents.
+
+    Every path costs one `$in` query per referenced collection instead of
+    one query per row, and the loaded documents are attached in place so
+    `doc.department.name` no longer hits Mongo:
+
+        routines = list(queryset)
+        prefetch_references(routines, "course", "teacher", "department")
+        prefetch_references(payments, "registration", "registration.course",
+                            only={"registration.course": ("course_code",)})
+
+    Nested paths must list their parent first. `only` maps a path to the
+    fields to load for it. Returns `documents` for chaining.
+    """
+    documents = list(documents)
+    only = only or {}
+    identity_map = current_identity_map()
+
+    for path in paths:
+        *parents, field = path.split(".")
+        owners = _resolve(documents, parents)
+        if not owners:
+            continue
+
+        # Group the pending references by target document class
+        pending = defaultdict(list)
+        for doc in owners:
+            ref_id = _ref_id(doc._data.get(field))
+            if ref_id is not None:
+                document_type = doc._fields[field].document_type
+                pending[document_type].append((doc, ref_id))
+
+        for document_type, entries in pending.items():
+            loaded = {}
+            ids = set()
+            registry_lookup = getattr(document_type, "registry_lookup", None)
+            for _, ref_id in entries:
+                cached = registry_lookup(ref_id) if registry_lookup is not None else None
+                if cached is None and identity_map is not None:
+                    cached = identity_map.get(document_type, ref_id)
+                if cached is not None:
+                    loaded[ref_id] = cached
+                else:
+                    ids.add(ref_id)
+
+            if ids:
+                queryset = document_type.objects(id__in=list(ids))
+                if path in only:
+                    queryset = queryset.only(*only[path])
+                for obj in queryset:
+                    loaded[obj.pk] = obj
+                    # projections must not leak to code expecting full documents
+                    if identity_map is not None and path not in only:
+                        identity_map.loads += 1
+                        identity_map.add(obj)
+            for doc, ref_id in entries:
+                if ref_id in loaded:
+                    # write _data directly so the owner is not marked as changed
+                    doc._data[field] = loaded[ref_id]
+
+    return documents
@@ -23,11 +23,14 @@ MONGO_DB = os.getenv('MONGO_DB_NAME')
 MONGO_URI = os.getenv('MONGO_DB_URI')
 
 
+from iiuc_connect.mongo_metrics import command_counter
+
 connect(
     db=MONGO_DB,
     host=MONGO_URI,
     alias='default',
-    tls=True
+    tls=True,
+    event_listeners=[command_counter],  # query counting for benchmarks / budgets
 )
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
@@ -55,6 +58,9 @@ INSTALLED_APPS = [
     'routine',
     'event',
     'notification',
+    'uploads',
+    'search',
+    'exports',
     'corsheaders',
     'channels',
 ]
@@ -68,8 +74,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'iiuc_connect.middleware.MongoQueryCountMiddleware',
+    'iiuc_connect.middleware.IdentityMapMiddleware',
 ]
 
+# Log requests that issue more Mongo commands than this (unset = no check)
+MONGO_QUERY_BUDGET = int(os.getenv("MONGO_QUERY_BUDGET", 0)) or None
+# Send the per-request count as X-Mongo-Queries outside DEBUG too
+MONGO_QUERY_HEADER = os.getenv("MONGO_QUERY_HEADER", "False") == "True"
+
 ROOT_URLCONF = 'iiuc_connect.urls'
 
 TEMPLATES = [
@@ -138,8 +151,63 @@ REST_FRAMEWORK = {
     ),
 }
 
-
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Per-process identity cache used by JWTAuthentication
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 300))  # seconds
+# Upper bound for how long a revoked JWT stays usable on another worker
+TOKEN_VERSION_CACHE_TTL = int(os.getenv("TOKEN_VERSION_CACHE_TTL", 60))  # seconds
+
+# Media storage backend: "cloudinary" (production), "local" (files under
+# MEDIA_ROOT, for offline benchmarks) or "memory" (load tests)
+MEDIA_STORAGE_BACKEND = os.getenv("MEDIA_STORAGE_BACKEND", "cloudinary")
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", str(BASE_DIR / "media"))
+MEDIA_URL = os.getenv("MEDIA_URL", "/media/")
+
+# Background media uploads: files are spooled here, then pushed to storage
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", str(BASE_DIR / "upload_spool"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 4))
+
+# Profile picture preprocessing (Pillow), done by the upload workers
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 1024))
+IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", 160))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP")  # WEBP or JPEG
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+
+# Department registry: how often each worker compares its copy with the
+# version counter in Mongo (seconds)
+DEPARTMENT_REGISTRY_CHECK_SECONDS = int(os.getenv("DEPARTMENT_REGISTRY_CHECK_SECONDS", 5))
+
+# In-process search index (search/index.py): full rebuild interval in seconds
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", 300))
+
+# Sharded site counters (accounts/stats.py)
+STATS_SHARDS = int(os.getenv("STATS_SHARDS", 8))
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", 30))  # seconds
+
+# Password hashing pool (werkzeug method string; changing it rehashes on next login)
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+PASSWORD_HASH_TIMEOUT = int(os.getenv("PASSWORD_HASH_TIMEOUT", 10))  # seconds
+
+# Set once `manage.py migrate_course_resources` has moved every legacy resource
+# array out of the courses collection; turns strict field checking back on
+COURSE_RESOURCES_MIGRATED = os.getenv("COURSE_RESOURCES_MIGRATED", "False") == "True"
+
+# Bulk user import (manage.py import_users / users/import/)
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", 0)) or None  # default: all cores
+IMPORT_TEMP_PASSWORD_METHOD = os.getenv("IMPORT_TEMP_PASSWORD_METHOD", "pbkdf2:sha256:1000")
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", 50000))  # per upload through the API
+IMPORT_SYNC_MAX_ROWS = int(os.getenv("IMPORT_SYNC_MAX_ROWS", 100))  # larger files become background jobs
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 1))  # background imports running at once
+IMPORT_REPORT_MAX_ERRORS = int(os.getenv("IMPORT_REPORT_MAX_ERRORS", 1000))  # per-row errors kept on a job
+
+# Streaming CSV / NDJSON exports (exports/datasets.py): rows per cursor batch and name lookup
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
+
+
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS') == 'True'
@@ -147,6 +215,13 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Email outbox worker (python manage.py send_outbox_emails)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv('EMAIL_OUTBOX_BACKOFF_SECONDS', 30))
+EMAIL_OUTBOX_RATE_PER_MINUTE = int(os.getenv('EMAIL_OUTBOX_RATE_PER_MINUTE', 120))
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 14))  # sent/dead rows
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
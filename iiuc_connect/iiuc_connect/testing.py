@@ -0,0 +1,94 @@
+# iiuc_connect/testing.py
+import unittest
+import uuid
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+from pymongo.errors import PyMongoError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.departments import department_registry
+from accounts.models import Department, User
+from iiuc_connect.mongo_metrics import assert_max_commands, count_commands
+
+
+class MongoTestCase(SimpleTestCase):
+    """
+    Runs against the configured MongoDB. Fixtures carry a random tag and
+    are removed afterwards; skipped when MongoDB is not reachable.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            Department._get_db().client.admin.command("ping")
+        except PyMongoError as e:
+            raise unittest.SkipTest(f"MongoDB not reachable: {e}")
+        super().setUpClass()
+        cls.tag = uuid.uuid4().hex[:8]
+        cls.factory = APIRequestFactory()
+        cls.department = Department(name=f"Test {cls.tag}", code=f"QC-{cls.tag}")
+        cls.department.save()
+        cls.user_ids = []
+        cls.admin = cls.make_users("admin", 1)[0]
+        cls.seed()
+        # no version checks in the middle of a measurement
+        cls._check_interval = department_registry.check_interval
+        department_registry.check_interval = 3600
+
+    @classmethod
+    def tearDownClass(cls):
+        department_registry.check_interval = cls._check_interval
+        cls.cleanup()
+        User._get_collection().delete_many({"_id": {"$in": cls.user_ids}})
+        cls.department.delete()
+        super().tearDownClass()
+
+    @classmethod
+    def seed(cls):
+        pass
+
+    @classmethod
+    def cleanup(cls):
+        pass
+
+    @classmethod
+    def make_users(cls, role, count):
+        """Insert users directly (no password hashing) and return them as documents."""
+        ids = [ObjectId() for _ in range(count)]
+        User._get_collection().insert_many([
+            {"_id": pk, "student_id": f"QC-{cls.tag}-{len(cls.user_ids) + i}",
+             "email": f"qc-{cls.tag}-{len(cls.user_ids) + i}@ugrad.iiuc.ac.bd", "name": f"Query Count {i}",
+             "password_hash": "-", "role": role, "is_active": "yes", "is_verified": "yes",
+             "department": cls.department.id}
+            for i, pk in enumerate(ids)
+        ])
+        cls.user_ids += ids
+        return list(User.objects(id__in=ids))
+
+
+class MongoQueryCountTestCase(MongoTestCase):
+    """Calls views and checks how many Mongo commands they send."""
+
+    rows = 25
+    page_sizes = (5, 20)
+
+    def call(self, view, user, path="/", **params):
+        request = self.factory.get(path, params)
+        force_authenticate(request, user=user)
+        response = view(request)
+        self.assertEqual(response.status_code, 200, getattr(response, "data", None))
+        return response
+
+    def assertConstantCommands(self, call, label):
+        """
+        `call(page_size)` must send as many commands for the larger page
+        size as for the smaller one; the first call warms lazy setup
+        (index creation, registries) and is not counted.
+        """
+        small, large = self.page_sizes
+        call(small)
+        with count_commands() as tally:
+            call(small)
+        with assert_max_commands(tally.total, f"{label} limit={large}"):
+            call(large)
@@ -1,4 +1,6 @@
 
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
@@ -9,5 +11,12 @@ urlpatterns = [
     path("api/routine/", include("routine.urls")),
     path("api/notification/", include("notification.urls")),
     path("api/event/", include("event.urls")),
+    path("api/uploads/", include("uploads.urls")),
+    path("api/search/", include("search.urls")),
+    path("api/exports/", include("exports.urls")),
     
 ]
+
+# Local media backend: let the dev server serve stored files
+if settings.MEDIA_STORAGE_BACKEND == "local":
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -59,3 +59,18 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             "type": "inactive_user",
             "user": event["data"]
         }))
+
+    # Admin-only: many inactive users activated / rejected in one go
+    async def inactive_users_batch(self, event):
+        await self.send(json.dumps({
+            "type": "inactive_users_batch",
+            "event": event["event"],
+            "users": event["data"]
+        }))
+
+    # Background upload finished / failed
+    async def upload_status(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "upload_status",
+            "data": event["data"]
+        }))
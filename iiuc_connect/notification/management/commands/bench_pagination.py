@@ -0,0 +1,86 @@
+# notification/management/commands/bench_pagination.py
+import datetime
+import statistics
+import time
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+from mongoengine.context_managers import switch_collection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from iiuc_connect.pagination import MongoCursorPagination
+from notification.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare keyset pagination with skip/limit and full listing as a "
+        "notification collection grows (uses a scratch collection)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--collection", default="bench_notifications")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        page_size = options["page_size"]
+        user_id = ObjectId()
+
+        with switch_collection(Notification, options["collection"]) as Bench:
+            coll = Bench._get_collection()
+            coll.drop()
+            Bench.ensure_indexes()
+            seeded = 0
+            base = datetime.datetime.utcnow()
+            try:
+                for size in sorted(options["sizes"]):
+                    batch = []
+                    for i in range(seeded, size):
+                        batch.append({
+                            "user": user_id, "title": f"bench {i}", "message": "benchmark",
+                            "notification_type": "announcement", "is_read": False,
+                            "created_at": base - datetime.timedelta(seconds=i),
+                        })
+                        if len(batch) == 5000:
+                            coll.insert_many(batch)
+                            batch = []
+                    if batch:
+                        coll.insert_many(batch)
+                    seeded = size
+
+                    qs = Bench.objects(user=user_id).order_by("-created_at")
+
+                    # a cursor pointing at the middle of the collection
+                    middle = qs.skip(size // 2).first()
+                    middle_cursor = MongoCursorPagination.encode_cursor(middle.created_at, middle.pk)
+
+                    def keyset(cursor):
+                        params = {"limit": page_size}
+                        if cursor:
+                            params["cursor"] = cursor
+                        request = Request(factory.get("/", params))
+                        return MongoCursorPagination(ordering="-created_at").paginate_queryset(qs, request)
+
+                    results = {
+                        "keyset first": self._time(lambda: keyset(None), options["repeat"]),
+                        "keyset middle": self._time(lambda: keyset(middle_cursor), options["repeat"]),
+                        "skip middle": self._time(lambda: list(qs.skip(size // 2).limit(page_size)), options["repeat"]),
+                        "full list": self._time(lambda: list(qs), max(1, options["repeat"] // 10)),
+                    }
+                    line = "  ".join(f"{name}={ms:8.2f}ms" for name, ms in results.items())
+                    self.stdout.write(f"docs={size:<7} {line}")
+            finally:
+                coll.drop()
+
+    @staticmethod
+    def _time(fn, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
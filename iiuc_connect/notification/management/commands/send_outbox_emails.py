@@ -0,0 +1,25 @@
+# notification/management/commands/send_outbox_emails.py
+from django.core.management.base import BaseCommand
+
+from notification.outbox import build_worker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued EmailOutbox messages in batches over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain a single batch and exit")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--rate-per-minute", type=int)
+        parser.add_argument("--idle-seconds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        worker = build_worker(
+            batch_size=options["batch_size"],
+            rate_per_minute=options["rate_per_minute"],
+            stdout=self.stdout,
+        )
+        if options["once"]:
+            worker.drain_once()
+            return
+        worker.run_forever(idle_seconds=options["idle_seconds"])
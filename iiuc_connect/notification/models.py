@@ -1,5 +1,5 @@
 # notifications/models.py
-from mongoengine import Document, ReferenceField, StringField, BooleanField, DateTimeField
+from mongoengine import Document, ReferenceField, StringField, BooleanField, DateTimeField, IntField
 from django.utils import timezone
 from accounts.models import User
 
@@ -13,5 +13,31 @@ class Notification(Document):
 
     meta = {
         'collection': 'notifications',
-        'indexes': ['user', 'is_read', 'created_at']
+        'indexes': ['user', 'is_read', 'created_at', ('user', '-created_at')]
+    }
+
+
+class EmailOutbox(Document):
+    """Queued outgoing email; drained in batches by the send_outbox_emails worker."""
+    to = StringField(required=True)
+    subject = StringField(required=True)
+    body = StringField(required=True)
+    from_email = StringField()
+    status = StringField(choices=['pending', 'sending', 'sent', 'dead'], default='pending')
+    attempts = IntField(default=0)
+    next_attempt_at = DateTimeField(default=timezone.now)
+    locked_until = DateTimeField()   # lease while a worker holds the message
+    claim = StringField()            # batch token of the worker holding it
+    last_error = StringField()
+    created_at = DateTimeField(default=timezone.now)
+    sent_at = DateTimeField()
+    expires_at = DateTimeField()     # set once sent or dead; the TTL index removes the row
+
+    meta = {
+        'collection': 'email_outbox',
+        'indexes': [
+            ('status', 'next_attempt_at'),
+            'claim',
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0},
+        ]
     }
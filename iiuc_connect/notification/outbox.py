@@ -0,0 +1,147 @@
+# notification/outbox.py
+import datetime
+import time
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from mongoengine.queryset.visitor import Q
+
+from .models import EmailOutbox
+
+
+class OutboxWorker:
+    """
+    Drains EmailOutbox in batches over one reused SMTP connection.
+
+    Failed messages are retried with exponential backoff and dead-lettered
+    (status="dead") after `max_attempts`. `rate_per_minute` caps throughput
+    so we stay under the SMTP provider's sending limits. Sent and dead rows
+    are kept for `retention_days` and then dropped by the TTL index.
+    """
+
+    def __init__(self, batch_size=50, max_attempts=5, backoff_seconds=30,
+                 rate_per_minute=120, lease_seconds=300, retention_days=14, stdout=None):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.rate_per_minute = rate_per_minute
+        self.lease_seconds = lease_seconds
+        self.retention_days = retention_days
+        self.stdout = stdout
+        self._window_start = time.monotonic()
+        self._window_sent = 0
+
+    def _log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def claim_batch(self, limit):
+        """Lease up to `limit` due messages to this worker (3 round trips per batch)."""
+        now = timezone.now()
+        due = (
+            Q(status="pending", next_attempt_at__lte=now)
+            | Q(status="sending", locked_until__lt=now)  # lease of a crashed worker expired
+        )
+        ids = [m["_id"] for m in EmailOutbox.objects(due).order_by("next_attempt_at").limit(limit).only("id").as_pymongo()]
+        if not ids:
+            return []
+
+        claim = uuid.uuid4().hex
+        EmailOutbox.objects(due & Q(id__in=ids)).update(
+            set__status="sending",
+            set__claim=claim,
+            set__locked_until=now + datetime.timedelta(seconds=self.lease_seconds),
+        )
+        return list(EmailOutbox.objects(claim=claim, status="sending"))
+
+    def _wait_for_rate_limit(self):
+        if not self.rate_per_minute:
+            return
+        elapsed = time.monotonic() - self._window_start
+        if elapsed >= 60:
+            self._window_start = time.monotonic()
+            self._window_sent = 0
+        elif self._window_sent >= self.rate_per_minute:
+            time.sleep(60 - elapsed)
+            self._window_start = time.monotonic()
+            self._window_sent = 0
+
+    def _expires_at(self):
+        return timezone.now() + datetime.timedelta(days=self.retention_days)
+
+    def _mark_failed(self, message, error):
+        attempts = (message.attempts or 0) + 1
+        if attempts >= self.max_attempts:
+            EmailOutbox.objects(id=message.id).update_one(
+                set__status="dead", set__attempts=attempts, set__last_error=error,
+                set__expires_at=self._expires_at(), unset__claim=True, unset__locked_until=True,
+            )
+            return
+        delay = self.backoff_seconds * (2 ** (attempts - 1))
+        EmailOutbox.objects(id=message.id).update_one(
+            set__status="pending", set__attempts=attempts, set__last_error=error,
+            set__next_attempt_at=timezone.now() + datetime.timedelta(seconds=delay),
+            unset__claim=True, unset__locked_until=True,
+        )
+
+    def drain_once(self):
+        """Send one batch; returns (sent, failed)."""
+        limit = self.batch_size
+        if self.rate_per_minute:
+            limit = min(limit, self.rate_per_minute)
+        batch = self.claim_batch(limit)
+        if not batch:
+            return 0, 0
+
+        sent_ids, failed = [], 0
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            for message in batch:
+                self._mark_failed(message, f"connection: {e}")
+            return 0, len(batch)
+
+        try:
+            for message in batch:
+                self._wait_for_rate_limit()
+                try:
+                    EmailMessage(
+                        message.subject, message.body, message.from_email, [message.to],
+                        connection=connection,
+                    ).send()
+                    sent_ids.append(message.id)
+                    self._window_sent += 1
+                except Exception as e:
+                    failed += 1
+                    self._mark_failed(message, str(e))
+        finally:
+            connection.close()
+
+        if sent_ids:
+            EmailOutbox.objects(id__in=sent_ids).update(
+                set__status="sent", set__sent_at=timezone.now(), set__expires_at=self._expires_at(),
+                unset__claim=True, unset__locked_until=True,
+            )
+        self._log(f"outbox: sent={len(sent_ids)} failed={failed}")
+        return len(sent_ids), failed
+
+    def run_forever(self, idle_seconds=5):
+        while True:
+            sent, failed = self.drain_once()
+            if not sent and not failed:
+                time.sleep(idle_seconds)
+
+
+def build_worker(**overrides):
+    options = {
+        "batch_size": getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 50),
+        "max_attempts": getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5),
+        "backoff_seconds": getattr(settings, "EMAIL_OUTBOX_BACKOFF_SECONDS", 30),
+        "rate_per_minute": getattr(settings, "EMAIL_OUTBOX_RATE_PER_MINUTE", 120),
+        "retention_days": getattr(settings, "EMAIL_OUTBOX_RETENTION_DAYS", 14),
+    }
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    return OutboxWorker(**options)
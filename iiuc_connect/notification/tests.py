@@ -1,3 +1,132 @@
-from django.test import TestCase
+import datetime
+import smtplib
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import override_settings
+from django.utils import timezone
+
+from iiuc_connect.testing import MongoTestCase
+from notification import outbox
+from notification.models import EmailOutbox
+from notification.outbox import OutboxWorker
+from notification.utils import enqueue_email, enqueue_emails
+
+
+class FlakyBackend(locmem.EmailBackend):
+    """locmem backend that counts opened connections and refuses `failing` recipients."""
+    opened = 0
+    failing = set()
+
+    def open(self):
+        type(self).opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            refused = set(message.to) & self.failing
+            if refused:
+                raise smtplib.SMTPRecipientsRefused({to: (550, b"mailbox unavailable") for to in refused})
+        return super().send_messages(messages)
+
+
+def utcnow():
+    # Mongo hands datetimes back naive (UTC)
+    return timezone.now().replace(tzinfo=None)
+
+
+@override_settings(EMAIL_BACKEND="notification.tests.FlakyBackend")
+class OutboxWorkerTests(MongoTestCase):
+    @classmethod
+    def cleanup(cls):
+        EmailOutbox.objects(to__startswith=f"qc-{cls.tag}-").delete()
+
+    def setUp(self):
+        # the worker claims every due row, so never run it over a live queue
+        if EmailOutbox.objects(to__not__startswith=f"qc-{self.tag}-", status__in=["pending", "sending"]).count():
+            self.skipTest("email_outbox holds queued messages")
+        FlakyBackend.opened = 0
+        FlakyBackend.failing = set()
+        self.addCleanup(self.cleanup)
+
+    def address(self, n):
+        return f"qc-{self.tag}-{n}@example.com"
+
+    def make_due(self, to):
+        EmailOutbox.objects(to=to).update_one(set__next_attempt_at=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_drain_sends_queued_batch_over_one_connection(self):
+        addresses = [self.address(i) for i in range(5)]
+        enqueue_email(addresses[0], "Subject 0", "Body")
+        self.assertEqual(enqueue_emails([(to, f"Subject {i}", "Body") for i, to in enumerate(addresses[1:], 1)]), 4)
+        queued = EmailOutbox.objects(to__in=addresses)
+        self.assertEqual({row.status for row in queued}, {"pending"})
+        self.assertEqual({row.attempts for row in queued}, {0})
+
+        worker = OutboxWorker(batch_size=10, rate_per_minute=0)
+        self.assertEqual(worker.drain_once(), (5, 0))
+        self.assertEqual(FlakyBackend.opened, 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(addresses))
+
+        retention = datetime.timedelta(days=worker.retention_days)
+        for row in EmailOutbox.objects(to__in=addresses):
+            self.assertEqual(row.status, "sent")
+            self.assertIsNotNone(row.sent_at)
+            self.assertIsNone(row.claim)
+            self.assertAlmostEqual((row.expires_at - utcnow()).total_seconds(), retention.total_seconds(), delta=60)
+        self.assertEqual(worker.drain_once(), (0, 0))
+
+    def test_failed_message_backs_off_then_dead_letters(self):
+        good, bad = self.address(0), self.address(1)
+        enqueue_emails([(good, "Hello", "Body"), (bad, "Hello", "Body")])
+        FlakyBackend.failing = {bad}
+        worker = OutboxWorker(batch_size=10, max_attempts=3, backoff_seconds=30, rate_per_minute=0)
+
+        self.assertEqual(worker.drain_once(), (1, 1))
+        for attempts, delay in ((1, 30), (2, 60)):
+            row = EmailOutbox.objects.get(to=bad)
+            self.assertEqual(row.status, "pending")
+            self.assertEqual(row.attempts, attempts)
+            self.assertIn(bad, row.last_error)
+            self.assertIsNone(row.expires_at)
+            self.assertAlmostEqual((row.next_attempt_at - utcnow()).total_seconds(), delay, delta=5)
+            self.assertEqual(worker.drain_once(), (0, 0))  # not due before the backoff ends
+
+            self.make_due(bad)
+            self.assertEqual(worker.drain_once(), (0, 1))
+
+        row = EmailOutbox.objects.get(to=bad)
+        self.assertEqual(row.status, "dead")
+        self.assertEqual(row.attempts, 3)
+        self.assertIsNotNone(row.expires_at)
+        self.make_due(bad)
+        self.assertEqual(worker.drain_once(), (0, 0))
+        self.assertEqual([message.to for message in mail.outbox], [[good]])
+
+    def test_build_worker_dead_letters_after_configured_attempts(self):
+        bad = self.address(0)
+        enqueue_email(bad, "Hello", "Body")
+        FlakyBackend.failing = {bad}
+        worker = outbox.build_worker(rate_per_minute=0)
+
+        for _ in range(settings.EMAIL_OUTBOX_MAX_ATTEMPTS):
+            self.make_due(bad)
+            self.assertEqual(worker.drain_once(), (0, 1))
+        row = EmailOutbox.objects.get(to=bad)
+        self.assertEqual((row.status, row.attempts), ("dead", settings.EMAIL_OUTBOX_MAX_ATTEMPTS))
+
+    def test_rate_cap_waits_for_the_next_minute(self):
+        enqueue_emails([(self.address(i), "Hello", "Body") for i in range(5)])
+        worker = OutboxWorker(batch_size=10, rate_per_minute=2)
+
+        with mock.patch.object(outbox.time, "sleep") as sleep:
+            self.assertEqual(worker.drain_once(), (2, 0))
+            sleep.assert_not_called()
+            self.assertEqual(worker.drain_once(), (2, 0))
+            self.assertEqual(sleep.call_count, 1)
+            self.assertTrue(0 < sleep.call_args[0][0] <= 60)
+
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(EmailOutbox.objects(to__startswith=f"qc-{self.tag}-", status="pending").count(), 1)
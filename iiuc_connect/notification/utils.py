@@ -1,6 +1,10 @@
+import asyncio
+
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-from .models import Notification
+from django.conf import settings
+from django.utils import timezone
+from .models import EmailOutbox, Notification
 from accounts.models import User
 
 
@@ -38,6 +42,45 @@ def create_notification(user: User, title: str, message: str, notification_type=
     #     }
     # )
 
+def create_notifications(user_ids, title: str, message: str, notification_type='announcement'):
+    """Same notification for many users: one insert, then the live pushes in one batch."""
+    user_ids = list(user_ids)
+    now = timezone.now()
+    docs = [
+        Notification(user=user_id, title=title, message=message,
+                     notification_type=notification_type, created_at=now)
+        for user_id in user_ids
+    ]
+    if not docs:
+        return 0
+    Notification.objects.insert(docs, load_bulk=False)
+    push_to_users(user_ids, {
+        "type": "send_notification",
+        "data": {
+            "title": title,
+            "message": message,
+            "notification_type": notification_type,
+            "is_read": False,
+            "created_at": now.isoformat()
+        }
+    })
+    return len(docs)
+
+
+async def _group_send_many(channel_layer, user_ids, event, batch_size):
+    for start in range(0, len(user_ids), batch_size):
+        await asyncio.gather(*(
+            channel_layer.group_send(f"notifications_{user_id}", event)
+            for user_id in user_ids[start:start + batch_size]
+        ))
+
+
+def push_to_users(user_ids, event, batch_size=500):
+    """Send one channel-layer event to many users' groups from a single async_to_sync call."""
+    user_ids = list(user_ids)
+    if user_ids:
+        async_to_sync(_group_send_many)(get_channel_layer(), user_ids, event, batch_size)
+
 def send_ws_notification(user_id, title, message, notification_type):
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
@@ -51,3 +94,24 @@ def send_ws_notification(user_id, title, message, notification_type):
             }
         }
     )
+
+
+def _default_from_email():
+    return getattr(settings, "DEFAULT_FROM_EMAIL", None) or settings.EMAIL_HOST_USER
+
+
+def enqueue_email(to, subject, body, from_email=None):
+    """Queue one email for the outbox worker instead of sending it in-request."""
+    message = EmailOutbox(to=to, subject=subject, body=body, from_email=from_email or _default_from_email())
+    message.save()
+    return message
+
+
+def enqueue_emails(messages, from_email=None):
+    """Queue many (to, subject, body) emails with a single insert."""
+    from_email = from_email or _default_from_email()
+    docs = [EmailOutbox(to=to, subject=subject, body=body, from_email=from_email) for to, subject, body in messages]
+    if not docs:
+        return 0
+    EmailOutbox.objects.insert(docs, load_bulk=False)
+    return len(docs)
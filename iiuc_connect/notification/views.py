@@ -6,6 +6,7 @@ from accounts.authentication import JWTAuthentication
 from .models import Notification
 from .serializers import NotificationSerializer
 from mongoengine.queryset.visitor import Q
+from iiuc_connect.pagination import MongoCursorPagination
 
 # List notifications for logged-in user
 class NotificationListAPIView(APIView):
@@ -14,6 +15,10 @@ class NotificationListAPIView(APIView):
     def get(self, request):
         user = request.user
         notifications = Notification.objects(user=user).order_by('-created_at')
+        paginator = MongoCursorPagination(ordering="-created_at")
+        page = paginator.paginate_queryset(notifications, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data)
 
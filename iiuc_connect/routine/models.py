@@ -1,5 +1,5 @@
 import mongoengine as me
-from accounts.models import Department, User
+from accounts.models import DepartmentReferenceField, User
 from course.models import Course
 
 class Routine(me.Document):
@@ -8,7 +8,7 @@ class Routine(me.Document):
     room_number = me.StringField(required=True)
     period = me.IntField(min_value=1, max_value=6, required=True)
     day = me.StringField(choices=["Saturday","Sunday","Monday","Tuesday","Wednesday","Thursday"], required=True)
-    department = me.ReferenceField(Department, required=True)
+    department = DepartmentReferenceField(required=True)
     section = me.StringField(required=True)
 
     mmeta = {
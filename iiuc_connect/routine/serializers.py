@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import Routine
 from course.models import Course
 from accounts.models import User, Department
+from iiuc_connect.identity_map import get_document
+from iiuc_connect.prefetch import reference_id
 
 class RoutineSerializer(serializers.Serializer):
     course = serializers.CharField(required=False)
@@ -15,13 +17,15 @@ class RoutineSerializer(serializers.Serializer):
     def validate(self, data):
         instance = getattr(self, "instance", None)  # Existing instance in update
 
-        course_id = data.get("course") or (str(instance.course.id) if instance else None)
-        teacher_id = data.get("teacher") or (str(instance.teacher.id) if instance else None)
-        dept_id = data.get("department") or (str(instance.department.id) if instance else None)
+        # ids straight from the instance, no dereference
+        course_id = data.get("course") or (reference_id(instance, "course") if instance else None)
+        teacher_id = data.get("teacher") or (reference_id(instance, "teacher") if instance else None)
+        dept_id = data.get("department") or (reference_id(instance, "department") if instance else None)
 
-        course = Course.objects(id=course_id).first()
-        teacher = User.objects(id=teacher_id).first()
-        department = Department.objects(id=dept_id).first()
+        # loaded once per request; to_representation reuses these objects
+        course = get_document(Course, course_id)
+        teacher = get_document(User, teacher_id)
+        department = get_document(Department, dept_id)
 
         if not course:
             raise serializers.ValidationError("Invalid course ID")
@@ -1,3 +1,34 @@
-from django.test import TestCase
+from course.models import Course
+from iiuc_connect.testing import MongoQueryCountTestCase
+from routine.models import Routine
+from routine.views import RoutineViewSet
 
-# Create your tests here.
+
+class RoutineQueryCountTests(MongoQueryCountTestCase):
+    @classmethod
+    def seed(cls):
+        cls.teacher = cls.make_users("teacher", 1)[0]
+        cls.courses = [
+            Course(course_code=f"QR{cls.tag}{i}", department=cls.department, credit_hour=3)
+            for i in range(cls.rows)
+        ]
+        Course.objects.insert(cls.courses)
+        Routine.objects.insert([
+            Routine(course=course, teacher=cls.teacher, room_number="101", period=1 + i % 6,
+                    day="Sunday", department=cls.department, section="A")
+            for i, course in enumerate(cls.courses)
+        ])
+
+    @classmethod
+    def cleanup(cls):
+        ids = [course.id for course in cls.courses]
+        Routine.objects(course__in=ids).delete()
+        Course.objects(id__in=ids).delete()
+
+    def test_routine_list_commands_do_not_grow_with_page_size(self):
+        view = RoutineViewSet.as_view({"get": "list"})
+        for user in (self.admin, self.teacher):
+            with self.subTest(role=user.role):
+                self.assertConstantCommands(
+                    lambda size: self.call(view, user, limit=size), f"RoutineViewSet.list ({user.role})"
+                )
@@ -4,7 +4,8 @@ from rest_framework.response import Response
 from mongoengine.queryset.visitor import Q
 from .models import Routine
 from .serializers import RoutineSerializer
-from course.models import CourseRegistration
+from course.models import CourseRegistration, SectionCapacity
+from course.registrations import notify_promoted, register_teacher
 from accounts.authentication import JWTAuthentication
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -13,11 +14,14 @@ from notification.utils import create_notification
 from notification.utils import send_ws_notification
 from rest_framework.exceptions import NotFound
 from bson import ObjectId
+from iiuc_connect.pagination import MongoCursorPagination
+from iiuc_connect.prefetch import prefetch_references
 
 
 class RoutineViewSet(viewsets.ModelViewSet):
     serializer_class = RoutineSerializer
     authentication_classes = (JWTAuthentication,)
+    pagination_class = MongoCursorPagination  # opt-in via ?limit= / ?cursor=
     def get_object(self):
         pk = self.kwargs.get("pk")
 
@@ -46,19 +50,34 @@ class RoutineViewSet(viewsets.ModelViewSet):
 
         else:
         # Student
-            regs = CourseRegistration.objects(student=user, status="confirmed").only('course', 'section')
+            # raw rows: course ids without dereferencing every course
+            regs = list(CourseRegistration.objects(student=user, status="confirmed").only('course', 'section').as_pymongo())
 
             if not regs:
                 return Routine.objects.none()   # Important: no registration -> no routine
 
-            course_ids = [r.course.id for r in regs]
-            sections = [r.section for r in regs]
+            course_ids = [r["course"] for r in regs]
+            sections = [r["section"] for r in regs]
 
             return Routine.objects(
                 Q(course__in=course_ids) & Q(section__in=sections)
             )
 
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        # course, teacher and department: one $in query each instead of three per row
+        routines = prefetch_references(
+            queryset if page is None else page,
+            "course", "teacher", "department",
+            only={"course": ("course_code",), "teacher": ("name",), "department": ("name",)},
+        )
+        serializer = self.get_serializer(routines, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
     def create(self, request, *args, **kwargs):
         if not self.is_admin(request.user):
             return Response({"error": "Permission denied"}, status=403)
@@ -67,22 +86,9 @@ class RoutineViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         routine = serializer.save()
 
-        # Teacher auto-registration
-        reg = CourseRegistration.objects(
-            student=routine.teacher,
-            course=routine.course,
-            section=routine.section
-        ).first()
-        if reg:
-            reg.status = "confirmed"
-            reg.save()
-        else:
-            CourseRegistration(
-                student=routine.teacher,
-                course=routine.course,
-                section=routine.section,
-                status="confirmed"
-            ).save()
+        # Teacher auto-registration, outside the seat counters (course/registrations.py)
+        course_id = routine.course.id
+        notify_promoted(course_id, register_teacher(routine.teacher.id, course_id, routine.section))
         create_notification(
             user=routine.teacher,
             title="Assigned as Teacher",
@@ -116,6 +122,10 @@ class RoutineViewSet(viewsets.ModelViewSet):
             course=routine.course,
             section=routine.section
         ).delete()
+        # nobody holds or waits for a seat in the section any more
+        SectionCapacity.objects(course=routine.course, section=routine.section).update_one(
+            set__taken=0, set__waitlisted=0
+        )
 
     # Delete the routine
         routine.delete()
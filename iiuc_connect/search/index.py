@@ -0,0 +1,272 @@
+# search/index.py
+import bisect
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+
+_WORD_RE = re.compile(r"[\w.+-]+")
+
+
+def normalise(text):
+    return " ".join(str(text or "").lower().split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-process prefix + trigram index over one collection.
+
+    `loader(ids=None)` yields (id, {field: text}, payload) for every document
+    (or only `ids`). Writes in this process mark ids dirty and they are
+    reloaded with one `$in` query on the next search into a small overlay
+    ("delta") that queries merge over the shared base, so a write costs
+    O(changed documents), not O(index). The whole index is rebuilt in the
+    background every `ttl` seconds, or once the overlay holds MAX_DELTA
+    documents, folding the overlay in and picking up other workers' writes
+    (and bulk update_many / insert_many paths).
+    """
+
+    # trigrams present in more than this share of documents carry no signal
+    COMMON_GRAM_RATIO = 0.2
+    MIN_SIMILARITY = 0.35
+    MAX_PREFIX_MATCHES = 5000
+    MAX_DELTA = 2000
+
+    def __init__(self, name, loader, ttl=300):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._state = None
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._dirty = set()
+
+    # Building
+
+    @staticmethod
+    def _keys(fields):
+        keys = {}
+        for field, value in fields.items():
+            value = normalise(value)
+            if value:
+                keys[field] = value
+        return keys
+
+    @staticmethod
+    def _prefix_entries(keys, doc_id):
+        # (token, doc_id, rank): a whole field value outranks a word inside it
+        entries = {(value, doc_id, 3.0) for value in keys.values()}
+        for value in keys.values():
+            entries.update((word, doc_id, 2.5) for word in _WORD_RE.findall(value) if word != value)
+        return entries
+
+    def _build_state(self, rows):
+        docs, grams, prefixes = {}, {}, []
+        for doc_id, fields, payload in rows:
+            doc_id = str(doc_id)
+            keys = self._keys(fields)
+            docs[doc_id] = (keys, payload)
+            for value in keys.values():
+                for gram in trigrams(value):
+                    grams.setdefault(gram, set()).add(doc_id)
+            prefixes.extend(self._prefix_entries(keys, doc_id))
+        prefixes.sort()
+        return {"docs": docs, "grams": grams, "prefixes": prefixes, "delta": {"docs": {}, "grams": {}, "prefixes": []}}
+
+    def _delta(self, previous, changes):
+        """
+        New overlay = `previous` with `changes` applied: {doc_id: (keys, payload),
+        or None when deleted}. Costs O(changes) plus shallow copies of the overlay.
+        """
+        docs, grams = dict(previous["docs"]), dict(previous["grams"])
+        removed, added = set(), set()
+        for doc_id, entry in changes.items():
+            old = docs.get(doc_id)
+            if old is not None:
+                for value in old[0].values():
+                    for gram in trigrams(value):
+                        # posting sets are replaced, never mutated: older states still read them
+                        grams[gram] = grams[gram] - {doc_id}
+                removed.update(self._prefix_entries(old[0], doc_id))
+            docs[doc_id] = entry
+            if entry is not None:
+                for value in entry[0].values():
+                    for gram in trigrams(value):
+                        grams[gram] = grams.get(gram, frozenset()) | {doc_id}
+                added.update(self._prefix_entries(entry[0], doc_id))
+        replaced = removed | added
+        prefixes = list(heapq.merge(
+            (entry for entry in previous["prefixes"] if entry not in replaced), sorted(added),
+        )) if replaced else previous["prefixes"]
+        return {"docs": docs, "grams": grams, "prefixes": prefixes}
+
+    def build(self):
+        started = time.perf_counter()
+        before = self._state["delta"]["docs"] if self._state else {}
+        state = self._build_state(self.loader())
+        with self._lock:
+            if self._state is not None:
+                # overlay changes applied while loading may be missing from the snapshot
+                self._dirty.update(
+                    doc_id for doc_id, entry in self._state["delta"]["docs"].items()
+                    if before.get(doc_id, state) is not entry
+                )
+            self._state = state
+            self._built_at = time.monotonic()
+        return time.perf_counter() - started
+
+    def _background_rebuild(self):
+        try:
+            self.build()
+        finally:
+            self._rebuilding = False
+
+    def mark_dirty(self, ids):
+        with self._lock:
+            self._dirty.update(str(i) for i in ids)
+
+    def _refresh_dirty(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            state = self._state
+        if not dirty or state is None:
+            return
+        fresh = {str(doc_id): (self._keys(fields), payload) for doc_id, fields, payload in self.loader(ids=list(dirty))}
+
+        # Only the overlay is rebuilt; the base is shared with running searches
+        changes = {doc_id: fresh.get(doc_id) for doc_id in dirty}
+        refreshed = dict(state, delta=self._delta(state["delta"], changes))
+
+        with self._lock:
+            if self._state is not state:
+                # rebuilt or refreshed meanwhile: apply these ids to the new state next time
+                self._dirty |= dirty
+                return
+            self._state = refreshed
+
+    def _current(self):
+        if self._state is None:
+            with self._build_lock:
+                if self._state is None:
+                    self.build()
+        elif (time.monotonic() - self._built_at > self.ttl
+              or len(self._state["delta"]["docs"]) > self.MAX_DELTA) and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._background_rebuild, daemon=True).start()
+        self._refresh_dirty()
+        return self._state
+
+    # Querying
+
+    @staticmethod
+    def _doc(state, doc_id):
+        changed = state["delta"]["docs"]
+        return changed[doc_id] if doc_id in changed else state["docs"].get(doc_id)
+
+    def _prefix_matches(self, state, query):
+        """{doc_id: rank} for documents with a field or word starting with `query`."""
+        changed = state["delta"]["docs"]
+        matches = {}
+        # base entries of changed documents are stale; the overlay has their current ones
+        for prefixes, stale in ((state["prefixes"], changed), (state["delta"]["prefixes"], ())):
+            start = bisect.bisect_left(prefixes, (query,))
+            for i in range(start, min(len(prefixes), start + self.MAX_PREFIX_MATCHES)):
+                token, doc_id, rank = prefixes[i]
+                if not token.startswith(query):
+                    break
+                if doc_id in stale:
+                    continue
+                if token == query:
+                    rank = 4.0
+                if rank > matches.get(doc_id, 0.0):
+                    matches[doc_id] = rank
+        return matches
+
+    def _fuzzy_matches(self, state, query):
+        """{doc_id: trigram similarity} above MIN_SIMILARITY."""
+        wanted = trigrams(query)
+        delta = state["delta"]
+        postings = [(state["grams"].get(gram, ()), delta["grams"].get(gram, ())) for gram in wanted]
+        common = len(state["docs"]) * self.COMMON_GRAM_RATIO
+        selective = [pair for pair in postings if len(pair[0]) <= common] or postings
+        counts = Counter()
+        for ids, _ in selective:
+            counts.update(ids)
+        for doc_id in delta["docs"]:
+            counts.pop(doc_id, None)
+        for _, ids in selective:
+            counts.update(ids)
+        needed = self.MIN_SIMILARITY * len(selective)
+        return {doc_id: n / len(wanted) for doc_id, n in counts.items() if n >= needed}
+
+    def search(self, query, limit=20, offset=0, filter=None):
+        """
+        Ranked page of payloads for `query`: exact > prefix > word prefix >
+        trigram similarity. Returns (total, [(score, payload)]).
+        `filter(payload)` drops rows (role, active flag ...).
+        """
+        query = normalise(query)
+        if not query:
+            return 0, []
+        state = self._current()
+
+        candidates = self._prefix_matches(state, query)
+        # Fuzzy matching only when prefixes cannot fill the page
+        if len(query) >= 3 and len(candidates) < offset + limit:
+            for doc_id, similarity in self._fuzzy_matches(state, query).items():
+                if doc_id not in candidates:
+                    candidates[doc_id] = min(similarity, 1.0)
+
+        docs = {doc_id: self._doc(state, doc_id) for doc_id in candidates}
+        candidates = {
+            doc_id: score for doc_id, score in candidates.items()
+            if docs[doc_id] is not None and (not filter or filter(docs[doc_id][1]))
+        }
+        # ties are broken by id so pages are stable
+        page = heapq.nsmallest(offset + limit, candidates.items(), key=lambda item: (-item[1], item[0]))[offset:]
+        return len(candidates), [(round(score, 3), docs[doc_id][1]) for doc_id, score in page]
+
+    def stats(self):
+        state = self._state or {"docs": {}, "grams": {}, "prefixes": [], "delta": {"docs": {}}}
+        return {
+            "documents": len(state["docs"]),
+            "overlay": len(state["delta"]["docs"]),
+            "trigrams": len(state["grams"]),
+            "prefix_keys": len(state["prefixes"]),
+            "age_seconds": round(time.monotonic() - self._built_at, 1) if self._state else None,
+            "dirty": len(self._dirty),
+        }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(name):
+    """The process-wide index for `name` (users, courses, departments)."""
+    if name not in _indexes:
+        from .sources import SEARCH_SOURCES
+        with _indexes_lock:
+            if name not in _indexes:
+                _indexes[name] = SearchIndex(
+                    name, SEARCH_SOURCES[name], ttl=getattr(settings, "SEARCH_INDEX_TTL", 300)
+                )
+    return _indexes[name]
+
+
+def mark_dirty(name, ids):
+    """Called on writes; a no-op until the index has been used in this process."""
+    index = _indexes.get(name)
+    if index is not None:
+        index.mark_dirty(ids)
@@ -0,0 +1,118 @@
+# search/management/commands/bench_search.py
+import random
+import re
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from search.index import SearchIndex, get_index
+
+
+FIRST = ["mohammad", "abdul", "rahim", "karim", "fatema", "ayesha", "nusrat", "tanvir", "minhaz", "sadia"]
+LAST = ["hossain", "rahman", "islam", "ahmed", "chowdhury", "uddin", "akter", "khan"]
+
+
+def synthetic_users(count, seed=1):
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {''.join(rng.choices(string.ascii_lowercase, k=5))}"
+        student_id = f"C{rng.randint(180000, 239999)}{i:05d}"
+        email = f"{student_id.lower()}@ugrad.iiuc.ac.bd"
+        yield i, {"student_id": student_id, "name": name, "email": email}, {"id": str(i), "name": name}
+
+
+def _timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+class Command(BaseCommand):
+    help = "Compare the in-process search index with $regex scans on the users collection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Benchmark the index alone on N generated users (no database)")
+        parser.add_argument("--queries", nargs="+", default=None)
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--writes", type=int, default=200,
+                            help="Write-then-search rounds: one document changes before every search")
+
+    def _queries(self, options, rows):
+        if options["queries"]:
+            return options["queries"]
+        sample = random.Random(7).sample(rows, min(5, len(rows)))
+        queries = []
+        for _, fields, _ in sample:
+            queries += [fields["name"].split()[0][:4], fields["student_id"][:5], fields["name"].split()[-1]]
+        return queries + ["chowdhry"]  # typo: only the trigram index finds it
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            rows = list(synthetic_users(options["synthetic"]))
+            by_id = {str(doc_id): (doc_id, fields, payload) for doc_id, fields, payload in rows}
+            index = SearchIndex(
+                "users", lambda ids=None: rows if ids is None else [by_id[i] for i in ids if i in by_id]
+            )
+        else:
+            index = get_index("users")
+            rows = None
+
+        started = time.perf_counter()
+        index.build()
+        self.stdout.write(f"index build: {(time.perf_counter() - started) * 1000:.0f} ms  {index.stats()}")
+
+        if rows is None:
+            rows = [
+                (doc["_id"], {"student_id": doc.get("student_id", ""), "name": doc.get("name", "")}, None)
+                for doc in User.objects.only("student_id", "name").limit(1000).as_pymongo()
+            ]
+        if not rows:
+            self.stdout.write("no users to benchmark")
+            return
+
+        for query in self._queries(options, rows):
+            median, worst = _timed(lambda: index.search(query, limit=20), options["runs"])
+            total, _ = index.search(query, limit=20)
+            line = f"{query!r:<14} index: {median:7.2f} ms (max {worst:6.2f}) hits={total:<6}"
+
+            if not options["synthetic"]:
+                pattern = re.escape(query)
+                naive = User.objects(__raw__={"$or": [
+                    {field: {"$regex": pattern, "$options": "i"}} for field in ("student_id", "name", "email")
+                ]}).only("id").limit(20)
+                anchored = User.objects(__raw__={"student_id": {"$regex": f"^{pattern}"}}).only("id").limit(20)
+                naive_ms, _ = _timed(lambda: list(naive.as_pymongo()), max(1, options["runs"] // 4))
+                anchored_ms, _ = _timed(lambda: list(anchored.as_pymongo()), max(1, options["runs"] // 4))
+                line += f"  $regex/i: {naive_ms:7.2f} ms  ^anchored student_id: {anchored_ms:6.2f} ms"
+            self.stdout.write(line)
+
+        if options["writes"]:
+            self._write_then_search(index, rows, by_id if options["synthetic"] else None, options)
+
+    def _write_then_search(self, index, rows, by_id, options):
+        """The first search after a write pays for reloading the dirty id into the overlay."""
+        rng = random.Random(3)
+        queries = self._queries(options, rows)
+        samples = []
+        for i in range(options["writes"]):
+            doc_id, fields, payload = rows[rng.randrange(len(rows))]
+            if by_id is not None:
+                fields = dict(fields, name=f"renamed {fields['name']}")
+                by_id[str(doc_id)] = (doc_id, fields, payload)
+            index.mark_dirty([doc_id])
+            query = queries[i % len(queries)]
+            started = time.perf_counter()
+            index.search(query, limit=20)
+            samples.append((time.perf_counter() - started) * 1000)
+        p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+        self.stdout.write(
+            f"write then search: n={len(samples)} median={statistics.median(samples):.2f} ms "
+            f"p95={p95:.2f} ms overlay={index.stats()['overlay']}"
+        )
@@ -0,0 +1,54 @@
+# search/sources.py
+from accounts.models import Department, User
+from course.models import Course
+
+
+def _rows(document, fields, ids):
+    query = document.objects(id__in=ids) if ids is not None else document.objects
+    return query.only(*fields).as_pymongo()
+
+
+def users(ids=None):
+    for doc in _rows(User, ("id", "student_id", "name", "email", "role", "is_active",
+                            "department", "profile_picture_thumb"), ids):
+        yield doc["_id"], {
+            "student_id": doc.get("student_id"),
+            "name": doc.get("name"),
+            "email": doc.get("email"),
+        }, {
+            "id": str(doc["_id"]),
+            "student_id": doc.get("student_id"),
+            "name": doc.get("name"),
+            "email": doc.get("email"),
+            "role": doc.get("role"),
+            "is_active": doc.get("is_active"),
+            "department": str(doc["department"]) if doc.get("department") else None,
+            "profile_picture_thumb": doc.get("profile_picture_thumb"),
+        }
+
+
+def courses(ids=None):
+    for doc in _rows(Course, ("id", "course_code", "department", "credit_hour"), ids):
+        yield doc["_id"], {"course_code": doc.get("course_code")}, {
+            "id": str(doc["_id"]),
+            "course_code": doc.get("course_code"),
+            "department": str(doc["department"]) if doc.get("department") else None,
+            "credit_hour": doc.get("credit_hour"),
+        }
+
+
+def departments(ids=None):
+    for doc in _rows(Department, ("id", "name", "code", "is_active"), ids):
+        yield doc["_id"], {"name": doc.get("name"), "code": doc.get("code")}, {
+            "id": str(doc["_id"]),
+            "name": doc.get("name"),
+            "code": doc.get("code"),
+            "is_active": doc.get("is_active"),
+        }
+
+
+SEARCH_SOURCES = {
+    "users": users,
+    "courses": courses,
+    "departments": departments,
+}
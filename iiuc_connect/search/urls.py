@@ -0,0 +1,8 @@
+# search/urls.py
+from django.urls import path
+from .views import SearchAPIView, SearchStatsAPIView
+
+urlpatterns = [
+    path('', SearchAPIView.as_view(), name='search'),
+    path('stats/', SearchStatsAPIView.as_view(), name='search-stats'),
+]
@@ -0,0 +1,73 @@
+# search/views.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from accounts.authentication import JWTAuthentication
+from iiuc_connect.pagination import MongoCursorPagination
+from .index import get_index
+
+
+SEARCH_TYPES = ("users", "courses", "departments")
+MAX_LIMIT = 100
+
+
+# Ranked prefix / fuzzy search over users (admins), courses and departments
+class SearchAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
+
+    def _user_filter(self, request):
+        params = request.query_params
+        role = params.get("role")
+        is_active = params.get("is_active")
+        department = params.get("department")
+
+        def accept(row):
+            return (
+                (not role or row["role"] == role)
+                and (not is_active or row["is_active"] == is_active)
+                and (not department or row["department"] == department)
+            )
+        return accept
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        kind = request.query_params.get("type", "users")
+        if kind not in SEARCH_TYPES:
+            return Response({"error": f"type must be one of {', '.join(SEARCH_TYPES)}"}, status=400)
+        if not query:
+            return Response({"error": "q is required"}, status=400)
+        # user rows carry email and student_id: admins only, like TeacherListAPIView
+        if kind == "users" and getattr(request.user, "role", None) != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 20)), MAX_LIMIT))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        offset = 0
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            offset, _ = MongoCursorPagination.decode_cursor(cursor)
+            if not isinstance(offset, int) or offset < 0:
+                return Response({"error": "Invalid cursor"}, status=400)
+
+        row_filter = self._user_filter(request) if kind == "users" else None
+        total, rows = get_index(kind).search(query, limit=limit, offset=offset, filter=row_filter)
+
+        next_cursor = None
+        if offset + limit < total:
+            next_cursor = MongoCursorPagination.encode_cursor(offset + limit, None)
+        return Response({
+            "results": [dict(payload, score=score) for score, payload in rows],
+            "next_cursor": next_cursor,
+            "total": total,
+        })
+
+
+# Admin: index sizes and freshness
+class SearchStatsAPIView(APIView):
+    authentication_classes = (JWTAuthentication,)
+
+    def get(self, request):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        return Response({kind: get_index(kind).stats() for kind in SEARCH_TYPES})
@@ -0,0 +1,79 @@
+# uploads/dedupe.py
+import threading
+
+from mongoengine.errors import NotUniqueError
+
+from .models import StoredObject
+from .storage import get_storage
+
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "released": 0, "deleted": 0}
+
+
+def _count(**amounts):
+    with _stats_lock:
+        for key, amount in amounts.items():
+            _stats[key] += amount
+
+
+def acquire(sha256, upload, size=None, content_type=None, attempts=3):
+    """
+    URL of the stored file with content `sha256`, taking a reference on it.
+    `upload()` stores the file and returns its URL; it only runs when no
+    live copy exists. Returns (url, reused).
+    """
+    url = None
+    for _ in range(attempts):
+        # refs > 0: an object whose last reference is being released is not revived
+        existing = StoredObject.objects(sha256=sha256, refs__gt=0).modify(inc__refs=1, new=True)
+        if existing:
+            if url:
+                # a concurrent upload of the same content won; drop ours
+                get_storage().delete_url(url)
+            else:
+                _count(hits=1, bytes_saved=size or 0)
+            return existing.url, url is None
+
+        url = url or upload()
+        try:
+            StoredObject(sha256=sha256, url=url, size=size, content_type=content_type).save(force_insert=True)
+            _count(misses=1)
+            return url, False
+        except NotUniqueError:
+            continue
+
+    # still contended: keep an unshared copy, released by plain deletion
+    _count(misses=1)
+    return url, False
+
+
+def release(url):
+    """
+    Drop one reference to `url` and delete the file once none are left.
+    URLs that were never shared (profile pictures, legacy uploads) are
+    deleted right away. Returns True when the file was deleted.
+    """
+    if not url:
+        return False
+    obj = StoredObject.objects(url=url, refs__gt=0).modify(dec__refs=1, new=True)
+    if obj is None:
+        if StoredObject.objects(url=url).first():
+            return False
+        get_storage().delete_url(url)
+        return True
+    _count(released=1)
+    if obj.refs > 0:
+        return False
+    if not StoredObject.objects(id=obj.id, refs__lte=0).delete():
+        return False
+    get_storage().delete_url(url)
+    _count(deleted=1)
+    return True
+
+
+def stats():
+    with _stats_lock:
+        counters = dict(_stats)
+    counters["objects"] = StoredObject.objects.count()
+    return counters
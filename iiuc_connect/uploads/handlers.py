@@ -0,0 +1,82 @@
+# uploads/handlers.py
+from accounts.models import User
+from course.models import Course, CourseRegistration
+from course.resources import ResourceConflict, add_resources, replace_resource
+from iiuc_connect.prefetch import reference_id
+from notification.utils import create_notifications
+from .dedupe import release
+
+
+def _delete_stored(url):
+    # shared files are only deleted with their last reference
+    try:
+        release(url)
+    except Exception:
+        pass
+
+
+def profile_picture_done(job, url):
+    # Swap only if nobody replaced the picture meanwhile; a newer upload wins
+    previous = job.params.get("previous") or ""
+    current = [previous] if previous else ["", None]
+    updated = User.objects(id=job.target_id, profile_picture__in=current).update_one(
+        set__profile_picture=url, set__profile_picture_thumb=job.thumbnail_url
+    )
+    if not updated:
+        _delete_stored(url)
+        if job.thumbnail_url:
+            _delete_stored(job.thumbnail_url)
+        raise Exception("Profile picture changed by a newer upload")
+    User.invalidate_caches(job.target_id)
+    if previous and len(previous) > 10:
+        _delete_stored(previous)
+    if job.params.get("previous_thumb"):
+        _delete_stored(job.params["previous_thumb"])
+
+
+def _uploaded_files(job, urls):
+    files = list(job.files or [])
+    return [dict(files[i] if i < len(files) else {}, url=url) for i, url in enumerate(urls)]
+
+
+def course_resource_added(job, url):
+    urls = url if isinstance(url, list) else [url]
+    try:
+        add_resources(
+            job.target_id, job.params["field"], _uploaded_files(job, urls),
+            uploaded_by=reference_id(job, "owner"), version=job.params.get("version"),
+        )
+    except ResourceConflict:
+        for u in urls:
+            _delete_stored(u)
+        raise
+
+
+def course_resource_replaced(job, url):
+    old_url = job.params["old_url"]
+    try:
+        replace_resource(
+            job.target_id, job.params["resource_id"], old_url, _uploaded_files(job, [url])[0],
+            version=job.params.get("version"),
+        )
+    except ResourceConflict:
+        _delete_stored(url)
+        raise
+    _delete_stored(old_url)
+
+    # Notify students with confirmed registration in this course
+    course = Course.objects(id=job.target_id).only("course_code").first()
+    registered = CourseRegistration.objects(course=job.target_id, status="confirmed").no_dereference()
+    create_notifications(
+        [student.id for student in registered.scalar("student")],
+        title="Resource updated",
+        message=f"A resource in {course.course_code} has been updated.",
+        notification_type="announcement"
+    )
+
+
+UPLOAD_HANDLERS = {
+    "profile_picture": profile_picture_done,
+    "course_resource_add": course_resource_added,
+    "course_resource_replace": course_resource_replaced,
+}
@@ -0,0 +1,68 @@
+# uploads/images.py
+import io
+import os
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+# Pillow format name -> file extension
+IMAGE_EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg"}
+
+
+@dataclass
+class ProcessedImage:
+    image: ContentFile
+    thumbnail: ContentFile
+    original_bytes: int
+    width: int
+    height: int
+
+
+def _encode(img, fmt, quality, name):
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A") if "A" in img.getbands() else None)
+        img = background
+    out = io.BytesIO()
+    # EXIF / XMP are not passed on, so nothing but pixels leaves the server
+    img.save(out, format=fmt, quality=quality, optimize=True)
+    return ContentFile(out.getvalue(), name=f"{name}{IMAGE_EXTENSIONS[fmt]}")
+
+
+def preprocess_image(file_obj, max_dimension=None, thumb_size=None, fmt=None, quality=None):
+    """
+    Normalise an uploaded picture: apply the EXIF orientation, drop all
+    metadata, fit it inside `max_dimension` and re-encode it. Also returns
+    a `thumb_size` square-bounded thumbnail for list payloads.
+    """
+    max_dimension = max_dimension or getattr(settings, "IMAGE_MAX_DIMENSION", 1024)
+    thumb_size = thumb_size or getattr(settings, "IMAGE_THUMB_SIZE", 160)
+    fmt = (fmt or getattr(settings, "IMAGE_FORMAT", "WEBP")).upper()
+    quality = quality or getattr(settings, "IMAGE_QUALITY", 80)
+    if fmt not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Unsupported image format: {fmt}")
+
+    file_obj.seek(0, os.SEEK_END)
+    original_bytes = file_obj.tell()
+    file_obj.seek(0)
+
+    with Image.open(file_obj) as source:
+        # JPEG draft mode decodes big photos at a reduced scale directly
+        source.draft("RGB", (max_dimension, max_dimension))
+        img = ImageOps.exif_transpose(source)
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        name = os.path.splitext(os.path.basename(getattr(file_obj, "name", "") or "image"))[0] or "image"
+        image = _encode(img, fmt, quality, name)
+
+        thumb = img.copy()
+        thumb.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS)
+        thumbnail = _encode(thumb, fmt, quality, f"{name}_thumb")
+
+    return ProcessedImage(image, thumbnail, original_bytes, img.width, img.height)
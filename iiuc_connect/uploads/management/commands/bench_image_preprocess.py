@@ -0,0 +1,71 @@
+# uploads/management/commands/bench_image_preprocess.py
+import io
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from uploads.images import preprocess_image
+
+
+def synthetic_photo(width, height, seed):
+    """A noisy gradient JPEG with EXIF, roughly as hard to compress as a phone photo."""
+    noise = Image.effect_noise((width, height), 40 + seed % 20).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img = Image.blend(noise, gradient, 0.5)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90
+    exif[0x010F] = "BenchCam"
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=92, exif=exif)
+    out.name = f"photo-{seed}.jpg"
+    out.seek(0)
+    return out
+
+
+class Command(BaseCommand):
+    help = "Measure bytes saved and time per image for profile picture preprocessing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", help="Images to process (synthetic photos when empty)")
+        parser.add_argument("--count", type=int, default=20, help="Synthetic images to generate")
+        parser.add_argument("--size", default="4032x3024", help="Synthetic image size WxH")
+        parser.add_argument("--formats", nargs="+", default=["WEBP", "JPEG"])
+        parser.add_argument("--quality", type=int, default=None)
+        parser.add_argument("--max-dimension", type=int, default=None)
+
+    def _inputs(self, options):
+        if options["files"]:
+            for path in options["files"]:
+                with open(path, "rb") as fh:
+                    data = io.BytesIO(fh.read())
+                data.name = os.path.basename(path)
+                yield data
+            return
+        width, height = (int(v) for v in options["size"].lower().split("x"))
+        for i in range(options["count"]):
+            yield synthetic_photo(width, height, i)
+
+    def handle(self, *args, **options):
+        inputs = list(self._inputs(options))
+        original = sum(len(f.getvalue()) for f in inputs)
+        self.stdout.write(f"images={len(inputs)} original={original / 1024:.0f}KB")
+
+        for fmt in options["formats"]:
+            stored = thumbs = 0
+            started = time.perf_counter()
+            for f in inputs:
+                f.seek(0)
+                processed = preprocess_image(
+                    f, fmt=fmt, quality=options["quality"], max_dimension=options["max_dimension"]
+                )
+                stored += processed.image.size
+                thumbs += processed.thumbnail.size
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{fmt:<5} {elapsed / len(inputs) * 1000:8.1f} ms/image  "
+                f"stored={stored / 1024:8.0f}KB ({100 - stored * 100 / original:5.1f}% saved)  "
+                f"thumbnails={thumbs / 1024:6.0f}KB"
+            )
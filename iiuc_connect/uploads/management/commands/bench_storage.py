@@ -0,0 +1,47 @@
+# uploads/management/commands/bench_storage.py
+import os
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+from uploads.storage import STORAGE_BACKENDS, LocalStorage
+
+
+class Command(BaseCommand):
+    help = "Time upload/delete round trips against the media storage backends."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", nargs="+", default=["memory", "local"], choices=sorted(STORAGE_BACKENDS))
+        parser.add_argument("--count", type=int, default=200, help="Files per backend")
+        parser.add_argument("--size-kb", type=int, default=512)
+        parser.add_argument("--folder", default="bench_storage")
+
+    def handle(self, *args, **options):
+        payload = os.urandom(options["size_kb"] * 1024)
+        count = options["count"]
+        self.stdout.write(f"count={count} size={options['size_kb']}KB")
+
+        for name in options["backends"]:
+            with tempfile.TemporaryDirectory() as root:
+                # never write benchmark files into the real MEDIA_ROOT
+                storage = LocalStorage(root=root) if name == "local" else STORAGE_BACKENDS[name]()
+
+                started = time.perf_counter()
+                urls = [
+                    storage.upload(ContentFile(payload, name=f"bench-{i}.bin"), folder=options["folder"])
+                    for i in range(count)
+                ]
+                upload_elapsed = time.perf_counter() - started
+
+                started = time.perf_counter()
+                storage.delete_many([storage.public_id(url) for url in urls])
+                delete_elapsed = time.perf_counter() - started
+
+            mb = count * len(payload) / (1024 * 1024)
+            self.stdout.write(
+                f"{name:<10} upload={upload_elapsed / count * 1000:8.2f} ms/file "
+                f"({mb / upload_elapsed:8.1f} MB/s)  delete_many={delete_elapsed * 1000:8.2f} ms"
+            )
+            self.stdout.write(f"           {storage.stats()['operations']}")
@@ -0,0 +1,16 @@
+# uploads/management/commands/resume_uploads.py
+from django.core.management.base import BaseCommand
+
+from uploads.uploader import _get_executor, resume_pending_uploads
+
+
+class Command(BaseCommand):
+    help = "Re-queue spooled uploads left pending by a restarted worker and wait for them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--include-failed", action="store_true", help="Also retry failed uploads")
+
+    def handle(self, *args, **options):
+        count = resume_pending_uploads(include_failed=options["include_failed"])
+        _get_executor().shutdown(wait=True)
+        self.stdout.write(f"uploads: processed {count} job(s)")
@@ -0,0 +1,65 @@
+# uploads/models.py
+from mongoengine import Document, ReferenceField, StringField, IntField, DateTimeField, DictField, ListField
+from django.utils import timezone
+from accounts.models import User
+
+
+class UploadJob(Document):
+    """A file spooled to local disk, waiting to be pushed to media storage."""
+    owner = ReferenceField(User, required=True)
+    target = StringField(required=True)      # completion handler, see uploads/handlers.py
+    target_id = StringField(required=True)   # document the final URL is written to
+    params = DictField()                     # handler specific (field, previous URL ...)
+    folder = StringField()
+    spool_path = StringField()
+    spool_paths = ListField(StringField())   # several files applied together
+    original_name = StringField()
+    size = IntField()
+    files = ListField(DictField())           # per file: name, size, content_type, sha256
+    status = StringField(choices=['pending', 'uploading', 'completed', 'failed'], default='pending')
+    url = StringField()
+    urls = ListField(StringField())
+    thumbnail_url = StringField()
+    stored_size = IntField()                 # bytes after preprocessing / deduplication
+    deduplicated = IntField(default=0)       # files that reused an already stored copy
+    error = StringField()
+    attempts = IntField(default=0)
+    created_at = DateTimeField(default=timezone.now)
+    updated_at = DateTimeField(default=timezone.now)
+
+    meta = {
+        'collection': 'upload_jobs',
+        'indexes': ['owner', 'status']
+    }
+
+    def summary(self):
+        return {
+            "id": str(self.id),
+            "target": self.target,
+            "target_id": self.target_id,
+            "status": self.status,
+            "url": self.url,
+            "urls": self.urls or None,
+            "thumbnail_url": self.thumbnail_url,
+            "deduplicated": self.deduplicated or 0,
+            "error": self.error,
+        }
+
+
+class StoredObject(Document):
+    """
+    One file in media storage, shared by every upload with the same content.
+    `refs` counts the documents pointing at `url`; the file is deleted when
+    the last one lets go (see uploads/dedupe.py).
+    """
+    sha256 = StringField(required=True, unique=True)
+    url = StringField(required=True)
+    size = IntField()
+    content_type = StringField()
+    refs = IntField(default=1)
+    created_at = DateTimeField(default=timezone.now)
+
+    meta = {
+        'collection': 'stored_objects',
+        'indexes': ['url']
+    }
@@ -0,0 +1,256 @@
+# uploads/storage.py
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+
+class StorageError(Exception):
+    pass
+
+
+class MediaStorage:
+    """
+    Where uploaded media lives. Backends implement `_upload`, `_delete` and
+    `public_id`; the public methods time every call so storage latency can
+    be told apart from our own request handling (see `stats()`).
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+
+    def _record(self, op, started):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            count, total, worst = self._timings.get(op, (0, 0.0, 0.0))
+            self._timings[op] = (count + 1, total + elapsed, max(worst, elapsed))
+
+    def upload(self, file_obj, folder):
+        """Store `file_obj` under `folder`; returns its public URL."""
+        started = time.perf_counter()
+        try:
+            return self._upload(file_obj, folder)
+        finally:
+            self._record("upload", started)
+
+    def delete(self, public_id):
+        started = time.perf_counter()
+        try:
+            return self._delete(public_id)
+        finally:
+            self._record("delete", started)
+
+    def delete_many(self, public_ids):
+        public_ids = [p for p in public_ids if p]
+        if not public_ids:
+            return 0
+        started = time.perf_counter()
+        try:
+            return self._delete_many(public_ids)
+        finally:
+            self._record("delete_many", started)
+
+    def delete_url(self, url):
+        public_id = self.public_id(url)
+        return self.delete(public_id) if public_id else False
+
+    def public_id(self, url):
+        raise NotImplementedError
+
+    def _upload(self, file_obj, folder):
+        raise NotImplementedError
+
+    def _delete(self, public_id):
+        raise NotImplementedError
+
+    def _delete_many(self, public_ids):
+        return sum(1 for public_id in public_ids if self._delete(public_id))
+
+    def stats(self):
+        with self._lock:
+            timings = dict(self._timings)
+        return {
+            "backend": self.name,
+            "operations": {
+                op: {
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 2),
+                    "max_ms": round(worst * 1000, 2),
+                }
+                for op, (count, total, worst) in timings.items()
+            },
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._timings.clear()
+
+
+def _iter_chunks(file_obj, chunk_size=64 * 1024):
+    if hasattr(file_obj, "chunks"):
+        yield from file_obj.chunks(chunk_size)
+        return
+    yield from iter(lambda: file_obj.read(chunk_size), b"")
+
+
+def _stored_name(file_obj):
+    ext = os.path.splitext(getattr(file_obj, "name", "") or "")[1].lower()
+    return f"{uuid.uuid4().hex}{ext}"
+
+
+class CloudinaryStorage(MediaStorage):
+    name = "cloudinary"
+
+    def _upload(self, file_obj, folder):
+        from cloudinary.uploader import upload as cloudinary_upload
+        result = cloudinary_upload(file_obj, folder=folder, overwrite=True, resource_type="image")
+        url = result.get("secure_url")
+        if not url or not isinstance(url, str):
+            raise StorageError("Invalid URL returned from Cloudinary")
+        return url
+
+    def _delete(self, public_id):
+        import cloudinary.uploader
+        from cloudinary.exceptions import Error as CloudinaryError
+        try:
+            result = cloudinary.uploader.destroy(public_id, invalidate=True)
+        except CloudinaryError as e:
+            raise StorageError(f"Cloudinary delete error: {str(e)}")
+        if result.get("result") in ["ok", "not found"]:
+            return True
+        raise StorageError(f"Failed to delete image: {result}")
+
+    def _delete_many(self, public_ids):
+        import cloudinary.api
+        from cloudinary.exceptions import Error as CloudinaryError
+        deleted = 0
+        # the Admin API accepts at most 100 ids per call
+        for start in range(0, len(public_ids), 100):
+            try:
+                result = cloudinary.api.delete_resources(public_ids[start:start + 100], invalidate=True)
+            except CloudinaryError as e:
+                raise StorageError(f"Cloudinary delete error: {str(e)}")
+            deleted += sum(1 for status in result.get("deleted", {}).values() if status in ("deleted", "not_found"))
+        return deleted
+
+    def public_id(self, url):
+        # https://res.cloudinary.com/<cloud>/image/upload/v123/<folder>/<name>.<ext>
+        path = urlparse(url).path
+        parts = path.split("/")
+        if len(parts) < 5:
+            return ""
+        public_id_with_ext = "/".join(parts[4:])
+        if public_id_with_ext.startswith("v") and "/" in public_id_with_ext:
+            version, rest = public_id_with_ext.split("/", 1)
+            if version[1:].isdigit():
+                public_id_with_ext = rest
+        return ".".join(public_id_with_ext.split(".")[:-1])
+
+
+class LocalStorage(MediaStorage):
+    """Files under MEDIA_ROOT, served from MEDIA_URL. Writes are streamed chunk by chunk."""
+
+    name = "local"
+
+    def __init__(self, root=None, base_url=None):
+        super().__init__()
+        self.root = str(root or getattr(settings, "MEDIA_ROOT", "media"))
+        self.base_url = base_url or getattr(settings, "MEDIA_URL", "/media/")
+        if not self.base_url.endswith("/"):
+            self.base_url += "/"
+
+    def _path(self, public_id):
+        path = os.path.normpath(os.path.join(self.root, public_id))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise StorageError(f"Invalid public id: {public_id}")
+        return path
+
+    def _upload(self, file_obj, folder):
+        public_id = f"{folder.strip('/')}/{_stored_name(file_obj)}"
+        path = self._path(public_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as out:
+            for chunk in _iter_chunks(file_obj):
+                out.write(chunk)
+        os.replace(tmp_path, path)
+        return f"{self.base_url}{public_id}"
+
+    def _delete(self, public_id):
+        try:
+            os.remove(self._path(public_id))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def public_id(self, url):
+        path = urlparse(url).path
+        base_path = urlparse(self.base_url).path
+        if not path.startswith(base_path):
+            return ""
+        return path[len(base_path):]
+
+
+class MemoryStorage(MediaStorage):
+    """Keeps files in a dict. For benchmarks and load tests only."""
+
+    name = "memory"
+
+    def __init__(self, base_url="memory://media/"):
+        super().__init__()
+        self.base_url = base_url
+        self.files = {}
+
+    def _upload(self, file_obj, folder):
+        public_id = f"{folder.strip('/')}/{_stored_name(file_obj)}"
+        data = b"".join(_iter_chunks(file_obj))
+        with self._lock:
+            self.files[public_id] = data
+        return f"{self.base_url}{public_id}"
+
+    def _delete(self, public_id):
+        with self._lock:
+            self.files.pop(public_id, None)
+        return True
+
+    def public_id(self, url):
+        if not url.startswith(self.base_url):
+            return ""
+        return url[len(self.base_url):]
+
+
+STORAGE_BACKENDS = {
+    "cloudinary": CloudinaryStorage,
+    "local": LocalStorage,
+    "memory": MemoryStorage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The configured backend (MEDIA_STORAGE_BACKEND), created once per process."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                name = getattr(settings, "MEDIA_STORAGE_BACKEND", "cloudinary")
+                if name not in STORAGE_BACKENDS:
+                    raise StorageError(f"Unknown MEDIA_STORAGE_BACKEND: {name}")
+                _storage = STORAGE_BACKENDS[name]()
+    return _storage
+
+
+def set_storage(storage):
+    """Swap the process-wide backend (benchmarks, load tests); returns the previous one."""
+    global _storage
+    with _storage_lock:
+        previous, _storage = _storage, storage
+    return previous
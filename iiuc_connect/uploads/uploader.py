@@ -0,0 +1,207 @@
+# uploads/uploader.py
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+
+from iiuc_connect.prefetch import reference_id
+from .dedupe import acquire, release
+from .handlers import UPLOAD_HANDLERS
+from .images import preprocess_image
+from .models import UploadJob
+from .storage import get_storage
+
+
+# Targets whose files are downscaled and re-encoded before they are stored
+IMAGE_TARGETS = {"profile_picture"}
+# Targets whose files are shared by content hash (see uploads/dedupe.py)
+DEDUPE_TARGETS = {"course_resource_add", "course_resource_replace"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "UPLOAD_WORKERS", 4),
+                    thread_name_prefix="uploader",
+                )
+    return _executor
+
+
+def spool_file(file_obj):
+    """
+    Stream an uploaded file to the spool directory, hashing it on the way.
+    Returns (path, metadata) with name, size, content_type and sha256.
+    """
+    spool_dir = getattr(settings, "UPLOAD_SPOOL_DIR", tempfile.gettempdir())
+    os.makedirs(spool_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=spool_dir, prefix="upload-")
+    size = 0
+    digest = hashlib.sha256()
+    with os.fdopen(fd, "wb") as out:
+        chunks = file_obj.chunks() if hasattr(file_obj, "chunks") else iter(lambda: file_obj.read(64 * 1024), b"")
+        for chunk in chunks:
+            out.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    name = getattr(file_obj, "name", None)
+    content_type = getattr(file_obj, "content_type", None) or (mimetypes.guess_type(name)[0] if name else None)
+    return path, {
+        "name": name,
+        "size": size,
+        "content_type": content_type or "application/octet-stream",
+        "sha256": digest.hexdigest(),
+    }
+
+
+def queue_upload(file_obj, owner, target, target_id, folder, params=None):
+    """
+    Spool `file_obj` (or a list of files) and hand it to the background
+    uploader. Returns the pending UploadJob immediately; the handler
+    registered for `target` swaps the final URL (a list of URLs for a list
+    of files) into the target document when the upload finishes.
+    """
+    if target not in UPLOAD_HANDLERS:
+        raise ValueError(f"Unknown upload target: {target}")
+    files = file_obj if isinstance(file_obj, list) else [file_obj]
+    spooled = [spool_file(f) for f in files]
+    job = UploadJob(
+        owner=owner,
+        target=target,
+        target_id=str(target_id),
+        params=params or {},
+        folder=folder,
+        original_name=", ".join(meta["name"] or "" for _, meta in spooled) or None,
+        size=sum(meta["size"] for _, meta in spooled),
+        files=[meta for _, meta in spooled],
+    )
+    if isinstance(file_obj, list):
+        job.spool_paths = [path for path, _ in spooled]
+    else:
+        job.spool_path = spooled[0][0]
+    job.save()
+    _get_executor().submit(process_upload, job.id)
+    return job
+
+
+def _spooled_paths(job):
+    return list(job.spool_paths) if job.spool_paths else [job.spool_path]
+
+
+def _cleanup_spool(job):
+    for path in _spooled_paths(job):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _store(storage, folder, path):
+    with open(path, "rb") as fh:
+        return storage.upload(fh, folder=folder)
+
+
+def notify_upload_status(job):
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"notifications_{reference_id(job, 'owner')}",
+        {"type": "upload_status", "data": job.summary()},
+    )
+
+
+def _store_file(storage, job, index, path):
+    """(url, bytes uploaded, reused) for one spooled file; repeated content reuses the stored copy."""
+    meta = job.files[index] if index < len(job.files or []) else {}
+    size = meta.get("size") or 0
+    if job.target not in DEDUPE_TARGETS or not meta.get("sha256"):
+        return _store(storage, job.folder, path), size, False
+    url, reused = acquire(
+        meta["sha256"], lambda: _store(storage, job.folder, path),
+        size=size, content_type=meta.get("content_type"),
+    )
+    return url, 0 if reused else size, reused
+
+
+def _upload_spooled(job, storage):
+    """Push the job's spooled file(s) to storage; returns the URL, or URLs for multi-file jobs."""
+    if job.spool_paths:
+        # A separate short-lived pool: waiting on our own executor could deadlock it
+        with ThreadPoolExecutor(max_workers=min(len(job.spool_paths), 8)) as pool:
+            futures = [pool.submit(_store_file, storage, job, i, path) for i, path in enumerate(job.spool_paths)]
+        failed = [f.exception() for f in futures if f.exception()]
+        stored = [f.result() for f in futures if not f.exception()]
+        if failed:
+            # all or nothing: let go of the files that did make it
+            for url, _, _ in stored:
+                release(url)
+            raise failed[0]
+        job.stored_size = sum(size for _, size, _ in stored)
+        job.deduplicated = sum(1 for _, _, reused in stored if reused)
+        return [url for url, _, _ in stored]
+
+    if job.target in IMAGE_TARGETS:
+        with open(job.spool_path, "rb") as fh:
+            processed = preprocess_image(fh)
+            url = storage.upload(processed.image, folder=job.folder)
+            job.thumbnail_url = storage.upload(processed.thumbnail, folder=job.folder)
+            job.stored_size = processed.image.size
+        return url
+
+    url, job.stored_size, reused = _store_file(storage, job, 0, job.spool_path)
+    job.deduplicated = int(reused)
+    return url
+
+
+def process_upload(job_id):
+    # Claim the job so two workers never upload the same file
+    job = UploadJob.objects(id=job_id, status="pending").modify(
+        set__status="uploading", set__updated_at=timezone.now(), inc__attempts=1, new=True
+    )
+    if not job:
+        return None
+
+    try:
+        url = _upload_spooled(job, get_storage())
+        UPLOAD_HANDLERS[job.target](job, url)
+        job.status = "completed"
+        if isinstance(url, list):
+            job.urls = url
+        else:
+            job.url = url
+        job.error = None
+        _cleanup_spool(job)
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    job.updated_at = timezone.now()
+    job.save()
+
+    try:
+        notify_upload_status(job)
+    except Exception:
+        pass
+    return job
+
+
+def resume_pending_uploads(include_failed=False):
+    """Re-queue jobs left behind by a restarted worker; returns how many."""
+    statuses = ["pending", "uploading"] + (["failed"] if include_failed else [])
+    count = 0
+    for job in UploadJob.objects(status__in=statuses).only("id", "spool_path", "spool_paths"):
+        if not all(path and os.path.exists(path) for path in _spooled_paths(job)):
+            UploadJob.objects(id=job.id).update_one(set__status="failed", set__error="Spooled file missing")
+            continue
+        UploadJob.objects(id=job.id).update_one(set__status="pending")
+        _get_executor().submit(process_upload, job.id)
+        count += 1
+    return count
@@ -0,0 +1,8 @@
+# uploads/urls.py
+from django.urls import path
+from .views import StorageStatsAPIView, UploadStatusAPIView
+
+urlpatterns = [
+    path('storage/stats/', StorageStatsAPIView.as_view(), name='storage-stats'),
+    path('<str:pk>/', UploadStatusAPIView.as_view(), name='upload-status'),
+]
@@ -0,0 +1,34 @@
+# uploads/views.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from accounts.authentication import JWTAuthentication
+from iiuc_connect.identity_map import get_document
+from iiuc_connect.prefetch import reference_id
+from .dedupe import stats as dedupe_stats
+from .models import UploadJob
+from .storage import get_storage
+
+
+# Poll the status of a queued upload (owner or admin)
+class UploadStatusAPIView(APIView):
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, pk):
+        job = get_document(UploadJob, pk)
+        if not job:
+            return Response({"error": "Upload not found"}, status=404)
+        if reference_id(job, "owner") != request.user.id and request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        return Response(job.summary())
+
+
+# Admin: storage backend latency and content deduplication
+class StorageStatsAPIView(APIView):
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        if request.user.role != "admin":
+            return Response({"error": "Permission denied"}, status=403)
+        data = get_storage().stats()
+        data["dedupe"] = dedupe_stats()
+        return Response(data)